@@ -4,6 +4,7 @@ import sqlite3
 from tqdm import tqdm
 from openai import OpenAI
 from barhopping.config import BARS_DB, QUERIES_DB
+from barhopping.database.sqlite import ensure_column
 from barhopping.logger import logger
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -51,11 +52,13 @@ def _ensure_table(cur):
             question_no   INTEGER NOT NULL,
             question_text TEXT    NOT NULL,
             embedding     TEXT,
+            embedding_f32 BLOB,
             FOREIGN KEY(bar_id) REFERENCES bars(id)
         );
         """
     )
     cur.execute("CREATE INDEX IF NOT EXISTS idx_bq_bar_id ON bar_questions(bar_id);")
+    ensure_column(cur.connection, "bar_questions", "embedding_f32", "BLOB")
 
 def save_questions_for_bar(bar_id: int, questions: list[str]):
     """Insert/replace the generated questions for *bar_id* into the DB."""
@@ -85,6 +88,7 @@ def process_first_n(n: int = 100, num_questions: int = 10):
             failures.append(bar_id)
 
     logger.info("Processed %d bars | failures: %s", n, failures if failures else "none")
+    logger.info("Embed the questions with `python -m barhopping.embedding.bulk`")
 
 if __name__ == "__main__":
     process_first_n(108, num_questions=10)
\ No newline at end of file
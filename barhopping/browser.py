@@ -0,0 +1,181 @@
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from selenium import webdriver
+from barhopping.config import BROWSER_POOL_SIZE, BROWSER_LEASE_TIMEOUT, BROWSER_ACQUIRE_TIMEOUT
+from barhopping.logger import logger
+
+def new_browser() -> webdriver.Chrome:
+    """Start a headless Chrome session."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
+
+def _quit(browser):
+    try:
+        browser.quit()
+    except Exception as e:
+        logger.error(f"Error closing browser: {e}")
+
+class BrowserPool:
+    """A fixed number of headless browsers, leased to one caller at a time.
+
+    Browsers are started on first demand and kept warm between leases. Each
+    lease is health-checked first, and a browser that has crashed, raised a
+    driver error or outlived its lease is quit and replaced.
+
+    Args:
+        size: Most browsers open at once
+        lease_timeout: Seconds a lease may be held before its browser is quit,
+            which makes any call blocked on it fail
+        acquire_timeout: Seconds to wait for a free browser
+        factory: Starts a browser
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, lease_timeout: Optional[float] = BROWSER_LEASE_TIMEOUT,
+                 acquire_timeout: Optional[float] = BROWSER_ACQUIRE_TIMEOUT,
+                 factory: Callable[[], Any] = new_browser):
+        self.size = size
+        self.lease_timeout = lease_timeout
+        self.acquire_timeout = acquire_timeout
+        self.factory = factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[Any] = []
+        self._expired = set()
+        self._closed = False
+        self._counts = {"leases": 0, "started": 0, "recycled": 0, "expired": 0}
+
+    @staticmethod
+    def healthy(browser) -> bool:
+        """Whether the browser session still answers."""
+        try:
+            browser.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Lease a healthy browser, waiting up to *timeout* (default ``acquire_timeout``) seconds for one."""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        timeout = self.acquire_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser free within {timeout}s ({self.size} in use)")
+        try:
+            while True:
+                with self._lock:
+                    browser = self._idle.pop() if self._idle else None
+                if browser is None:
+                    browser = self.factory()
+                    with self._lock:
+                        self._counts["started"] += 1
+                    logger.info(f"Browser started ({self._counts['started']} so far)")
+                    break
+                if self.healthy(browser):
+                    break
+                logger.warning("Recycling a browser that stopped responding")
+                self._discard(browser)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._counts["leases"] += 1
+        return browser
+
+    def release(self, browser, broken: bool = False):
+        """Return a leased browser; a *broken* or expired one is quit instead of reused."""
+        with self._lock:
+            expired = id(browser) in self._expired
+            self._expired.discard(id(browser))
+        if broken or expired or self._closed:
+            if not expired:
+                self._discard(browser)
+        else:
+            with self._lock:
+                self._idle.append(browser)
+        self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None, lease_timeout: Optional[float] = None) -> Iterator[Any]:
+        """Hold a browser for the duration of a ``with`` block.
+
+        If an exception escapes the block the browser is health-checked again
+        and replaced if it no longer answers. Holding it longer than
+        *lease_timeout* (default ``lease_timeout``) quits it.
+        """
+        browser = self.acquire(timeout)
+        lease_timeout = self.lease_timeout if lease_timeout is None else lease_timeout
+        timer = None
+        if lease_timeout:
+            timer = threading.Timer(lease_timeout, self._expire, args=(browser, lease_timeout))
+            timer.daemon = True
+            timer.start()
+        broken = False
+        try:
+            yield browser
+        except Exception:
+            broken = not self.healthy(browser)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.release(browser, broken)
+
+    def map(self, fn: Callable[[Any, Any], Any], items: Sequence[Any]) -> List[Any]:
+        """Run ``fn(browser, item)`` for every item, spread across the pool's browsers.
+
+        Results are returned in order; the first exception is re-raised.
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        def run(item):
+            with self.lease() as browser:
+                return fn(browser, item)
+
+        with ThreadPoolExecutor(max_workers=min(self.size, len(items)), thread_name_prefix="browser") as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        """Quit the idle browsers; leased ones are quit when returned."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            _quit(browser)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counts, "idle": len(self._idle), "size": self.size}
+
+    def _discard(self, browser):
+        with self._lock:
+            self._counts["recycled"] += 1
+        _quit(browser)
+
+    def _expire(self, browser, lease_timeout: float):
+        logger.warning(f"Browser lease exceeded {lease_timeout}s; closing the browser")
+        with self._lock:
+            self._expired.add(id(browser))
+            self._counts["expired"] += 1
+        _quit(browser)
+
+# Global pool, created on first use
+_lock = threading.Lock()
+_pool = None
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool, closed at exit."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -20,9 +20,83 @@ TOP_K = config["top_k"]
 BARS_DB = config["bars_db"]
 QUERIES_DB = config["queries_db"]
 
+# Retriever settings
+EMBEDDING_SNAPSHOT = config.get("embedding_snapshot", True)
+ANN_BACKEND = config.get("ann_backend", "exact")
+ANN_NLIST = config.get("ann_nlist", 0)
+ANN_NPROBE = config.get("ann_nprobe", 8)
+QUANTIZATION = config.get("quantization", "none")
+QUANTIZATION_RESCORE = config.get("quantization_rescore", 4)
+SEARCH_MODE = config.get("search_mode", "vector")
+LEXICAL_MAX_TERMS = config.get("lexical_max_terms", 0)
+LEXICAL_INDEX = SEARCH_MODE != "vector" or LEXICAL_MAX_TERMS > 0
+RRF_K = config.get("rrf_k", 60)
+
+# Embedding cache
+EMBEDDING_CACHE_SIZE = config.get("embedding_cache_size", 4096)
+EMBEDDING_CACHE_PATH = config.get("embedding_cache_path")
+EMBEDDING_BATCH_SIZE = config.get("embedding_batch_size", 64)
+EMBEDDING_WARMUP = config.get("embedding_warmup", False)
+
+# Result cache
+RESULT_CACHE_SIZE = config.get("result_cache_size", 256)
+RESULT_CACHE_TTL = config.get("result_cache_ttl", 600)
+PREWARM_QUERIES = config.get("prewarm_queries") or []
+
+# Routing
+DISTANCE_PROVIDER = config.get("distance_provider", "haversine")
+STREET_FACTOR = config.get("street_factor", 1.3)
+DISTANCE_CACHE = config.get("distance_cache", True)
+# Kept out of the bars DB so caching a distance does not invalidate the embedding snapshot
+DISTANCES_DB = config.get("distances_db") or f"{os.path.splitext(BARS_DB)[0]}_distances.db"
+ROUTE_EXACT_MAX = config.get("route_exact_max", 16)
+ROUTE_TIME_BUDGET = config.get("route_time_budget", 2.0)
+ROUTE_WALK_BUDGET = config.get("route_walk_budget")
+ROUTE_POOL_SIZE = config.get("route_pool_size", 30)
+ROUTE_MAX_STOPS = config.get("route_max_stops", 5)
+ROUTE_PREVIEW = config.get("route_preview", True)
+BROWSER_POOL_SIZE = config.get("browser_pool_size", 2)
+BROWSER_LEASE_TIMEOUT = config.get("browser_lease_timeout", 300)
+BROWSER_ACQUIRE_TIMEOUT = config.get("browser_acquire_timeout", 120)
+GUI_MAX_CONCURRENCY = config.get("gui_max_concurrency", 8)
+GUI_QUEUE_TIMEOUT = config.get("gui_queue_timeout", 60)
+GUI_INFERENCE_WORKERS = config.get("gui_inference_workers", 2)
+GUI_ROUTE_WORKERS = config.get("gui_route_workers", 4)
+
+# JSON HTTP API
+API_HOST = config.get("api_host", "127.0.0.1")
+API_PORT = config.get("api_port", 8000)
+API_WORKERS = config.get("api_workers", 1)
+API_MAX_CONCURRENCY = config.get("api_max_concurrency", 16)
+API_QUEUE_TIMEOUT = config.get("api_queue_timeout", 10)
+API_INFERENCE_WORKERS = config.get("api_inference_workers", 2)
+API_ROUTE_WORKERS = config.get("api_route_workers", 4)
+API_MAX_BATCH = config.get("api_max_batch", 64)
+
 # Model settings
 GEMMA_MODEL = config["gemma_model"]
 GRANITE_MODEL = config["granite_model"]
+RERANKER_MODEL = config.get("reranker_model", "BAAI/bge-reranker-v2-m3")
+RERANK_TOKEN_BUDGET = config.get("rerank_token_budget", 8192)
+RERANK_DOC_CACHE_SIZE = config.get("rerank_doc_cache_size", 100000)
+
+# Rerank cascade
+RERANK_DEPTH = config.get("rerank_depth", 2)
+RERANK_SKIP_MARGIN = config.get("rerank_skip_margin", 0.0)
+RERANK_EARLY_STOP = config.get("rerank_early_stop", False)
+RERANK_MAX_RESULTS = config.get("rerank_max_results", 20)
+
+# Inference backends: torch, torch-int8, onnx or onnx-int8
+EMBEDDING_BACKEND = config.get("embedding_backend", "torch")
+RERANKER_BACKEND = config.get("reranker_backend", "torch")
+ONNX_DIR = config.get("onnx_dir", "./models/onnx")
+
+# Shared model server ("unix:/path.sock" or "host:port"; empty = load the models in-process)
+MODEL_SERVER = config.get("model_server") or ""
+MODEL_SERVER_AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY") or config.get("model_server_authkey") or ""
+MODEL_SERVER_MAX_BATCH = config.get("model_server_max_batch", 32)
+MODEL_SERVER_MAX_WAIT_MS = config.get("model_server_max_wait_ms", 5)
+MODEL_SERVER_TIMEOUT = config.get("model_server_timeout", 30)
 
 # API keys
 HF_TOKEN = os.getenv("HF_TOKEN", config["hf_token"])
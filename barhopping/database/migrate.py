@@ -0,0 +1,93 @@
+import argparse
+import json
+import sqlite3
+from typing import List
+from barhopping.config import BARS_DB
+from barhopping.database.sqlite import ensure_column, ensure_updated_at, encode_embedding
+from barhopping.geo import coords_from_url
+from barhopping.logger import logger
+
+def migrate_embeddings(db_path: str = BARS_DB, drop_text: bool = False, batch_size: int = 500) -> int:
+    """Convert the JSON ``embedding`` TEXT column into float32 ``embedding_f32`` BLOBs.
+
+    Args:
+        db_path: Path to the bars database
+        drop_text: Clear the legacy TEXT column and VACUUM once converted
+        batch_size: Number of rows to convert per UPDATE batch
+    Returns:
+        Number of rows converted
+    """
+    converted = 0
+    with sqlite3.connect(db_path) as conn:
+        if ensure_column(conn, "bars", "embedding_f32", "BLOB"):
+            logger.info(f"Added embedding_f32 column to {db_path}")
+
+        last_id = -1
+        while True:
+            rows = conn.execute(
+                "SELECT id, embedding FROM bars "
+                "WHERE id > ? AND embedding_f32 IS NULL AND embedding IS NOT NULL AND embedding != '' "
+                "ORDER BY id LIMIT ?",
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = [(encode_embedding(json.loads(text)), bar_id) for bar_id, text in rows]
+            conn.executemany("UPDATE bars SET embedding_f32 = ? WHERE id = ?", updates)
+            converted += len(updates)
+            last_id = rows[-1][0]
+
+        if drop_text:
+            conn.execute("UPDATE bars SET embedding = NULL WHERE embedding_f32 IS NOT NULL")
+        conn.commit()
+
+    if drop_text:
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("VACUUM")
+
+    logger.info(f"Converted {converted} embeddings in {db_path}")
+    return converted
+
+def migrate_updated_at(db_path: str = BARS_DB):
+    """Add the ``updated_at`` watermark column used by incremental index refresh."""
+    with sqlite3.connect(db_path) as conn:
+        if ensure_updated_at(conn):
+            logger.info(f"Added updated_at column to {db_path}")
+        conn.commit()
+
+def migrate_coordinates(db_path: str = BARS_DB) -> int:
+    """Add ``lat``/``lng`` columns and fill them from the Google Maps place URLs.
+
+    Returns:
+        Number of bars located
+    """
+    with sqlite3.connect(db_path) as conn:
+        for column in ("lat", "lng"):
+            ensure_column(conn, "bars", column, "REAL")
+        rows = conn.execute("SELECT id, url FROM bars WHERE lat IS NULL OR lng IS NULL").fetchall()
+        updates = [(*coords, bar_id) for bar_id, url in rows if (coords := coords_from_url(url))]
+        conn.executemany("UPDATE bars SET lat = ?, lng = ? WHERE id = ?", updates)
+        conn.commit()
+
+    if len(updates) < len(rows):
+        logger.warning(f"{len(rows) - len(updates)} bars in {db_path} have no coordinates in their URL")
+    logger.info(f"Located {len(updates)} bars in {db_path}")
+    return len(updates)
+
+def migrate(db_path: str = BARS_DB, drop_text: bool = False):
+    """Apply every migration to *db_path*."""
+    migrate_updated_at(db_path)
+    migrate_embeddings(db_path, drop_text=drop_text)
+    migrate_coordinates(db_path)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Migrate bar databases to the current schema")
+    parser.add_argument("db_paths", nargs="*", default=[BARS_DB], help="Bars databases to migrate")
+    parser.add_argument("--drop-text", action="store_true", help="Clear the legacy JSON embedding column")
+    args = parser.parse_args(argv)
+
+    for db_path in args.db_paths:
+        migrate(db_path, drop_text=args.drop_text)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 import sqlite3
+import numpy as np
+from typing import List, Optional, Sequence
 from barhopping.config import BARS_DB
 
+# Embeddings are stored as raw little-endian float32 bytes
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+# Current Unix time in seconds (millisecond precision), evaluated by SQLite
+SQL_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
 def init_bars():
     query = """
         CREATE TABLE IF NOT EXISTS bars (
@@ -12,14 +20,23 @@ def init_bars():
             rating TEXT,
             photo TEXT,
             summary TEXT,
-            embedding TEXT
+            embedding TEXT,
+            embedding_f32 BLOB,
+            updated_at REAL,
+            lat REAL,
+            lng REAL
         );
     """
     with sqlite3.connect(BARS_DB) as conn:
         conn.execute(query)
+        ensure_column(conn, "bars", "embedding_f32", "BLOB")
+        ensure_column(conn, "bars", "lat", "REAL")
+        ensure_column(conn, "bars", "lng", "REAL")
+        ensure_updated_at(conn)
         conn.commit()
 
-def insert_bar(bar: dict):
+def insert_bar(bar: dict) -> int:
+    """Insert *bar* and return its row id."""
     columns = ", ".join(bar.keys())
     placeholders = ", ".join("?" for _ in bar)
     values = list(bar.values())
@@ -27,5 +44,73 @@ def insert_bar(bar: dict):
     query = f"INSERT INTO bars ({columns}) VALUES ({placeholders})"
 
     with sqlite3.connect(BARS_DB) as conn:
-        conn.execute(query, values)
-        conn.commit()
\ No newline at end of file
+        row_id = conn.execute(query, values).lastrowid
+        conn.commit()
+    return row_id
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Return the column names of *table* (lower-cased)."""
+    return [row[1].lower() for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def ensure_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> bool:
+    """Add *column* to *table* if it is missing. Returns True if it was added."""
+    if column.lower() in table_columns(conn, table):
+        return False
+    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+def encode_embedding(vec: Sequence[float]) -> bytes:
+    """Serialize an embedding vector to a little-endian float32 BLOB."""
+    return np.asarray(vec, dtype=EMBEDDING_DTYPE).reshape(-1).tobytes()
+
+def decode_embeddings(blobs: Sequence[bytes], dim: Optional[int] = None) -> np.ndarray:
+    """Decode float32 BLOBs into an ``(n, dim)`` matrix with a single ``np.frombuffer``."""
+    if not blobs:
+        return np.zeros((0, dim or 0), dtype=np.float32)
+    dim = dim or len(blobs[0]) // EMBEDDING_DTYPE.itemsize
+    if any(len(b) != dim * EMBEDDING_DTYPE.itemsize for b in blobs):
+        raise ValueError("Embedding BLOBs have inconsistent dimensions")
+    matrix = np.frombuffer(b"".join(blobs), dtype=EMBEDDING_DTYPE).reshape(len(blobs), dim)
+    return matrix.astype(np.float32, copy=False)
+
+def ensure_updated_at(conn: sqlite3.Connection) -> bool:
+    """Add ``bars.updated_at`` and the triggers that stamp it on every insert and update.
+
+    Existing rows are stamped with the current time when the column is added.
+    Returns True if the column was added.
+    """
+    added = ensure_column(conn, "bars", "updated_at", "REAL")
+    if added:
+        conn.execute(f"UPDATE bars SET updated_at = {SQL_NOW}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bars_updated_at ON bars(updated_at)")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bars_stamp_insert AFTER INSERT ON bars
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE bars SET updated_at = {SQL_NOW} WHERE id = NEW.id;
+        END;
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS bars_stamp_update AFTER UPDATE ON bars
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE bars SET updated_at = {SQL_NOW} WHERE id = NEW.id;
+        END;
+    """)
+    return added
+
+def ensure_bar_distances(conn: sqlite3.Connection):
+    """Create the ``bar_distances`` cache of walking distances, one row per bar pair and source.
+
+    Pairs are stored once with ``bar_a < bar_b``.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bar_distances (
+            bar_a INTEGER NOT NULL,
+            bar_b INTEGER NOT NULL,
+            meters REAL NOT NULL,
+            source TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY (bar_a, bar_b, source)
+        );
+    """)
@@ -0,0 +1,84 @@
+import argparse
+import sqlite3
+from typing import List, Sequence, Tuple
+from barhopping.config import BARS_DB, QUERIES_DB, EMBEDDING_BATCH_SIZE
+from barhopping.database.sqlite import ensure_column, encode_embedding
+from barhopping.embedding.granite import get_embeddings
+from barhopping.logger import logger
+
+# Forward passes embedded between commits
+_BATCHES_PER_COMMIT = 16
+
+def embed_rows(conn: sqlite3.Connection, table: str, rows: Sequence[Tuple[int, str]], batch_size: int):
+    """Embed ``(id, text)`` *rows* into ``embedding_f32`` of *table*.
+
+    Rows are embedded and committed a chunk at a time, so an interrupted or
+    failed run keeps what it finished and a rerun picks up the rest.
+    """
+    chunk = batch_size * _BATCHES_PER_COMMIT
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        embeddings = get_embeddings([text for _, text in block], batch_size=batch_size)
+        conn.executemany(
+            f"UPDATE {table} SET embedding_f32 = ? WHERE id = ?",
+            [(encode_embedding(emb), row_id) for (row_id, _), emb in zip(block, embeddings)]
+        )
+        conn.commit()
+        if len(rows) > chunk:
+            logger.info(f"Embedded {start + len(block)}/{len(rows)} {table} rows")
+
+def _embed_table(db_path: str, table: str, text_column: str, batch_size: int, overwrite: bool) -> int:
+    """Fill ``embedding_f32`` of every row of *table* from *text_column* in batched forward passes."""
+    with sqlite3.connect(db_path) as conn:
+        ensure_column(conn, table, "embedding_f32", "BLOB")
+        where = f"{text_column} IS NOT NULL AND {text_column} != ''"
+        if not overwrite:
+            where += " AND embedding_f32 IS NULL"
+        rows = conn.execute(f"SELECT id, {text_column} FROM {table} WHERE {where} ORDER BY id").fetchall()
+        if not rows:
+            logger.info(f"No {table} rows to embed in {db_path}")
+            return 0
+
+        logger.info(f"Embedding {len(rows)} {table} rows from {db_path}")
+        embed_rows(conn, table, rows, batch_size)
+    return len(rows)
+
+def embed_bars(db_path: str = BARS_DB, batch_size: int = EMBEDDING_BATCH_SIZE, overwrite: bool = False) -> int:
+    """Embed bar summaries that have no embedding yet.
+
+    Args:
+        db_path: Path to the bars database
+        batch_size: Texts per forward pass
+        overwrite: Re-embed every summary, e.g. after changing the model
+    Returns:
+        Number of bars embedded
+    """
+    return _embed_table(db_path, "bars", "summary", batch_size, overwrite)
+
+def embed_questions(db_path: str = QUERIES_DB, batch_size: int = EMBEDDING_BATCH_SIZE, overwrite: bool = False) -> int:
+    """Embed the generated ``bar_questions`` that have no embedding yet.
+
+    Args:
+        db_path: Path to the queries database
+        batch_size: Texts per forward pass
+        overwrite: Re-embed every question
+    Returns:
+        Number of questions embedded
+    """
+    return _embed_table(db_path, "bar_questions", "question_text", batch_size, overwrite)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Embed bar summaries and generated questions in bulk")
+    parser.add_argument("--bars-db", default=BARS_DB, help="Bars database")
+    parser.add_argument("--queries-db", default=QUERIES_DB, help="Queries database with bar_questions")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Texts per forward pass")
+    parser.add_argument("--overwrite", action="store_true", help="Re-embed rows that already have an embedding")
+    parser.add_argument("--skip-questions", action="store_true", help="Only embed bar summaries")
+    args = parser.parse_args(argv)
+
+    embed_bars(args.bars_db, args.batch_size, args.overwrite)
+    if not args.skip_questions:
+        embed_questions(args.queries_db, args.batch_size, args.overwrite)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import time
+import numpy as np
+from typing import Dict, Optional
+from barhopping.cache import LRUCache, normalize_query
+from barhopping.database.sqlite import encode_embedding, decode_embeddings
+from barhopping.logger import logger
+
+# Prune the persistent store every this many writes
+_PRUNE_EVERY = 256
+
+def file_checksum(path: str) -> str:
+    """SHA-1 of a file's contents, or ``none`` if it does not exist."""
+    if not os.path.exists(path):
+        return "none"
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class EmbeddingCache:
+    """LRU cache of query embeddings, optionally persisted to a SQLite file.
+
+    Keys hash the model name and the adapter checksum together with the
+    normalized text, so a different model or a retrained adapter never
+    reuses stale vectors.
+    """
+
+    def __init__(self, model_name: str, adapter_checksum: str, max_entries: int = 4096, path: Optional[str] = None):
+        self.namespace = f"{model_name}|{adapter_checksum}"
+        self.path = path
+        self.memory = LRUCache(max_entries)
+        self._writes = 0
+        if path:
+            self._open()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.namespace}|{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.memory.get(self.key(text))
+
+    def put(self, text: str, vector: np.ndarray):
+        key = self.key(text)
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        self.memory.put(key, vector)
+        if self.path:
+            self._persist(key, vector)
+
+    def stats(self) -> Dict[str, float]:
+        return self.memory.stats()
+
+    def _open(self):
+        """Create the persistent store and warm the LRU with its most recent entries."""
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            rows = conn.execute(
+                "SELECT key, vector FROM embedding_cache ORDER BY created_at DESC LIMIT ?",
+                (self.memory.max_entries,)
+            ).fetchall()
+        # Insert oldest first so the most recent end up most recently used
+        for key, blob in reversed(rows):
+            self.memory.put(key, decode_embeddings([blob])[0])
+        logger.info(f"Loaded {len(rows)} cached query embeddings from {self.path}")
+
+    def _persist(self, key: str, vector: np.ndarray):
+        try:
+            with sqlite3.connect(self.path) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO embedding_cache (key, vector, created_at) VALUES (?, ?, ?)",
+                    (key, encode_embedding(vector), time.time())
+                )
+                self._writes += 1
+                if self._writes % _PRUNE_EVERY == 0:
+                    conn.execute(
+                        "DELETE FROM embedding_cache WHERE key NOT IN "
+                        "(SELECT key FROM embedding_cache ORDER BY created_at DESC LIMIT ?)",
+                        (self.memory.max_entries,)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist query embedding: {e}")
@@ -1,11 +1,19 @@
 import os
+import threading
+import time
+import numpy as np
 import torch
+from typing import List, Optional, Sequence, Union
 from torch import nn
-from transformers import AutoTokenizer, AutoModel
-from barhopping.config import GRANITE_MODEL
-
-tokenizer = AutoTokenizer.from_pretrained(GRANITE_MODEL)
-model_em = AutoModel.from_pretrained(GRANITE_MODEL).eval()
+from transformers import AutoTokenizer
+from barhopping.config import (
+    GRANITE_MODEL, EMBEDDING_BACKEND, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_BATCH_SIZE, MODEL_SERVER,
+    EMBEDDING_WARMUP
+)
+from barhopping.inference import hidden_size, load_model
+from barhopping.serving.client import get_model_client
+from barhopping.embedding.cache import EmbeddingCache, file_checksum
+from barhopping.logger import logger
 
 # Adapter setup
 ADAPTER_PATH = os.path.abspath(
@@ -20,28 +28,183 @@ class LinearAdapter(nn.Module):
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         return self.linear(x)
 
-# Load adapter if available
-adapter = None
-with torch.no_grad():
+class GraniteEncoder:
+    """The Granite tokenizer and model, plus the linear adapter if one was trained."""
+
+    def __init__(self, model_name: str = GRANITE_MODEL, adapter_path: str = ADAPTER_PATH,
+                 backend: str = EMBEDDING_BACKEND):
+        logger.info(f"Loading embedding model {model_name} ({backend})")
+        self.backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = load_model(model_name, "embedding", backend)
+        self.hidden_size = hidden_size(model_name)
+        self.adapter = self._load_adapter(adapter_path)
+
+    def _load_adapter(self, path: str) -> Optional[LinearAdapter]:
+        if not os.path.exists(path):
+            return None
+        try:
+            adapter = LinearAdapter(self.hidden_size)
+            adapter.load_state_dict(torch.load(path, map_location="cpu"))
+            return adapter.eval()
+        except Exception as e:
+            logger.warning(f"Could not load adapter: {e}")
+            return None
+
+    def forward(self, inputs) -> torch.Tensor:
+        """L2-normalized CLS embeddings for tokenized *inputs*."""
+        with torch.no_grad():
+            cls_embedding = self.model(**inputs)[0][:, 0]  # CLS token
+            if self.adapter is not None:
+                cls_embedding = self.adapter(cls_embedding)
+            normalized = torch.nn.functional.normalize(cls_embedding, dim=1)
+        return normalized
+
+    def encode(self, texts: List[str]) -> torch.Tensor:
+        return self.forward(self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt"))
+
+# Global instances, created on first use
+_lock = threading.Lock()
+_encoder = None
+_embedding_cache = None
+_status = "not loaded"
+
+def get_encoder() -> GraniteEncoder:
+    """Return the singleton encoder, loading it on first use."""
+    global _encoder, _status
+    if _encoder is None:
+        with _lock:
+            if _encoder is None:
+                _status = "loading"
+                try:
+                    _encoder = GraniteEncoder()
+                except Exception:
+                    _status = "failed"
+                    raise
+                if _status == "loading":
+                    _status = "ready"
+    return _encoder
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the query embedding cache, invalidated by a different model or a retrained adapter."""
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(
+                    f"{GRANITE_MODEL}:{EMBEDDING_BACKEND}",
+                    file_checksum(ADAPTER_PATH),
+                    max_entries=EMBEDDING_CACHE_SIZE,
+                    path=EMBEDDING_CACHE_PATH,
+                )
+    return _embedding_cache
+
+def encoder_status() -> str:
+    """One of ``not loaded``, ``lazy``, ``loading``, ``warming up``, ``ready`` or ``failed``.
+
+    ``lazy`` means the encoder is not loaded yet and, with ``embedding_warmup`` off,
+    will only be loaded by the first query.
+    """
+    if _status == "not loaded" and not EMBEDDING_WARMUP:
+        return "lazy"
+    return _status
+
+def is_ready() -> bool:
+    """Whether queries can be sent: the encoder is ready, or by configuration loads on the first one."""
+    return encoder_status() in ("ready", "lazy")
+
+def warm_up(background: bool = True) -> Optional[threading.Thread]:
+    """Load the encoder and run a dummy forward pass so the first query is not slowed down.
+
+    Args:
+        background: Run in a daemon thread and return it instead of blocking
+    """
+    if background:
+        thread = threading.Thread(target=warm_up, args=(False,), name="granite-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    global _status
     try:
-        hidden_size = model_em.config.hidden_size
-        adapter = LinearAdapter(hidden_size)
-
-        if os.path.exists(ADAPTER_PATH):
-            state_dict = torch.load(ADAPTER_PATH, map_location="cpu")
-            adapter.load_state_dict(state_dict)
-            adapter.eval()
-        else:
-            adapter = None
+        if MODEL_SERVER:
+            get_model_client().ping()
+            _status = "ready"
+            logger.info(f"Using the model server at {MODEL_SERVER}")
+            return None
+        encoder = get_encoder()
+        _status = "warming up"
+        start = time.perf_counter()
+        encoder.encode(["warm-up query for the embedding model"])
+        _status = "ready"
+        logger.info(f"Embedding model warmed up in {time.perf_counter() - start:.2f}s")
     except Exception as e:
-        print(f"[Warning] Could not load adapter: {e}")
-        adapter = None
-
-def get_embedding(text: str) -> torch.Tensor:
-    inputs = tokenizer(text, padding=True, truncation=True, return_tensors="pt")
-    with torch.no_grad():
-        cls_embedding = model_em(**inputs)[0][:, 0]  # CLS token
-        if adapter is not None:
-            cls_embedding = adapter(cls_embedding)
-        normalized = torch.nn.functional.normalize(cls_embedding, dim=1)
-    return normalized
+        _status = "failed"
+        logger.error(f"Embedding model warm-up failed: {e}")
+    return None
+
+def _encode(texts: List[str]) -> torch.Tensor:
+    """Embed *texts* on the model server if one is configured, else in-process."""
+    if MODEL_SERVER:
+        return torch.from_numpy(get_model_client().embed(texts))
+    return get_encoder().encode(texts)
+
+def get_embedding(text: Union[str, List[str]], use_cache: bool = True) -> torch.Tensor:
+    """Embed one text, or a list of texts in a single padded forward pass.
+
+    Args:
+        text: Query text or list of texts
+        use_cache: Look texts up in (and add them to) the query embedding cache;
+            disable for one-off texts such as bar summaries
+    Returns:
+        ``(batch, hidden)`` tensor of L2-normalized embeddings
+    """
+    texts = [text] if isinstance(text, str) else list(text)
+    if not use_cache or EMBEDDING_CACHE_SIZE <= 0:
+        return _encode(texts)
+
+    embedding_cache = get_embedding_cache()
+    vectors = [embedding_cache.get(t) for t in texts]
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fresh = dict(zip(missing, _encode(missing).cpu().numpy()))
+        for t, v in fresh.items():
+            embedding_cache.put(t, v)
+        vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+    return torch.from_numpy(np.stack(vectors))
+
+def get_embeddings(texts: Sequence[str], batch_size: int = EMBEDDING_BATCH_SIZE,
+                   sort_by_length: bool = True) -> np.ndarray:
+    """Embed a corpus of texts in fixed-size batches.
+
+    Texts are tokenized once and, by default, sorted by token length so each
+    batch is padded only to its own longest text. The cache is bypassed.
+
+    Args:
+        texts: Texts to embed
+        batch_size: Texts per forward pass
+        sort_by_length: Bucket texts of similar length together
+    Returns:
+        Contiguous ``(len(texts), hidden)`` float32 array in input order
+    """
+    texts = list(texts)
+    if MODEL_SERVER:
+        # One request per batch, so each answer arrives well within the client timeout
+        client = get_model_client()
+        chunks = [client.embed(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        if not chunks:
+            chunks = [client.embed([])]
+        return np.ascontiguousarray(np.concatenate(chunks), dtype=np.float32)
+    encoder = get_encoder()
+    out = np.empty((len(texts), encoder.hidden_size), dtype=np.float32)
+    if not texts:
+        return out
+
+    encoded = encoder.tokenizer(texts, truncation=True)
+    lengths = np.array([len(ids) for ids in encoded["input_ids"]])
+    order = np.argsort(lengths, kind="stable") if sort_by_length else np.arange(len(texts))
+    for start in range(0, len(texts), batch_size):
+        idx = order[start:start + batch_size]
+        features = [{key: encoded[key][i] for key in encoded.keys()} for i in idx]
+        inputs = encoder.tokenizer.pad(features, return_tensors="pt")
+        out[idx] = encoder.forward(inputs).cpu().numpy()
+    return out
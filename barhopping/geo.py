@@ -0,0 +1,28 @@
+import re
+import numpy as np
+from typing import Optional, Tuple
+
+# Google Maps place URLs embed the pin as ...!3d<lat>!4d<lng>...
+_PLACE_COORDS = re.compile(r"!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)")
+
+def coords_from_url(url: str) -> Optional[Tuple[float, float]]:
+    """Extract ``(lat, lng)`` from a Google Maps place URL, or None if absent."""
+    match = _PLACE_COORDS.search(url or "")
+    if not match:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+# Mean Earth radius in metres
+EARTH_RADIUS_M = 6371008.8
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres; arguments broadcast like NumPy arrays."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_matrix(lats, lngs) -> np.ndarray:
+    """``(n, n)`` great-circle distances in metres between every pair of points."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    return haversine_m(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
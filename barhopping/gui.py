@@ -1,46 +1,58 @@
 import gradio as gr
 import asyncio
-from typing import List
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from barhopping.config import (
+    TOP_K, EMBEDDING_WARMUP, MODEL_SERVER, ROUTE_WALK_BUDGET, ROUTE_POOL_SIZE, ROUTE_PREVIEW,
+    GUI_MAX_CONCURRENCY, GUI_QUEUE_TIMEOUT, GUI_INFERENCE_WORKERS, GUI_ROUTE_WORKERS
+)
+from barhopping.embedding.granite import encoder_status, warm_up
 from barhopping.retriever.vector_search import get_vector_search
 from barhopping.path_finder import PathFinder
+from barhopping.routing.distance import Place
+from barhopping.routing.maps import directions_url, route_svg
+from barhopping.serving.admission import AdmissionControl, Overloaded
 from barhopping.logger import logger
 
+EXAMPLES = [
+    "Bars with retro arcade vibes and playful, neon-lit interiors",
+    "Cozy bars with dim lighting and jazz music for a relaxed evening",
+    "Trendy rooftop bars with great views and photogenic cocktails",
+    "Speakeasy-style spots with hidden entrances and vintage aesthetics"
+]
+
+class _Superseded(Exception):
+    """The session sent a newer message; the remaining stages of this one are dropped.
+
+    Args:
+        running: The worker still running the stage that was being awaited, if any
+    """
+
+    def __init__(self, running: Optional[asyncio.Future] = None):
+        super().__init__()
+        self.running = running
+
 class BarHoppingGUI:
     def __init__(self):
         self.vector_search = get_vector_search()
         self.path_finder = PathFinder()
-        self.browser = None
-        
-    def _init_browser(self):
-        """Initialize the browser if not already initialized."""
-        if self.browser is None:
-            try:
-                options = webdriver.ChromeOptions()
-                options.add_argument("--headless")  # Run in headless mode
-                options.add_argument("--no-sandbox")
-                options.add_argument("--disable-dev-shm-usage")
-                self.browser = webdriver.Chrome(options=options)
-                logger.info("Browser initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize browser: {str(e)}")
-                raise
-        
-    def _cleanup_browser(self):
-        """Clean up browser resources."""
-        if self.browser is not None:
-            try:
-                self.browser.quit()
-                self.browser = None
-                logger.info("Browser closed successfully")
-            except Exception as e:
-                logger.error(f"Error closing browser: {str(e)}")
-        
+        # Results per search: a walking-budget route is chosen from a larger pool. The warm-up
+        # uses the same number, since it is part of the result cache key
+        self.search_top_k = ROUTE_POOL_SIZE if ROUTE_WALK_BUDGET else TOP_K
+        # Blocking work runs off the event loop: model inference and routing (which may drive browsers)
+        # each get their own bounded pool, so neither can starve the other or freeze other sessions
+        self.inference_executor = ThreadPoolExecutor(GUI_INFERENCE_WORKERS, thread_name_prefix="gui-inference")
+        self.route_executor = ThreadPoolExecutor(GUI_ROUTE_WORKERS, thread_name_prefix="gui-route")
+        self.admission = AdmissionControl(GUI_MAX_CONCURRENCY, GUI_QUEUE_TIMEOUT or None)
+        # Cancellation flag of the request in progress, per chat session
+        self._sessions: Dict[str, asyncio.Event] = {}
+        # Seconds from request to each stage, for the latest requests
+        self.timings = deque(maxlen=1000)
+
     def _bar_html(self, name: str, url: str, address: str, photo: str, summary: str) -> str:
         """Generate HTML for a bar card."""
         if photo:
@@ -68,7 +80,7 @@ class BarHoppingGUI:
         </div>
         """
        
-    def _map_html(self, url: str) -> str:
+    def _map_html(self, url: str, preview: str = "") -> str:
         """Render route map preview HTML."""
         return f"""
         <div style="padding: 10px; font-family:'Segoe UI', sans-serif; background:#1e1e1e; 
@@ -78,79 +90,161 @@ class BarHoppingGUI:
                     View Route on Google Maps »
                 </a>
             </p>
+            {preview}
         </div>
         """
-        
-    async def _get_route_url(self, addresses: List[str]) -> str:
-        """Create a Google Maps walking route for the bar path."""
+
+    def _route(self, bars: List[Dict[str, Any]]) -> Tuple[List[int], List[float]]:
+        """Choose and order the bars to visit (blocking: distance lookups and route solving)."""
+        if ROUTE_WALK_BUDGET:
+            return self.path_finder.plan_route(bars, ROUTE_WALK_BUDGET)
+        bar_ids = [bar["id"] for bar in bars]
+        bar_addrs = [f"{bar['name']}, {bar['address']}" for bar in bars]
+        bar_coords = [(bar["lat"], bar["lng"]) for bar in bars]
+        return self.path_finder.find_optimal_path(bar_ids, bar_addrs, bar_coords)
+
+    def _stage_html(self, text: str) -> str:
+        return f"<p style='font-size: 13px; color: #888; font-style: italic;'>{text}</p>"
+
+    def _cards(self, bars: List[Dict[str, Any]]) -> List[str]:
+        return [
+            self._bar_html(bar["name"], bar["URL"], bar["address"],
+                           bar.get("photo", ""), bar.get("summary", "No description available"))
+            for bar in bars
+        ]
+
+    def _start_session(self, request: Optional[gr.Request]) -> asyncio.Event:
+        """Cancel the session's request in progress, if any, and return the new request's cancellation flag."""
+        cancelled = asyncio.Event()
+        session = getattr(request, "session_hash", None)
+        if session is not None:
+            previous = self._sessions.get(session)
+            if previous is not None:
+                previous.set()
+            self._sessions[session] = cancelled
+        return cancelled
+
+    def _end_session(self, request: Optional[gr.Request], cancelled: asyncio.Event):
+        session = getattr(request, "session_hash", None)
+        if session is not None and self._sessions.get(session) is cancelled:
+            del self._sessions[session]
+
+    async def _run(self, executor: ThreadPoolExecutor, cancelled: asyncio.Event, fn, *args):
+        """Run blocking *fn* on *executor*, and stop waiting for it if the request is cancelled.
+
+        The worker thread cannot be interrupted; a cancelled stage finishes in
+        the background and its result is dropped. The raised ``_Superseded``
+        carries its future so the caller can clean up once it is done.
+        """
+        if cancelled.is_set():
+            raise _Superseded
+        future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        waiter = asyncio.ensure_future(cancelled.wait())
         try:
-            self._init_browser()
-            self.browser.get("https://www.google.com/maps/dir/")
-            self.browser.maximize_window()
-
-            # Select walking mode
-            WebDriverWait(self.browser, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "m6Uuef")))
-            for btn in self.browser.find_elements(By.CLASS_NAME, "m6Uuef"):
-                if btn.get_attribute("data-tooltip") == "Walking":
-                    btn.click()
-                    break
-
-            # Add all addresses
-            inputs = self.browser.find_elements(By.CLASS_NAME, "tactile-searchbox-input")
-            inputs[0].send_keys(addresses[0])
-            inputs[1].send_keys(addresses[1])
-            inputs[1].send_keys(Keys.ENTER)
-            await asyncio.sleep(2)
-
-            for addr in addresses[2:]:
-                self.browser.find_elements(By.CLASS_NAME, "fC7rrc")[-1].click()
-                await asyncio.sleep(2)
-                input_field = self.browser.find_elements(By.CLASS_NAME, "tactile-searchbox-input")[-1]
-                input_field.send_keys(addr)
-                input_field.send_keys(Keys.ENTER)
-                await asyncio.sleep(2)
-
-            return self.browser.current_url
-
-        except WebDriverException as e:
-            logger.error(f"Browser error: {e}")
-            self._cleanup_browser()
-            self._init_browser()
-            raise
-        except Exception as e:
-            logger.error(f"Error generating route: {e}")
-            raise
-        
-    async def bar_recommendation(self, message: str, history):
-        """Generate bar recommendations and route from user query."""
+            await asyncio.wait({future, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if cancelled.is_set():
+            raise _Superseded(None if future.done() else future)
+        return future.result()
+
+    @staticmethod
+    def _close_when_done(stages: Iterator, running: Optional[asyncio.Future]):
+        """Close the search generator *stages* once the stage still *running* on a worker, if any, returns.
+
+        A generator cannot be closed while a worker is executing it; closing it
+        as soon as it is suspended stops, e.g., reranking after the candidates.
+        """
+        if running is None:
+            stages.close()
+        else:
+            running.add_done_callback(lambda _: stages.close())
+
+    async def bar_recommendation(self, message: str, history, request: gr.Request = None):
+        """Generate bar recommendations and route from user query.
+
+        Results stream in stages: first-stage hits as soon as retrieval is done,
+        reranked cards, the ordered route with leg distances, and the map last.
+        A newer message from the same session cancels the stages still to come:
+        the stage running at that moment (e.g. reranking) still runs to completion,
+        but the search is then closed, so the stages after it are never computed.
+        """
+        cancelled = self._start_session(request)
+        start = time.perf_counter()
+        timings = {}
+        stages = None
         try:
-            response = []
-            bars = self.vector_search.search(message)
-            bar_ids = [bar["id"] for bar in bars]
-            bar_addrs = [f"{bar['name']}, {bar['address']}" for bar in bars]
-
-            path, distances = self.path_finder.find_optimal_path(bar_ids, bar_addrs)
-            path_addrs = [bar_addrs[i] for i in path]
-            route_task = asyncio.create_task(self._get_route_url(path_addrs))
-
-            for i, path_idx in enumerate(path):
-                bar = bars[path_idx]
-                response.append(self._bar_html(
-                    bar["name"], bar["URL"], bar["address"],
-                    bar.get("photo", ""), bar.get("summary", "No description available")
-                ))
-                if i < len(distances):
-                    response.append(self._path_html(distances[i]))
+            async with self.admission.slot():
+                stages = self.vector_search.search_stages(message, top_k=self.search_top_k)
+                bars = []
+                # 1 and 2: first-stage hits, then the reranked cards
+                while (stage := await self._run(self.inference_executor, cancelled, next, stages, None)) is not None:
+                    name, bars = stage
+                    timings[name] = time.perf_counter() - start
+                    note = "Reranking the best matches..." if name == "candidates" else "Planning your route..."
+                    yield self._cards(bars[:TOP_K]) + [self._stage_html(note)]
+                if not bars:
+                    yield ["No bars matched your request. Try describing the vibe differently!"]
+                    return
+
+                # 3: the ordered route with leg distances
+                path, distances = await self._run(self.route_executor, cancelled, self._route, bars)
+                timings["route"] = time.perf_counter() - start
+                response = []
+                for i, card in enumerate(self._cards([bars[i] for i in path])):
+                    response.append(card)
+                    if i < len(distances):
+                        response.append(self._path_html(distances[i]))
                 yield response
 
-            route_url = await route_task
-            response.append(self._map_html(route_url))
-            yield response
+                # 4: the map link and preview
+                if cancelled.is_set():
+                    raise _Superseded
+                stops = [
+                    Place(f"{bars[i]['name']}, {bars[i]['address']}",
+                          *(math.nan if bars[i].get(k) is None else bars[i][k] for k in ("lat", "lng")))
+                    for i in path
+                ]
+                preview = route_svg(stops, [bars[i]["name"] for i in path]) if ROUTE_PREVIEW else ""
+                response.append(self._map_html(directions_url(stops), preview))
+                timings["map"] = time.perf_counter() - start
+                yield response
 
+        except _Superseded as superseded:
+            logger.info("Dropped the rest of a request superseded by a newer message")
+            if stages is not None:
+                self._close_when_done(stages, superseded.running)
+        except Overloaded as e:
+            logger.warning(f"Turned a request away: {e}")
+            yield ["So many people are planning their night right now! Please try again in a moment."]
         except Exception as e:
             logger.error(f"Recommendation error: {e}")
             yield ["Sorry, an error occurred while processing your request."]
+        finally:
+            self._end_session(request, cancelled)
+            if timings:
+                timings["first_card"] = min(timings.get("candidates", math.inf), timings.get("reranked", math.inf))
+                timings["total"] = time.perf_counter() - start
+                self.timings.append(timings)
+                logger.info(f"First card after {timings['first_card']:.2f}s, finished after {timings['total']:.2f}s")
         
+    def _warm_up(self):
+        """Load the embedding model, then answer the examples so they are served from cache."""
+        # With a model server, warming up is only a ping, and it is what marks the search model ready
+        if EMBEDDING_WARMUP or MODEL_SERVER:
+            warm_up(background=False)
+        try:
+            self.vector_search.prewarm(EXAMPLES, top_k=self.search_top_k)
+        except Exception as e:
+            logger.warning(f"Could not pre-warm the result cache: {e}")
+
+    def _status_html(self) -> str:
+        """Readiness of the embedding model, shown above the chat."""
+        status = encoder_status()
+        color = {"ready": "#4ade80", "lazy": "#4ade80", "failed": "#f87171"}.get(status, "#fbbf24")
+        label = "loads on the first search" if status == "lazy" else status
+        return f"<p style='text-align:right; font-size:12px; color:{color};'>● Search model {label}</p>"
+
     def launch(self) -> None:
         """Launch the Gradio chatbot interface."""
         css = """
@@ -163,31 +257,29 @@ class BarHoppingGUI:
             .message img { max-width: 100% !important; height: auto !important; }
             .description { color: white !important; }
         """
-        try:
-            with gr.Blocks(fill_height=True, css=css) as demo:
-                gr.ChatInterface(
-                    fn=self.bar_recommendation,
-                    description="<strong><span style='color:#fbbf24;'>RunTini</span></strong> <span style='color:white;'>Bar Hopping Route Recommender</span>",
-                    textbox=gr.Textbox(
-                        placeholder="Think aesthetics, music, drinks, and crowd...",
-                        submit_btn=True
-                    ),
-                    chatbot=gr.Chatbot(
-                        elem_classes=["chatbox"],
-                        placeholder="Let's map out your perfect night — pick a vibe or tell me yours! 🍸✨",
-                        bubble_full_width=False,
-                        avatar_images=["./images/user_avatar.png", "./images/bot_avatar.png"],
-                        show_label=False,
-                        type="messages"
-                    ),
-                    examples=[
-                        "Bars with retro arcade vibes and playful, neon-lit interiors",
-                        "Cozy bars with dim lighting and jazz music for a relaxed evening",
-                        "Trendy rooftop bars with great views and photogenic cocktails",
-                        "Speakeasy-style spots with hidden entrances and vintage aesthetics"
-                    ],
+        threading.Thread(target=self._warm_up, name="gui-warmup", daemon=True).start()
+
+        with gr.Blocks(fill_height=True, css=css) as demo:
+            status = gr.HTML(self._status_html())
+            gr.Timer(2).tick(self._status_html, outputs=status)
+            gr.ChatInterface(
+                fn=self.bar_recommendation,
+                description="<strong><span style='color:#fbbf24;'>RunTini</span></strong> <span style='color:white;'>Bar Hopping Route Recommender</span>",
+                textbox=gr.Textbox(
+                    placeholder="Think aesthetics, music, drinks, and crowd...",
+                    submit_btn=True
+                ),
+                chatbot=gr.Chatbot(
+                    elem_classes=["chatbox"],
+                    placeholder="Let's map out your perfect night — pick a vibe or tell me yours! 🍸✨",
+                    bubble_full_width=False,
+                    avatar_images=["./images/user_avatar.png", "./images/bot_avatar.png"],
+                    show_label=False,
                     type="messages"
-                )
-            demo.launch(share=True)
-        finally:
-            self._cleanup_browser()
+                ),
+                examples=EXAMPLES,
+                type="messages",
+                # Admission control is done by self.admission, so Gradio may start every request
+                concurrency_limit=None
+            )
+        demo.launch(share=True)
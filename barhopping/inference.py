@@ -0,0 +1,206 @@
+import argparse
+import os
+import sqlite3
+import time
+import numpy as np
+import torch
+from torch import nn
+from typing import Dict, List
+from transformers import AutoConfig, AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+from barhopping.config import (
+    BARS_DB, GRANITE_MODEL, RERANKER_MODEL, EMBEDDING_BACKEND, RERANKER_BACKEND, ONNX_DIR, PROJECT_ROOT
+)
+from barhopping.logger import logger
+
+# torch: stock fp32, torch-int8: dynamic int8 Linear layers,
+# onnx / onnx-int8: exported graph (optionally int8-quantized) run by ONNX Runtime
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Model kinds and the transformers class that loads each
+MODEL_CLASSES = {"embedding": AutoModel, "reranker": AutoModelForSequenceClassification}
+
+# Queries used by the parity check
+PARITY_QUERIES = [
+    "cozy bar with dim lighting and live jazz",
+    "rooftop cocktails with a city view",
+    "craft beer pub with a lively crowd",
+    "speakeasy with a hidden entrance",
+]
+
+class OnnxOutputs(tuple):
+    """Model outputs from ONNX Runtime, indexable like a transformers output tuple."""
+
+    @property
+    def logits(self) -> torch.Tensor:
+        return self[0]
+
+class OnnxModel:
+    """Callable wrapper around an ONNX Runtime session with the ``model(**inputs)`` interface."""
+
+    def __init__(self, path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backends require onnxruntime: pip install onnxruntime") from e
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def __call__(self, **inputs) -> OnnxOutputs:
+        feed = {name: inputs[name].cpu().numpy().astype(np.int64) for name in self.input_names}
+        return OnnxOutputs(torch.from_numpy(out) for out in self.session.run(None, feed))
+
+    def eval(self) -> "OnnxModel":
+        return self
+
+    def to(self, device) -> "OnnxModel":
+        return self
+
+def onnx_path(model_name: str, quantized: bool = False) -> str:
+    """Where the exported graph of *model_name* is stored."""
+    root = ONNX_DIR if os.path.isabs(ONNX_DIR) else os.path.join(PROJECT_ROOT, ONNX_DIR)
+    return os.path.join(root, model_name.replace("/", "--"), "model.int8.onnx" if quantized else "model.onnx")
+
+def hidden_size(model_name: str) -> int:
+    return AutoConfig.from_pretrained(model_name).hidden_size
+
+def load_model(model_name: str, kind: str, backend: str = "torch"):
+    """Load *model_name* for inference with the given backend.
+
+    Args:
+        model_name: Hugging Face model name
+        kind: ``embedding`` or ``reranker``
+        backend: One of ``BACKENDS``
+    Returns:
+        A callable model; the onnx backends return an ``OnnxModel``
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if backend.startswith("onnx"):
+        path = onnx_path(model_name, quantized=backend == "onnx-int8")
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"{path} not found; run `python -m barhopping.inference export --model {kind}"
+                + (" --quantize`" if backend == "onnx-int8" else "`")
+            )
+        logger.info(f"Loading {kind} model {model_name} from {path}")
+        return OnnxModel(path)
+
+    model = MODEL_CLASSES[kind].from_pretrained(model_name).eval()
+    if backend == "torch-int8":
+        model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    return model
+
+def export_onnx(model_name: str, kind: str, quantize: bool = False, opset: int = 17) -> str:
+    """Export *model_name* to ONNX, and optionally write a dynamic-int8 copy next to it.
+
+    Returns:
+        Path of the exported (quantized, if requested) graph
+    """
+    path = onnx_path(model_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = MODEL_CLASSES[kind].from_pretrained(model_name).eval()
+    sample = tokenizer(["a short query", "a somewhat longer sample document"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask") if name in sample]
+    output_name = "last_hidden_state" if kind == "embedding" else "logits"
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            path,
+            input_names=input_names,
+            output_names=[output_name],
+            dynamic_axes={
+                **{name: {0: "batch", 1: "sequence"} for name in input_names},
+                output_name: {0: "batch", 1: "sequence"} if kind == "embedding" else {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    logger.info(f"Exported {model_name} to {path}")
+
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            raise ImportError("Quantizing the ONNX graph requires onnxruntime: pip install onnxruntime") from e
+        quantized = onnx_path(model_name, quantized=True)
+        quantize_dynamic(path, quantized, weight_type=QuantType.QInt8)
+        logger.info(f"Wrote dynamic-int8 graph to {quantized}")
+        path = quantized
+    return path
+
+def sample_summaries(db_path: str = BARS_DB, n: int = 32) -> List[str]:
+    with sqlite3.connect(db_path) as conn:
+        return [s for (s,) in conn.execute(
+            "SELECT summary FROM bars WHERE summary IS NOT NULL AND summary != '' ORDER BY id LIMIT ?", (n,)
+        )]
+
+def check_parity(kind: str, backend: str, queries: List[str], documents: List[str]) -> Dict[str, float]:
+    """Compare a backend's outputs against the fp32 PyTorch model.
+
+    Embeddings are compared by cosine similarity; reranker scores by their
+    absolute difference and by whether each query keeps its top document.
+    """
+    from barhopping.embedding.granite import GraniteEncoder
+    from barhopping.retriever.reranker import Reranker
+
+    if kind == "embedding":
+        texts = queries + documents
+        reference = GraniteEncoder(backend="torch").encode(texts).numpy()
+        candidate = GraniteEncoder(backend=backend).encode(texts).numpy()
+        cosine = np.sum(reference * candidate, axis=1)
+        return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
+
+    pairs = [(q, d) for q in queries for d in documents]
+    reference = np.array(Reranker(backend="torch", device="cpu")._score(pairs, 16)).reshape(len(queries), -1)
+    candidate = np.array(Reranker(backend=backend, device="cpu")._score(pairs, 16)).reshape(len(queries), -1)
+    return {
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+        "top1_agreement": float(np.mean(reference.argmax(axis=1) == candidate.argmax(axis=1))),
+    }
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Export and verify the CPU inference backends")
+    subparsers = parser.add_subparsers(dest="command", required=True, help="Command to run")
+
+    export_parser = subparsers.add_parser("export", help="Export models to ONNX")
+    export_parser.add_argument("--model", choices=["embedding", "reranker", "all"], default="all")
+    export_parser.add_argument("--quantize", action="store_true", help="Also write a dynamic-int8 ONNX graph")
+    export_parser.add_argument("--opset", type=int, default=17)
+
+    parity_parser = subparsers.add_parser("parity", help="Compare a backend against fp32 PyTorch")
+    parity_parser.add_argument("--model", choices=["embedding", "reranker", "all"], default="all")
+    parity_parser.add_argument("--backend", choices=BACKENDS, help="Defaults to the configured backend")
+    parity_parser.add_argument("--db", default=BARS_DB, help="Bars database to sample documents from")
+    parity_parser.add_argument("--docs", type=int, default=16, help="Number of documents to compare")
+    parity_parser.add_argument("--min-cosine", type=float, default=0.99, help="Fail below this embedding cosine")
+    parity_parser.add_argument("--min-agreement", type=float, default=0.75, help="Fail below this reranker top-1 agreement")
+
+    args = parser.parse_args(argv)
+    kinds = ["embedding", "reranker"] if args.model == "all" else [args.model]
+    names = {"embedding": GRANITE_MODEL, "reranker": RERANKER_MODEL}
+
+    if args.command == "export":
+        for kind in kinds:
+            start = time.perf_counter()
+            export_onnx(names[kind], kind, quantize=args.quantize, opset=args.opset)
+            logger.info(f"Exported {kind} model in {time.perf_counter() - start:.1f}s")
+        return
+
+    documents = sample_summaries(args.db, args.docs)
+    failed = False
+    for kind in kinds:
+        backend = args.backend or (EMBEDDING_BACKEND if kind == "embedding" else RERANKER_BACKEND)
+        result = check_parity(kind, backend, PARITY_QUERIES, documents)
+        ok = (result["min_cosine"] >= args.min_cosine if kind == "embedding"
+              else result["top1_agreement"] >= args.min_agreement)
+        failed |= not ok
+        logger.info(f"{kind} {backend} vs torch fp32: {result} -> {'OK' if ok else 'FAIL'}")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,142 +1,132 @@
+import math
 import numpy as np
-import re
-from itertools import combinations
-from typing import List, Tuple
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from barhopping.config import ROUTE_MAX_STOPS
+from barhopping.routing.distance import DistanceProvider, HaversineProvider, Place, get_distance_provider
+from barhopping.routing.orienteering import orienteer
+from barhopping.routing.solver import solve
 from barhopping.logger import logger
 
 class PathFinder:
-    def __init__(self):
-        self.browser = None
-        
-    def _init_browser(self):
-        """Initialize the browser if not already initialized."""
-        if self.browser is None:
-            try:
-                options = webdriver.ChromeOptions()
-                options.add_argument("--headless")  # Run in headless mode
-                options.add_argument("--no-sandbox")
-                options.add_argument("--disable-dev-shm-usage")
-                self.browser = webdriver.Chrome(options=options)
-                logger.info("Browser initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize browser: {str(e)}")
-                raise
-    
-    def _close_browser(self):
-        """Closes the browser session if open."""
-        if self.browser:
-            try:
-                self.browser.quit()
-                logger.info("Browser closed successfully.")
-            except Exception as e:
-                logger.error(f"Error closing browser: {str(e)}")
-            finally:
-                self.browser = None
-    
-    def _get_distance(self, addr1: str, addr2: str, unit: str="m") -> float:
-        """Fetches walking distance between two addresses using Google Maps."""
-        try:
-            self._init_browser()
-            self.browser.get("https://www.google.com/maps/dir/")
-
-            # Click walking mode - wait for the button to be clickable
-            WebDriverWait(self.browser, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "m6Uuef"))
-            )
-            travel_btn = self.browser.find_elements(By.CLASS_NAME, "m6Uuef")
-            for btn in travel_btn:
-                if btn.get_attribute("data-tooltip") == "Walking":
-                    btn.click()
-                    break
+    def __init__(self, provider: Optional[DistanceProvider] = None):
+        """Initialize the path finder.
 
-            # Add two addresses
-            inputs = self.browser.find_elements(By.CLASS_NAME, "tactile-searchbox-input")
-            inputs[0].send_keys(addr1)
-            inputs[1].send_keys(addr2)
-            inputs[1].send_keys(Keys.ENTER)
+        Args:
+            provider: Distance provider; defaults to ``distance_provider`` in the config
+        """
+        self.provider = provider or get_distance_provider()
 
-            # Wait for the distance info to be present
-            WebDriverWait(self.browser, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "ivN21e"))
-            )
-            dist = self.browser.find_element(By.CLASS_NAME, "ivN21e")
-
-            conversion = {'km':1000, 'm':1, 'mile':1609.344, 'ft':0.3048}
-            convert_unit = lambda s: (
-                lambda m: float(m.group(1)) * conversion[m.group(2)] / conversion[unit] if m else 0
-            )(re.match(r'([\d.]+)\s*(mile|ft|km|m)', s))
-
-            return convert_unit(dist.text)
+    def _get_distance_matrix(self, places: List[Place]) -> np.ndarray:
+        """Builds a symmetric distance matrix between all bars."""
+        return self.provider.matrix(places)
         
-        except Exception as e:
-            logger.error(f"Error getting distance between '{addr1}' and '{addr2}': {str(e)}")
-            return float("inf")
+    def _hamiltonian_path(self, dist_matrix: np.ndarray, start: int = 0) -> Tuple[List[int], List[float]]:
+        """Computes the shortest Hamiltonian path from *start*, exactly for short routes and heuristically beyond."""
+        if len(dist_matrix) == 0:
+            logger.error("No valid Hamiltonian path found.")
+            return [], []
+        path = solve(dist_matrix, start)
+        distances = [dist_matrix[path[i]][path[i + 1]] for i in range(len(path) - 1)]
+        return path, distances
 
-    def _get_distance_matrix(self, addresses: List[str]) -> np.ndarray:
-        """Builds a symmetric distance matrix between all bar addresses."""
-        n = len(addresses)
-        matrix = np.zeros((n, n))
+    def find_optimal_path(self, bar_ids: List[int], addresses: List[str],
+                          coords: Optional[Sequence[Optional[Tuple[float, float]]]] = None) -> Tuple[List[int], List[float]]:
+        """Finds the optimal order to visit bars based on walking distance.
 
-        for i, j in combinations(range(n), 2):
-            dist = self._get_distance(addresses[i], addresses[j])
-            matrix[i][j] = matrix[j][i] = dist
-            logger.info(f"Distance between {addresses[i]} and {addresses[j]}: {dist} meters")
+        Args:
+            bar_ids: Ids of the bars to visit
+            addresses: Address of each bar
+            coords: ``(lat, lng)`` of each bar, or None where unknown; needed by the haversine provider
+        """
+        coords = coords or [None] * len(addresses)
+        places = [
+            Place(address, *(c if c and None not in c else (math.nan, math.nan)), bar_id=bar_id)
+            for bar_id, address, c in zip(bar_ids, addresses, coords)
+        ]
+        try:
+            dist_matrix = self._get_distance_matrix(places)
+            path, distances = self._hamiltonian_path(dist_matrix)
+            return path, distances
+        finally:
+            self.provider.close()
 
-        return matrix
-        
-    def _hamiltonian_path(self, dist_matrix: np.ndarray, start: int = 0) -> Tuple[List[int], List[float]]:
-        """Computes the shortest Hamiltonian path using dynamic programming."""
-        n = len(dist_matrix)
-        dp = {(1 << start, start): (0, -1)}
+    @staticmethod
+    def relevance(candidate: Dict[str, Any]) -> float:
+        """Non-negative relevance of a search result: sigmoid of its rerank score, else its vector score."""
+        if candidate.get("rerank_score") is not None:
+            return 1.0 / (1.0 + math.exp(-candidate["rerank_score"]))
+        return max(0.0, candidate.get("vector_score") or 0.0)
 
-        for subset_size in range(2, n + 1):
-            for subset in combinations(range(n), subset_size):
-                if start not in subset:
-                    continue
-                mask = sum(1 << i for i in subset)
-                for curr in subset:
-                    prev_mask = mask & ~(1 << curr)
-                    candidates = [
-                        (dp[(prev_mask, k)][0] + dist_matrix[k][curr], k)
-                        for k in subset if k != curr and (prev_mask, k) in dp
-                    ]
-                    if candidates:
-                        dp[(mask, curr)] = min(candidates)
+    def plan_route(self, candidates: List[Dict[str, Any]], budget_m: float,
+                   start: Optional[Tuple[float, float]] = None,
+                   max_stops: Optional[int] = ROUTE_MAX_STOPS) -> Tuple[List[int], List[float]]:
+        """Chooses which candidate bars to visit, and in what order, to collect the most relevance within a walking budget.
 
-        full_mask = (1 << n) - 1
-        candidates = [(dp[(full_mask, i)][0], i) for i in range(n) if (full_mask, i) in dp]
-        if not candidates:
-            logger.error("No valid Hamiltonian path found.")
-            return [], []
+        Args:
+            candidates: Search results with ``id``, ``name``, ``address``, ``lat``/``lng`` and ``rerank_score``
+            budget_m: Longest walk in metres
+            start: ``(lat, lng)`` to start walking from; by default the route starts at its first bar
+            max_stops: Most bars to visit
+        Returns:
+            Indices into *candidates* in visiting order, and the length of each leg;
+            with a *start* the first leg is the walk from it to the first bar
+        """
+        places = [
+            Place(f"{c['name']}, {c['address']}",
+                  *(math.nan if c.get(k) is None else c[k] for k in ("lat", "lng")), bar_id=c.get("id"))
+            for c in candidates
+        ]
+        scores = [self.relevance(c) for c in candidates]
+        if start is not None:
+            places.append(Place("start", *start))
+            scores.append(0.0)
 
-        _, last = min(candidates)
+        # Choose the stops on instant straight-line estimates; a looked-up provider
+        # (e.g. Google Maps) is then only asked about the few stops chosen
+        estimated = not isinstance(self.provider, HaversineProvider)
+        dist_matrix = (HaversineProvider() if estimated else self.provider).matrix(places)
+        path = orienteer(dist_matrix, scores, budget_m, start=len(candidates) if start is not None else None,
+                         max_stops=max_stops)
+        if estimated and path:
+            path, distances = self._recheck(places, scores, path, budget_m, start is not None)
+        else:
+            distances = [dist_matrix[path[i]][path[i + 1]] for i in range(len(path) - 1)]
+        order = path[1:] if start is not None else path
+        logger.info(f"Route of {len(order)}/{len(candidates)} bars, {sum(distances):.0f}/{budget_m:.0f} m")
+        return order, distances
 
-        # Backtrack to find the optimal path
-        path = [last]
-        mask = full_mask
-        while True:
-            _, prev = dp.get((mask, last), (None, None))
-            if prev == -1:
-                break
-            path.append(prev)
-            mask &= ~(1 << last)
-            last = prev
-        path.reverse()
+    def _recheck(self, places: List[Place], scores: List[float], path: List[int], budget_m: float,
+                 fixed_start: bool) -> Tuple[List[int], List[float]]:
+        """Measure a route planned on estimates with the configured provider and re-order it;
+        the least relevant stops are dropped while it overruns the budget.
 
-        distances = [dist_matrix[path[i]][path[i + 1]] for i in range(len(path) - 1)]
-        return path, distances
-        
-    def find_optimal_path(self, bar_ids: List[int], addresses: List[str]) -> Tuple[List[int], List[float]]:
-        """Finds the optimal order to visit bars based on walking distance."""
+        A fixed start is not a bar the provider can look up, so the walk from it is
+        measured in a straight line (with the street factor) instead.
+        """
+        stops = [places[i] for i in path]
+        bars = stops[1:] if fixed_start else stops
         try:
-            dist_matrix = self._get_distance_matrix(addresses)
-            path, distances = self._hamiltonian_path(dist_matrix)
-            return path, distances
+            bar_matrix = self._get_distance_matrix(bars) if len(bars) > 1 else np.zeros((len(bars), len(bars)))
         finally:
-            self._close_browser()
\ No newline at end of file
+            self.provider.close()
+        if fixed_start:
+            dist_matrix = HaversineProvider().matrix(stops)
+            dist_matrix[1:, 1:] = bar_matrix
+        else:
+            dist_matrix = bar_matrix
+
+        keep = list(range(len(path)))
+        while True:
+            sub = dist_matrix[np.ix_(keep, keep)]
+            if fixed_start:
+                order = solve(sub, 0)
+            else:
+                # A virtual start at distance 0 from every stop lets the route begin anywhere
+                order = solve(np.pad(sub, ((0, 1), (0, 1))), len(keep))[1:]
+            distances = [float(sub[order[i], order[i + 1]]) for i in range(len(order) - 1)]
+            if sum(distances) <= budget_m:
+                break
+            drop = min(keep[1:] if fixed_start else keep, key=lambda k: scores[path[k]])
+            logger.info(f"Route overruns the budget by {sum(distances) - budget_m:.0f} m; dropping {places[path[drop]].address}")
+            keep.remove(drop)
+        return [path[keep[i]] for i in order], distances
@@ -0,0 +1,226 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from typing import List, Optional, Tuple
+from barhopping.logger import logger
+from .snapshot import content_hash
+
+# Rows scored per block when assigning vectors to centroids
+_CHUNK = 65536
+# Upper bound on the size of a (queries x bars) score block
+_MAX_SCORES = 1 << 24
+
+def top_k(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the *k* largest entries along the last axis, best first.
+
+    Uses ``np.argpartition`` so only the selected entries are sorted.
+    """
+    k = min(k, sims.shape[-1])
+    if k <= 0:
+        empty = np.zeros(sims.shape[:-1] + (0,), dtype=np.int64)
+        return empty, empty.astype(sims.dtype)
+    part = np.argpartition(sims, -k, axis=-1)[..., -k:]
+    order = np.argsort(-np.take_along_axis(sims, part, axis=-1), axis=-1)
+    top = np.take_along_axis(part, order, axis=-1)
+    return top, np.take_along_axis(sims, top, axis=-1)
+
+class ExactIndex:
+    """Brute-force inner-product search over every embedding."""
+    name = "exact"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def search(self, query_vec: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the row indices and scores of the *k* best matches, best first.
+
+        If *rows* (sorted row indices) is given, only that slice is scored.
+        """
+        if rows is None:
+            return top_k(self.embeddings @ query_vec, k)
+        top, scores = top_k(self.embeddings[rows] @ query_vec, k)
+        return rows[top], scores
+
+    def updated(self, embeddings: np.ndarray, prev_rows: np.ndarray) -> "ExactIndex":
+        """Return an index over *embeddings*; ``prev_rows`` maps new rows to old ones (-1 if new)."""
+        return ExactIndex(embeddings)
+
+    def search_batch(self, query_vecs: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Search an ``(m, dim)`` block of queries with one matrix-matrix product per chunk."""
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        results = []
+        step = max(1, _MAX_SCORES // max(1, len(embeddings)))
+        for start in range(0, len(query_vecs), step):
+            top, scores = top_k(query_vecs[start:start + step] @ embeddings.T, k)
+            if rows is not None:
+                top = rows[top]
+            results.extend(zip(top, scores))
+        return results
+
+class IVFFlatIndex:
+    """Inverted-file index: rows are bucketed under spherical k-means centroids
+    and a query only scores the rows of its ``nprobe`` closest buckets.
+
+    Buckets are stored CSR-style: ``order`` holds row indices grouped by
+    bucket and ``offsets[c]:offsets[c + 1]`` is the slice of bucket ``c``.
+    """
+    name = "ivf"
+
+    def __init__(self, embeddings: np.ndarray, centroids: np.ndarray, order: np.ndarray,
+                 offsets: np.ndarray, nprobe: int = 8):
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, nlist: int, nprobe: int = 8, iters: int = 20,
+              max_train: int = 256, seed: int = 0) -> "IVFFlatIndex":
+        """Train centroids on a sample of at most ``max_train * nlist`` rows and bucket every row."""
+        nlist = max(1, min(nlist, len(embeddings)))
+        rng = np.random.default_rng(seed)
+        n_train = min(len(embeddings), max_train * nlist)
+        sample = np.asarray(embeddings[np.sort(rng.choice(len(embeddings), n_train, replace=False))], dtype=np.float32)
+        centroids = _spherical_kmeans(sample, nlist, iters, rng)
+
+        assign = _nearest_centroid(embeddings, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(embeddings, centroids, order, offsets, nprobe=nprobe)
+
+    def search(self, query_vec: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the row indices and scores of the *k* best matches, best first.
+
+        If *rows* (sorted row indices) is given, only bars in it are returned.
+        """
+        return self.search_batch(query_vec[None, :], k, rows)[0]
+
+    def search_batch(self, query_vecs: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Search an ``(m, dim)`` block of queries; centroids are scored in one product."""
+        probes, _ = top_k(query_vecs @ self.centroids.T, min(self.nprobe, self.nlist))
+        results = []
+        for query_vec, probe in zip(query_vecs, probes):
+            candidates = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+            if rows is not None:
+                candidates = candidates[isin_sorted(candidates, rows)]
+                if len(candidates) < min(k, len(rows)):
+                    # The filter left too few bars in the probed lists; scan the filtered slice
+                    candidates = rows
+            top, scores = top_k(self.embeddings[candidates] @ query_vec, k)
+            results.append((candidates[top], scores))
+        return results
+
+    def updated(self, embeddings: np.ndarray, prev_rows: np.ndarray) -> "IVFFlatIndex":
+        """Return an index over *embeddings* that keeps the trained centroids.
+
+        ``prev_rows[i]`` is the old row of new row ``i``, or -1 for rows that
+        are new or whose vector changed; only those are assigned to a bucket.
+        """
+        old_assign = np.empty(len(self.order), dtype=np.int64)
+        old_assign[self.order] = np.repeat(np.arange(self.nlist), np.diff(self.offsets))
+
+        kept = prev_rows >= 0
+        assign = np.empty(len(embeddings), dtype=np.int64)
+        assign[kept] = old_assign[prev_rows[kept]]
+        if not kept.all():
+            assign[~kept] = _nearest_centroid(embeddings[~kept], self.centroids)
+
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.nlist))])
+        return IVFFlatIndex(embeddings, self.centroids, order, offsets, nprobe=self.nprobe)
+
+    def save(self, path: str, key: str):
+        """Persist the centroids and buckets atomically; *key* ties them to a corpus."""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets, key=np.array(key))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, embeddings: np.ndarray, key: str, nprobe: int = 8) -> Optional["IVFFlatIndex"]:
+        """Load a persisted index, or return None if it is missing or was built for another corpus."""
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != key:
+                    return None
+                return cls(embeddings, data["centroids"], data["order"], data["offsets"], nprobe=nprobe)
+        except (OSError, KeyError, ValueError):
+            return None
+
+def isin_sorted(values: np.ndarray, sorted_rows: np.ndarray) -> np.ndarray:
+    """Boolean mask of the *values* present in *sorted_rows*."""
+    if len(sorted_rows) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_rows, values), len(sorted_rows) - 1)
+    return sorted_rows[pos] == values
+
+def _nearest_centroid(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assign = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), _CHUNK):
+        assign[start:start + _CHUNK] = np.argmax(data[start:start + _CHUNK] @ centroids.T, axis=1)
+    return assign
+
+def _spherical_kmeans(data: np.ndarray, k: int, iters: int, rng: np.random.Generator) -> np.ndarray:
+    """K-means on the unit sphere (cosine similarity), matching normalized embeddings."""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest_centroid(data, centroids)
+        counts = np.bincount(assign, minlength=k)
+        nonempty = counts > 0
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+        centroids[nonempty] = np.add.reduceat(data[order], starts, axis=0)
+
+        # Re-seed empty clusters with random points
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids
+
+def corpus_key(ids: List[int], embeddings: np.ndarray, nlist: int) -> str:
+    """Identify the corpus an index was built for by its row ids, vectors and list count.
+
+    Hashing the vectors means re-embedded bars (a new model or adapter) get
+    fresh centroids even when the set of ids is unchanged.
+    """
+    digest = hashlib.sha1(content_hash(ids, {}, embeddings).encode())
+    digest.update(f"{embeddings.shape[1]}:{nlist}".encode())
+    return digest.hexdigest()
+
+def load_index(embeddings: np.ndarray, ids: List[int], db_path: str, backend: str = "exact",
+               nlist: int = 0, nprobe: int = 8):
+    """Return the configured ANN backend over *embeddings*.
+
+    The IVF index is persisted next to the database (``<db>.ivf.npz``) and
+    rebuilt only when the bar ids or their embeddings change.
+
+    Args:
+        embeddings: ``(n, dim)`` normalized embedding matrix
+        ids: Bar ids, one per row
+        db_path: Path to the bars database the index belongs to
+        backend: ``exact`` or ``ivf``
+        nlist: Number of IVF buckets; 0 picks ``4 * sqrt(n)``
+        nprobe: Buckets scanned per query
+    """
+    if backend == "exact" or len(embeddings) == 0:
+        return ExactIndex(embeddings)
+    if backend != "ivf":
+        raise ValueError(f"Unknown ANN backend: {backend}")
+
+    nlist = nlist or max(1, int(4 * np.sqrt(len(embeddings))))
+    key = corpus_key(ids, embeddings, nlist)
+    path = f"{os.path.abspath(db_path)}.ivf.npz"
+
+    index = IVFFlatIndex.load(path, embeddings, key, nprobe=nprobe)
+    if index is None:
+        logger.info(f"Building IVF index with {nlist} lists over {len(embeddings)} bars")
+        index = IVFFlatIndex.build(embeddings, nlist, nprobe=nprobe)
+        index.save(path, key)
+    return index
@@ -0,0 +1,121 @@
+import math
+import re
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from .ann import isin_sorted, top_k
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be bar bars by for from has have i in is it its of on or place places "
+    "spot spots that the this to with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric terms, minus stopwords."""
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring.
+
+    Each term maps to parallel arrays of row indices and term frequencies;
+    scores are accumulated only over the postings of the query terms.
+    """
+
+    def __init__(self, postings: Dict[str, Tuple[np.ndarray, np.ndarray]], doc_len: np.ndarray,
+                 k1: float = 1.2, b: float = 0.75):
+        self.postings = postings
+        self.doc_len = doc_len
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+        self.k1 = k1
+        self.b = b
+
+    @classmethod
+    def build(cls, texts: Sequence[str], **params) -> "BM25Index":
+        rows, tfs, doc_len = cls._invert(texts, start=0)
+        postings = {t: (np.asarray(rows[t], dtype=np.int64), np.asarray(tfs[t], dtype=np.float32)) for t in rows}
+        return cls(postings, np.asarray(doc_len, dtype=np.float32), **params)
+
+    @staticmethod
+    def _invert(texts: Sequence[str], start: int):
+        rows: Dict[str, List[int]] = {}
+        tfs: Dict[str, List[int]] = {}
+        doc_len = []
+        for row, text in enumerate(texts, start):
+            terms = tokenize(text)
+            doc_len.append(len(terms))
+            for term, tf in Counter(terms).items():
+                rows.setdefault(term, []).append(row)
+                tfs.setdefault(term, []).append(tf)
+        return rows, tfs, doc_len
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def knows_all(self, terms: Sequence[str]) -> bool:
+        """True if every term occurs somewhere in the corpus."""
+        return bool(terms) and all(t in self.postings for t in terms)
+
+    def search(self, query: str, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the rows and BM25 scores of the *k* best matches, best first.
+
+        If *rows* (sorted row indices) is given, only bars in it are returned.
+        """
+        n = len(self)
+        hits, weights = [], []
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            term_rows, tf = self.postings[term]
+            idf = math.log(1.0 + (n - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_len[term_rows] / max(self.avgdl, 1e-9))
+            hits.append(term_rows)
+            weights.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+        if not hits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        matched, inverse = np.unique(np.concatenate(hits), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights)).astype(np.float32)
+        if rows is not None:
+            keep = isin_sorted(matched, rows)
+            matched, scores = matched[keep], scores[keep]
+        top, top_scores = top_k(scores, k)
+        return matched[top], top_scores
+
+    def updated(self, texts: Sequence[str], prev_rows: np.ndarray) -> "BM25Index":
+        """Return an index over *texts* reusing the postings of unchanged rows.
+
+        ``prev_rows[i]`` is the old row of new row ``i``, or -1 for rows that
+        are new or changed; only those are tokenized.
+        """
+        kept = prev_rows >= 0
+        new_row_of = np.full(len(self), -1, dtype=np.int64)
+        new_row_of[prev_rows[kept]] = np.flatnonzero(kept)
+
+        postings = {}
+        for term, (term_rows, tf) in self.postings.items():
+            moved = new_row_of[term_rows]
+            keep = moved >= 0
+            if keep.any():
+                postings[term] = (moved[keep], tf[keep])
+
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        doc_len[kept] = self.doc_len[prev_rows[kept]]
+        fresh = np.flatnonzero(~kept)
+        rows, tfs, fresh_len = self._invert([texts[row] for row in fresh], start=0)
+        doc_len[fresh] = fresh_len
+        for term, local_rows in rows.items():
+            add_rows, add_tf = fresh[local_rows], np.asarray(tfs[term], dtype=np.float32)
+            if term in postings:
+                term_rows, tf = postings[term]
+                add_rows, add_tf = np.concatenate([term_rows, add_rows]), np.concatenate([tf, add_tf])
+            postings[term] = (add_rows, add_tf)
+        return BM25Index(postings, doc_len, self.k1, self.b)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[int]:
+    """Fuse ranked lists of rows: each row scores ``sum(1 / (k + rank))``, best first."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
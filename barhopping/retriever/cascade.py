@@ -0,0 +1,121 @@
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+from barhopping.config import RERANK_DEPTH, RERANK_SKIP_MARGIN, RERANK_EARLY_STOP, RERANK_MAX_RESULTS
+
+Candidate = Dict[str, Any]
+
+class RerankCascade:
+    """Decides how much cross-encoder work each query gets, and counts what it saved.
+
+    Stages, in order:
+        1. ``depth * top_k`` first-stage candidates are retrieved.
+        2. If the vector scores of the k-th and (k+1)-th candidates differ by at
+           least ``skip_margin``, the top-k set is decided and reranking is skipped.
+        3. Otherwise candidates are reranked; with ``early_stop`` they are scored
+           ``top_k`` at a time in first-stage order, stopping once a chunk
+           leaves the top-k unchanged. The first chunk can never stop the scan
+           and the second is the last anyway at ``depth`` 2, so early stopping
+           only applies to more than ``2 * top_k`` candidates (``depth`` >= 3).
+        4. Threshold queries return at most ``max_results`` bars.
+
+    Args:
+        depth: First-stage candidates per requested result
+        skip_margin: Vector score gap that skips reranking (0 = always rerank)
+        early_stop: Stop reranking once the top-k is stable
+        max_results: Cap on the results of a threshold query
+        history: Number of recent per-query decisions kept for inspection
+    """
+
+    def __init__(self, depth: int = RERANK_DEPTH, skip_margin: float = RERANK_SKIP_MARGIN,
+                 early_stop: bool = RERANK_EARLY_STOP, max_results: int = RERANK_MAX_RESULTS, history: int = 100):
+        self.depth = depth
+        self.skip_margin = skip_margin
+        self.early_stop = early_stop
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._counts = {"queries": 0, "skipped": 0, "early_stopped": 0, "pairs_scored": 0, "pairs_candidates": 0}
+        self._recent = deque(maxlen=history)
+
+    def candidate_depth(self, top_k: int) -> int:
+        """Number of first-stage candidates to retrieve for *top_k* results."""
+        return max(top_k, self.depth * top_k)
+
+    def decisive(self, candidates: List[Candidate], top_k: int) -> bool:
+        """Whether the vector scores already separate the top-k from the rest."""
+        if self.skip_margin <= 0 or len(candidates) <= top_k:
+            return False
+        scores = [c.get("vector_score") for c in candidates]
+        # Only a plain vector ranking can be trusted; fused or lexical lists are not score-ordered
+        if None in scores or any(a < b for a, b in zip(scores, scores[1:])):
+            return False
+        return scores[top_k - 1] - scores[top_k] >= self.skip_margin
+
+    def rerank(self, reranker, query: str, candidates: List[Candidate], top_k: int,
+               threshold: Optional[float] = None) -> List[Candidate]:
+        """Rerank one query's candidates under the cascade policy."""
+        if not candidates:
+            return []
+        if threshold is None and self.decisive(candidates, top_k):
+            self._record(query, "skipped", len(candidates), 0)
+            return candidates[:top_k]
+        if not self.early_stop or threshold is not None or len(candidates) <= 2 * top_k:
+            results = reranker.rerank(query, candidates, top_k=top_k, threshold=threshold, max_results=self.max_results)
+            self._record(query, "reranked", len(candidates), len(candidates))
+            return results
+
+        scored = 0
+        top = None
+        for start in range(0, len(candidates), top_k):
+            chunk = candidates[start:start + top_k]
+            reranker.score(query, chunk)
+            scored += len(chunk)
+            ranked = sorted(candidates[:scored], key=lambda c: c["rerank_score"], reverse=True)[:top_k]
+            ids = [c.get("id") for c in ranked]
+            if ids == top:
+                break
+            top = ids
+        self._record(query, "early_stopped" if scored < len(candidates) else "reranked", len(candidates), scored)
+        return ranked
+
+    def rerank_batch(self, reranker, queries: List[str], candidate_lists: List[List[Candidate]],
+                     top_k: int) -> List[List[Candidate]]:
+        """Rerank several queries; decisive ones are skipped, the rest are scored in one batched call.
+
+        Early termination is per query, so it does not apply to batches.
+        """
+        results: List[Optional[List[Candidate]]] = [None] * len(queries)
+        pending = []
+        for i, (query, candidates) in enumerate(zip(queries, candidate_lists)):
+            if self.decisive(candidates, top_k):
+                self._record(query, "skipped", len(candidates), 0)
+                results[i] = candidates[:top_k]
+            else:
+                pending.append(i)
+        if pending:
+            reranked = reranker.rerank_batch(
+                [queries[i] for i in pending], [candidate_lists[i] for i in pending], top_k=top_k
+            )
+            for i, result in zip(pending, reranked):
+                self._record(queries[i], "reranked", len(candidate_lists[i]), len(candidate_lists[i]))
+                results[i] = result
+        return results
+
+    def _record(self, query: str, decision: str, candidates: int, scored: int):
+        with self._lock:
+            self._counts["queries"] += 1
+            if decision in self._counts:
+                self._counts[decision] += 1
+            self._counts["pairs_scored"] += scored
+            self._counts["pairs_candidates"] += candidates
+            self._recent.append({"query": query, "decision": decision, "candidates": candidates, "scored": scored})
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters per stage, the share of cross-encoder pairs saved, and the latest decisions."""
+        with self._lock:
+            counts = dict(self._counts)
+            recent = list(self._recent)
+        total = counts["pairs_candidates"]
+        counts["pairs_saved"] = 1 - counts["pairs_scored"] / total if total else 0.0
+        counts["recent"] = recent
+        return counts
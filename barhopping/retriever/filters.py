@@ -0,0 +1,50 @@
+import math
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# (min_lat, min_lng, max_lat, max_lng)
+BBox = Tuple[float, float, float, float]
+
+def parse_rating(rating) -> float:
+    """Convert the scraped ``rating`` TEXT (e.g. "4.4" or "4,4") to a float, NaN if unknown."""
+    try:
+        return float(str(rating).replace(",", ".").strip())
+    except (TypeError, ValueError):
+        return math.nan
+
+def city_key(city: Optional[str]) -> str:
+    return (city or "").strip().casefold()
+
+def city_postings(cities: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """Map each city to the sorted row indices of its bars."""
+    postings: Dict[str, List[int]] = {}
+    for row, city in enumerate(cities):
+        postings.setdefault(city_key(city), []).append(row)
+    return {city: np.asarray(rows, dtype=np.int64) for city, rows in postings.items()}
+
+def filter_rows(
+    n: int,
+    postings: Dict[str, np.ndarray],
+    ratings: np.ndarray,
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    city: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    bbox: Optional[BBox] = None,
+) -> Optional[np.ndarray]:
+    """Return the sorted rows matching every given filter, or None if no filter is set.
+
+    The city posting list narrows the candidates first; rating and bounding-box
+    checks then run only over that slice of the columnar arrays.
+    """
+    if city is None and min_rating is None and bbox is None:
+        return None
+
+    rows = postings.get(city_key(city), np.zeros(0, dtype=np.int64)) if city is not None else np.arange(n)
+    if min_rating is not None:
+        rows = rows[ratings[rows] >= min_rating]
+    if bbox is not None:
+        min_lat, min_lng, max_lat, max_lng = bbox
+        lat, lng = lats[rows], lngs[rows]
+        rows = rows[(lat >= min_lat) & (lat <= max_lat) & (lng >= min_lng) & (lng <= max_lng)]
+    return rows
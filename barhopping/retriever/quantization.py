@@ -0,0 +1,91 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from .ann import top_k
+
+# Rows decoded per block during the quantized scan
+_BLOCK = 4096
+# Upper bound on the size of a (queries x bars) score block
+_MAX_SCORES = 1 << 24
+
+class QuantizedIndex:
+    """Two-stage search over a compressed copy of the embeddings.
+
+    The first pass scans int8 codes (symmetric, one scale per dimension);
+    only the ``rescore * k`` best rows are then re-scored against the float32
+    matrix, which is expected to be memory-mapped so the rows are paged in on
+    demand. This saves resident memory, not time: numpy has no int8 matrix
+    product, so each block of codes is widened to float32 before scoring.
+    """
+    name = "quantized"
+
+    def __init__(self, embeddings: np.ndarray, codes: np.ndarray, scale: np.ndarray, kind: str, rescore: int = 4):
+        self.embeddings = embeddings
+        self.codes = codes
+        self.scale = scale
+        self.kind = kind
+        self.rescore = rescore
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, kind: str = "int8", rescore: int = 4) -> "QuantizedIndex":
+        if kind != "int8":
+            raise ValueError(f"Unknown quantization: {kind} (only int8 is supported)")
+        scale = np.abs(embeddings).max(axis=0).astype(np.float32) / 127.0
+        scale[scale == 0] = 1.0
+        index = cls(embeddings, None, scale, kind, rescore)
+        index.codes = index.encode(embeddings)
+        return index
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Quantize float32 *vectors* with this index's scale."""
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), _BLOCK):
+            block = np.asarray(vectors[start:start + _BLOCK], dtype=np.float32)
+            codes[start:start + _BLOCK] = np.clip(np.rint(block / self.scale), -127, 127)
+        return codes
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the quantized scan data."""
+        return self.codes.nbytes + self.scale.nbytes
+
+    def _scan(self, query_vecs: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate ``(m, n)`` scores from *codes*, decoding one block at a time."""
+        # Fold the per-dimension scale into the queries instead of the codes
+        scaled = (query_vecs * self.scale).astype(np.float32)
+        sims = np.empty((len(query_vecs), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK):
+            sims[:, start:start + _BLOCK] = scaled @ codes[start:start + _BLOCK].astype(np.float32).T
+        return sims
+
+    def search(self, query_vec: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the row indices and exact scores of the *k* best matches, best first.
+
+        If *rows* (sorted row indices) is given, only that slice is scanned.
+        """
+        return self.search_batch(query_vec[None, :], k, rows)[0]
+
+    def search_batch(self, query_vecs: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Shortlist each query on the codes, then re-score the shortlist in float32."""
+        codes = self.codes if rows is None else self.codes[rows]
+        step = max(1, _MAX_SCORES // max(1, len(codes)))
+        shortlists = np.concatenate([
+            top_k(self._scan(query_vecs[start:start + step], codes), self.rescore * k)[0]
+            for start in range(0, len(query_vecs), step)
+        ])
+        if rows is not None:
+            shortlists = rows[shortlists]
+        results = []
+        for query_vec, shortlist in zip(query_vecs, shortlists):
+            shortlist = np.sort(shortlist)  # sequential access into the memory-mapped matrix
+            top, scores = top_k(self.embeddings[shortlist] @ query_vec, k)
+            results.append((shortlist[top], scores))
+        return results
+
+    def updated(self, embeddings: np.ndarray, prev_rows: np.ndarray) -> "QuantizedIndex":
+        """Return an index over *embeddings*, encoding only new or changed rows with the existing scale."""
+        kept = prev_rows >= 0
+        codes = np.empty(embeddings.shape, dtype=self.codes.dtype)
+        codes[kept] = self.codes[prev_rows[kept]]
+        if not kept.all():
+            codes[~kept] = self.encode(embeddings[~kept])
+        return QuantizedIndex(embeddings, codes, self.scale, self.kind, self.rescore)
@@ -1,30 +1,45 @@
+import numpy as np
 import torch
-from typing import List, Dict, Union
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from barhopping.config import TOP_K
+from typing import Any, Hashable, List, Dict, Optional, Sequence, Tuple, Union
+from transformers import AutoTokenizer
+from barhopping.cache import LRUCache
+from barhopping.config import (
+    TOP_K, RERANKER_MODEL, RERANKER_BACKEND, MODEL_SERVER, RERANK_TOKEN_BUDGET, RERANK_DOC_CACHE_SIZE,
+    RERANK_MAX_RESULTS
+)
+from barhopping.inference import load_model
+from barhopping.serving.client import get_model_client
 from barhopping.logger import logger
 
+# Longest (query, document) pair fed to the cross-encoder, in tokens
+MAX_LENGTH = 512
+
 class Reranker:
-    def __init__(self, model_name: str = "BAAI/bge-reranker-v2-m3", device: str = None):
+    def __init__(self, model_name: str = RERANKER_MODEL, device: str = None, backend: str = RERANKER_BACKEND):
         """Initialize the reranker model.
         
         Args:
             model_name: Name of the model to use
             device: Device to run the model on (cpu, cuda, mps). If None, uses the default from config.
+            backend: Inference backend (torch, torch-int8, onnx, onnx-int8); all but torch run on the CPU
         """
         self.model_name = model_name
-        self.device = device or (
+        self.backend = backend
+        self.device = "cpu" if backend != "torch" else device or (
             "mps" if torch.backends.mps.is_available() else
             "cuda" if torch.cuda.is_available() else
             "cpu"
         )
         
-        logger.info(f"Loading reranker model {self.model_name} on device {self.device}")
+        logger.info(f"Loading reranker model {self.model_name} ({backend}) on device {self.device}")
         self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
+        self.model = load_model(self.model_name, "reranker", backend).to(self.device)
         self.model.eval()
+        # Document token ids by bar id (or by text), with the text they were computed from
+        self.doc_tokens = LRUCache(RERANK_DOC_CACHE_SIZE)
         
-    def rerank(self, query: str, candidates: List[Dict[str, str]], top_k: int = TOP_K, threshold: float = None) -> List[Dict[str, Union[str, float]]]:
+    def rerank(self, query: str, candidates: List[Dict[str, str]], top_k: int = TOP_K, threshold: float = None,
+               max_results: int = RERANK_MAX_RESULTS) -> List[Dict[str, Union[str, float]]]:
         """Rerank candidates based on their relevance to the query.
         
         Args:
@@ -32,46 +47,171 @@ class Reranker:
             candidates: List of candidate dictionaries with 'tag_name' and 'summary'
             top_k: Number of top results to return (default: 5)
             threshold: Minimum score threshold (optional)
+            max_results: Cap on the number of results above *threshold*
         Returns:
             List of reranked candidates with scores
         """
         if not candidates:
             return []
-        
-        # Create input pairs
-        pairs = [(query, f"{candidate["name"]}: {candidate["summary"]}") for candidate in candidates]
-        
-        # Tokenize
-        inputs = self.tokenizer(
-            pairs,
-            padding=True,
-            truncation=True,
-            max_length=512,
-            return_tensors="pt"
-        ).to(self.device)
-        
-        # Get scores
-        with torch.no_grad():
-            scores = self.model(**inputs).logits.squeeze()
-        
-        # Convert to list and attach to candidates
-        if isinstance(scores, torch.Tensor):
-            scores = scores.cpu().numpy().tolist()
+        self.score(query, candidates)
+        return self._select(candidates, top_k, threshold, max_results)
+
+    def score(self, query: str, candidates: List[Dict[str, Any]]) -> List[float]:
+        """Score candidates against the query, without sorting or selecting them.
+
+        Args:
+            query: The search query
+            candidates: Candidate dictionaries; each gets its score as ``rerank_score``
+        Returns:
+            The scores, in the order of *candidates*
+        """
+        pairs = [(query, self.document(candidate)) for candidate in candidates]
+        scores = self._score(pairs, keys=[candidate.get("id") for candidate in candidates])
         for candidate, score in zip(candidates, scores):
-            candidate["rerank_score"] = float(score)
+            candidate["rerank_score"] = score
+        return scores
+
+    def rerank_batch(self, queries: List[str], candidate_lists: List[List[Dict[str, str]]], top_k: int = TOP_K,
+                     threshold: float = None, batch_size: int = 64,
+                     max_results: int = RERANK_MAX_RESULTS) -> List[List[Dict[str, Union[str, float]]]]:
+        """Rerank the candidates of several queries, scoring all (query, candidate) pairs together.
         
-        # Sort by rerank score
+        Args:
+            queries: The search queries
+            candidate_lists: One list of candidate dictionaries per query
+            top_k: Number of top results to return per query
+            threshold: Minimum score threshold (optional)
+            batch_size: Maximum number of pairs per forward pass
+            max_results: Cap on the number of results above *threshold*
+        Returns:
+            One list of reranked candidates per query
+        """
+        pairs = [
+            (query, self.document(candidate))
+            for query, candidates in zip(queries, candidate_lists)
+            for candidate in candidates
+        ]
+        keys = [candidate.get("id") for candidates in candidate_lists for candidate in candidates]
+        scores = iter(self._score(pairs, batch_size, keys=keys))
+        results = []
+        for candidates in candidate_lists:
+            for candidate in candidates:
+                candidate["rerank_score"] = next(scores)
+            results.append(self._select(candidates, top_k, threshold, max_results))
+        return results
+
+    @staticmethod
+    def document(candidate: Dict[str, Any]) -> str:
+        """The text a candidate bar is scored on."""
+        return f"{candidate['name']}: {candidate['summary']}"
+
+    def cache_documents(self, keys: Sequence[Hashable], documents: Sequence[str]):
+        """Tokenize *documents* ahead of the first query, e.g. every bar when the index loads."""
+        self._document_ids(list(documents), list(keys))
+
+    def _document_ids(self, documents: List[str], keys: List[Optional[Hashable]]) -> List[List[int]]:
+        """Token ids of *documents* (no special tokens), tokenizing only those not cached under their key.
+
+        A cached entry is reused only if its text is unchanged, so edited summaries are re-tokenized.
+        """
+        keys = [document if key is None else key for key, document in zip(keys, documents)]
+        ids = []
+        missing = {}
+        for key, document in zip(keys, documents):
+            cached = self.doc_tokens.get(key)
+            if cached is not None and cached[0] == document:
+                ids.append(cached[1])
+            else:
+                ids.append(None)
+                missing.setdefault(document, []).append(key)
+        if missing:
+            texts = list(missing)
+            encoded = self.tokenizer(texts, add_special_tokens=False, truncation=True, max_length=MAX_LENGTH)
+            fresh = dict(zip(texts, encoded["input_ids"]))
+            for document, doc_keys in missing.items():
+                for key in doc_keys:
+                    self.doc_tokens.put(key, (document, fresh[document]))
+            ids = [fresh[document] if i is None else i for i, document in zip(ids, documents)]
+        return ids
+
+    def _score(self, pairs: List[Tuple[str, str]], batch_size: int = None,
+               keys: Optional[List[Optional[Hashable]]] = None) -> List[float]:
+        """Score (query, document) pairs with the cross-encoder.
+
+        Pairs are assembled from cached document token ids (*keys* are usually
+        bar ids; the document text is used when missing), sorted by length and
+        packed into sub-batches of at most ``rerank_token_budget`` padded tokens,
+        so short documents are not padded to the longest one.
+        """
+        if not pairs:
+            return []
+        queries = list(dict.fromkeys(query for query, _ in pairs))
+        query_ids = dict(zip(queries, self.tokenizer(
+            queries, add_special_tokens=False, truncation=True, max_length=MAX_LENGTH
+        )["input_ids"]))
+        doc_ids = self._document_ids([document for _, document in pairs], keys or [None] * len(pairs))
+        features = [
+            self.tokenizer.prepare_for_model(
+                query_ids[query], ids, truncation="longest_first", max_length=MAX_LENGTH
+            )
+            for (query, _), ids in zip(pairs, doc_ids)
+        ]
+
+        scores = np.empty(len(pairs), dtype=np.float32)
+        for batch in self._token_batches([len(f["input_ids"]) for f in features], batch_size):
+            inputs = self.tokenizer.pad([features[i] for i in batch], return_tensors="pt").to(self.device)
+            with torch.no_grad():
+                scores[batch] = self.model(**inputs).logits.view(-1).float().cpu().numpy()
+        return scores.tolist()
+
+    @staticmethod
+    def _token_batches(lengths: List[int], batch_size: int = None,
+                       token_budget: int = RERANK_TOKEN_BUDGET) -> List[List[int]]:
+        """Group pair indices by length so each batch pads to at most *token_budget* tokens."""
+        batches = []
+        batch = []
+        for i in np.argsort(lengths, kind="stable").tolist():
+            # Sorted ascending, so the newest pair sets the padded length
+            if batch and ((len(batch) + 1) * lengths[i] > token_budget or len(batch) == batch_size):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _select(candidates: List[Dict], top_k: int, threshold: float = None,
+                max_results: int = RERANK_MAX_RESULTS) -> List[Dict]:
+        """Sort scored candidates and keep the top-k, or all above *threshold* up to *max_results*."""
         candidates.sort(key=lambda x: x["rerank_score"], reverse=True)
         if threshold is not None:
-            return [c for c in candidates if c["rerank_score"] >= threshold]
+            return [c for c in candidates if c["rerank_score"] >= threshold][:max_results]
         return candidates[:top_k]
 
+class RemoteReranker(Reranker):
+    """Reranker that scores pairs on the shared model server instead of loading the model."""
+
+    def __init__(self, model_name: str = RERANKER_MODEL):
+        self.model_name = model_name
+        self.backend = "remote"
+        self.device = "remote"
+        self.client = get_model_client()
+
+    def cache_documents(self, keys: Sequence[Hashable], documents: Sequence[str]):
+        """Documents are tokenized and cached on the server."""
+
+    def _score(self, pairs: List[Tuple[str, str]], batch_size: int = None,
+               keys: Optional[List[Optional[Hashable]]] = None) -> List[float]:
+        """Score pairs on the server, which micro-batches them with other clients' requests."""
+        return self.client.score(pairs) if pairs else []
+
 # Global instance for reuse
 _reranker = None
 
 def get_reranker() -> Reranker:
-    """Return a singleton reranker instance."""
+    """Return a singleton reranker instance, a client of the model server if one is configured."""
     global _reranker
     if _reranker is None:
-        _reranker = Reranker()
+        _reranker = RemoteReranker() if MODEL_SERVER else Reranker()
     return _reranker
\ No newline at end of file
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from barhopping.logger import logger
+
+# Bump when the on-disk layout changes so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+# Rows hashed per block
+_HASH_BLOCK = 16384
+
+@dataclass
+class Snapshot:
+    """A versioned, memory-mapped export of the bars table."""
+    path: str
+    ids: List[int]
+    columns: Dict[str, list]
+    embeddings: np.ndarray
+
+def snapshot_root(db_path: str) -> str:
+    """Directory holding the snapshots of *db_path*."""
+    return f"{os.path.abspath(db_path)}.snapshot"
+
+def content_hash(ids: List[int], columns: Dict[str, list], embeddings: np.ndarray) -> str:
+    """Hash every exported value so any edit to the bars table invalidates the snapshot."""
+    digest = hashlib.sha1()
+    digest.update(json.dumps([ids, columns], ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    # Block by block, so hashing a memory-mapped matrix never copies all of it
+    for start in range(0, len(embeddings), _HASH_BLOCK):
+        digest.update(np.ascontiguousarray(embeddings[start:start + _HASH_BLOCK], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+def db_stat(db_path: str) -> Dict[str, int]:
+    st = os.stat(db_path)
+    return {"db_size": st.st_size, "db_mtime_ns": st.st_mtime_ns}
+
+def _write_json(path: str, obj: dict):
+    """Write JSON atomically so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _open(path: str) -> Snapshot:
+    with open(os.path.join(path, "columns.json"), encoding="utf-8") as f:
+        columns = json.load(f)
+    ids = np.load(os.path.join(path, "ids.npy")).tolist()
+    embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+    return Snapshot(path=path, ids=ids, columns=columns, embeddings=embeddings)
+
+def load_snapshot(db_path: str, columns: Sequence[str] = ()) -> Optional[Snapshot]:
+    """Open the current snapshot of *db_path* without touching SQLite.
+
+    Returns None if there is no snapshot, it lacks any of *columns*, or the
+    database file changed since it was exported; the caller then re-reads the
+    DB and calls ``export_snapshot``.
+    """
+    current = os.path.join(snapshot_root(db_path), "CURRENT")
+    try:
+        with open(current, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != SNAPSHOT_VERSION or meta.get("stat") != db_stat(db_path):
+            return None
+        snapshot = _open(os.path.join(snapshot_root(db_path), meta["dir"]))
+        return snapshot if set(columns) <= set(snapshot.columns) else None
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable embedding snapshot: {e}")
+        return None
+
+def _publish(db_path: str, tmp: Optional[str], name: str, stat: Dict[str, int]) -> Snapshot:
+    """Move the export in *tmp* into place as version *name*, make it current and drop older versions."""
+    root = snapshot_root(db_path)
+    path = os.path.join(root, name)
+    if tmp is not None:
+        try:
+            os.rename(tmp, path)
+            logger.info(f"Exported embedding snapshot {name}")
+        except OSError:
+            # Another worker exported the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    _write_json(os.path.join(root, "CURRENT"), {"format": SNAPSHOT_VERSION, "dir": name, "stat": stat})
+
+    # Drop superseded versions; processes still mapping them keep their pages
+    for entry in os.listdir(root):
+        if entry.startswith("v") and entry != name:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+    return _open(path)
+
+def _version_name(ids: List[int], columns: Dict[str, list], embeddings: np.ndarray) -> str:
+    return f"v{SNAPSHOT_VERSION}-{len(ids)}-{content_hash(ids, columns, embeddings)[:16]}"
+
+def _write_metadata(path: str, ids: List[int], columns: Dict[str, list]):
+    np.save(os.path.join(path, "ids.npy"), np.asarray(ids, dtype=np.int64))
+    with open(os.path.join(path, "columns.json"), "w", encoding="utf-8") as f:
+        json.dump(columns, f, ensure_ascii=False)
+
+def export_snapshot(db_path: str, ids: List[int], columns: Dict[str, list], embeddings: np.ndarray,
+                    stat: Optional[Dict[str, int]] = None) -> Snapshot:
+    """Export the bars table next to *db_path* and return it memory-mapped.
+
+    Snapshots live in versioned directories named after the row count and a
+    content hash, so workers that race on the same DB produce the same
+    directory and an unchanged table is never exported twice. *stat* should be
+    taken before the rows were read so a concurrent write is never masked.
+    """
+    root = snapshot_root(db_path)
+    os.makedirs(root, exist_ok=True)
+    stat = stat or db_stat(db_path)
+    name = _version_name(ids, columns, embeddings)
+
+    tmp = None
+    if not os.path.isdir(os.path.join(root, name)):
+        tmp = tempfile.mkdtemp(dir=root, prefix=".export-")
+        try:
+            np.save(os.path.join(tmp, "embeddings.npy"), np.ascontiguousarray(embeddings, dtype=np.float32))
+            _write_metadata(tmp, ids, columns)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    return _publish(db_path, tmp, name, stat)
+
+def export_rows(db_path: str, ids: List[int], columns: Dict[str, list], dim: int,
+                fill: Callable[[np.ndarray], None], stat: Dict[str, int]) -> Snapshot:
+    """Export a snapshot whose embedding matrix is written in place by ``fill(out)``.
+
+    *out* is a writable ``(len(ids), dim)`` float32 memory map, so a new
+    version can be assembled from the rows of a mapped one without holding
+    either matrix in private memory.
+    """
+    root = snapshot_root(db_path)
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=root, prefix=".export-")
+    try:
+        out = np.lib.format.open_memmap(os.path.join(tmp, "embeddings.npy"), mode="w+",
+                                        dtype=np.float32, shape=(len(ids), dim))
+        fill(out)
+        out.flush()
+        name = _version_name(ids, columns, out)
+        del out
+        if os.path.isdir(os.path.join(root, name)):
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp = None
+        else:
+            _write_metadata(tmp, ids, columns)
+    except BaseException:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return _publish(db_path, tmp, name, stat)
+
+def load_or_export(db_path: str, read_db: Callable[[], Tuple[List[int], Dict[str, list], np.ndarray]],
+                   columns: Sequence[str] = ()) -> Snapshot:
+    """Open the current snapshot, re-exporting it from ``read_db()`` when stale."""
+    snapshot = load_snapshot(db_path, columns)
+    if snapshot is None:
+        stat = db_stat(db_path)
+        snapshot = export_snapshot(db_path, *read_db(), stat=stat)
+    return snapshot
@@ -1,12 +1,59 @@
-import ast
+import itertools
+import json
+import math
 import sqlite3
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Union
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+from barhopping.cache import LRUCache, normalize_query
 from barhopping.embedding.granite import get_embedding
-from .reranker import get_reranker
-from barhopping.config import TOP_K, BARS_DB
+from barhopping.database.sqlite import table_columns, encode_embedding, decode_embeddings
+from barhopping.geo import coords_from_url
+from .reranker import Reranker, get_reranker
+from .cascade import RerankCascade
+from .snapshot import db_stat, export_rows, load_or_export
+from .ann import load_index
+from .filters import BBox, city_key, city_postings, filter_rows, parse_rating
+from .bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from .quantization import QuantizedIndex
+from barhopping.config import (
+    TOP_K, BARS_DB, EMBEDDING_SNAPSHOT, ANN_BACKEND, ANN_NLIST, ANN_NPROBE, QUANTIZATION, QUANTIZATION_RESCORE,
+    SEARCH_MODE, LEXICAL_MAX_TERMS, LEXICAL_INDEX, RRF_K, RESULT_CACHE_SIZE, RESULT_CACHE_TTL, PREWARM_QUERIES
+)
 from barhopping.logger import logger
 
+# Bar columns loaded alongside the embeddings; the rating is parsed to a float at load
+# time and missing coordinates are taken from the place URL
+BAR_COLUMNS = ("name", "URL", "address", "photo", "summary", "city", "rating", "updated_at", "lat", "lng")
+
+# Rows touched this many seconds before the watermark are re-read on refresh,
+# so a write that committed late with an older timestamp is not missed
+WATERMARK_SLACK = 5.0
+# Rows copied per block when a refresh assembles the new embedding matrix
+_GATHER_BLOCK = 16384
+
+@dataclass(frozen=True)
+class IndexState:
+    """Everything a search reads, swapped in as one object on refresh."""
+    ids: List[int]
+    columns: Dict[str, list]
+    embeddings: np.ndarray
+    index: Any
+    max_id: int
+    max_updated_at: float
+    city_rows: Dict[str, np.ndarray]
+    ratings: np.ndarray
+    lats: np.ndarray
+    lngs: np.ndarray
+    lexical: Optional[BM25Index]
+    version: int
+
+    @property
+    def positions(self) -> Dict[int, int]:
+        return {bar_id: row for row, bar_id in enumerate(self.ids)}
+
 class VectorSearch:
     def __init__(self, db_path: str = BARS_DB):
         """Initialize the vector search.
@@ -15,86 +62,484 @@ class VectorSearch:
             db_path: Path to the SQLite database
         """
         self.db_path = db_path
+        self._refresh_lock = threading.Lock()
+        self._versions = itertools.count(1)
+        # Final results keyed by query, filters and index version
+        self._result_cache = LRUCache(RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL or None)
+        self.cascade = RerankCascade()
         self._load_embeddings()
+
+    # Read-only views of the current state
+    ids = property(lambda self: self._state.ids)
+    names = property(lambda self: self._state.columns["name"])
+    URLs = property(lambda self: self._state.columns["URL"])
+    addresses = property(lambda self: self._state.columns["address"])
+    photos = property(lambda self: self._state.columns["photo"])
+    summaries = property(lambda self: self._state.columns["summary"])
+    embeddings = property(lambda self: self._state.embeddings)
+    index = property(lambda self: self._state.index)
         
     def _load_embeddings(self):
-        """Load all embeddings from the database."""
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute(
-                "SELECT id, name, URL, address, photo, summary, embedding FROM bars"
-            ).fetchall()
-        
-        # Initialize storage
-        self.ids = []
-        self.names = []
-        self.URLs = []
-        self.addresses = []
-        self.photos = []
-        self.summaries = []
-        self.embeddings = []
-
-        for row in rows:
-            bar_id, name, URL, address, photo, summary, embedding_str = row
-            self.ids.append(bar_id)
-            self.names.append(name)
-            self.URLs.append(URL)
-            self.addresses.append(address)
-            self.photos.append(photo)
-            self.summaries.append(summary)
-            self.embeddings.append(np.array(ast.literal_eval(embedding_str), dtype=np.float32))
-            
-        if self.embeddings:
-            self.embeddings = np.vstack(self.embeddings)
-            logger.info(f"Loaded {len(self.embeddings)} bar embeddings")
+        """Load all embeddings, from the shared snapshot if enabled, else from the database."""
+        if EMBEDDING_SNAPSHOT:
+            snapshot = load_or_export(self.db_path, self._read_db, BAR_COLUMNS)
+            ids, columns, embeddings = snapshot.ids, snapshot.columns, snapshot.embeddings
         else:
-            self.embeddings = np.array([])
+            ids, columns, embeddings = self._read_db()
+
+        if len(ids):
+            logger.info(f"Loaded {len(embeddings)} bar embeddings")
+        else:
+            embeddings = np.array([])
             logger.warning("No embeddings found in the database")
+        lexical = BM25Index.build(self._lexical_texts(columns)) if LEXICAL_INDEX else None
+        self._state = self._make_state(ids, columns, embeddings, self._build_index(ids, embeddings), lexical)
+
+    def _build_index(self, ids: List[int], embeddings: np.ndarray) -> Any:
+        """Build the configured search backend over *embeddings*."""
+        if QUANTIZATION == "none" or len(ids) == 0:
+            return load_index(embeddings, ids, self.db_path, ANN_BACKEND, ANN_NLIST, ANN_NPROBE)
+        if ANN_BACKEND != "exact":
+            logger.warning(f"Quantization only applies to the exact backend; ignoring it for {ANN_BACKEND}")
+            return load_index(embeddings, ids, self.db_path, ANN_BACKEND, ANN_NLIST, ANN_NPROBE)
+        if not isinstance(embeddings, np.memmap):
+            logger.warning("Quantized search keeps float32 vectors in RAM unless embedding_snapshot is enabled")
+
+        index = QuantizedIndex.build(embeddings, QUANTIZATION, QUANTIZATION_RESCORE)
+        logger.info(
+            f"Quantized {len(ids)} embeddings to {QUANTIZATION}: "
+            f"{index.nbytes / 2**20:.1f} MiB resident vs {embeddings.nbytes / 2**20:.1f} MiB float32"
+        )
+        return index
+
+    @staticmethod
+    def _lexical_texts(columns: Dict[str, list]) -> List[str]:
+        return [f"{name} {summary}" for name, summary in zip(columns["name"], columns["summary"])]
+
+    def _make_state(self, ids: List[int], columns: Dict[str, list], embeddings: np.ndarray, index: Any,
+                    lexical: Optional[BM25Index]) -> IndexState:
+        """Wrap the arrays in a new state with the next index version."""
+        updated = [t for t in columns["updated_at"] if t is not None]
+        return IndexState(
+            ids=ids,
+            columns=columns,
+            embeddings=embeddings,
+            index=index,
+            max_id=max(ids, default=0),
+            max_updated_at=max(updated, default=0.0),
+            city_rows=city_postings(columns["city"]),
+            ratings=np.asarray(columns["rating"], dtype=np.float32),
+            lats=np.asarray(columns["lat"], dtype=np.float64),
+            lngs=np.asarray(columns["lng"], dtype=np.float64),
+            lexical=lexical,
+            version=next(self._versions)
+        )
+
+    def _read_db(self, where: str = "", params: tuple = ()) -> Tuple[List[int], Dict[str, list], np.ndarray]:
+        """Read bar metadata and the embedding matrix from the database.
+        
+        Args:
+            where: Optional SQL WHERE clause restricting the rows read
+            params: Parameters for *where*
+        Returns:
+            Bar ids, a dict of column lists, and the ``(n, dim)`` embedding matrix
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            present = table_columns(conn, "bars")
+            selected = [c if c.lower() in present else "NULL" for c in BAR_COLUMNS + ("embedding_f32", "embedding")]
+            rows = conn.execute(f"SELECT id, {', '.join(selected)} FROM bars {where}", params).fetchall()
+        
+        ids = []
+        columns = {c: [] for c in BAR_COLUMNS}
+        blobs = []
+        legacy = 0
+
+        for bar_id, *values, embedding_blob, embedding_str in rows:
+            if embedding_blob is None:
+                if not embedding_str:
+                    continue
+                # Legacy JSON text row, not yet migrated
+                embedding_blob = encode_embedding(json.loads(embedding_str))
+                legacy += 1
+            ids.append(bar_id)
+            for column, value in zip(BAR_COLUMNS, values):
+                columns[column].append(value)
+            blobs.append(embedding_blob)
+
+        columns["rating"] = [parse_rating(rating) for rating in columns["rating"]]
+        coords = [
+            (lat, lng) if lat is not None and lng is not None else coords_from_url(url) or (math.nan, math.nan)
+            for url, lat, lng in zip(columns["URL"], columns["lat"], columns["lng"])
+        ]
+        columns["lat"] = [lat for lat, _ in coords]
+        columns["lng"] = [lng for _, lng in coords]
+
+        if legacy:
+            logger.warning(
+                f"Parsed {legacy} JSON embeddings; run `python -m barhopping.database.migrate {self.db_path}` "
+                "to convert them to float32 BLOBs"
+            )
+        return ids, columns, decode_embeddings(blobs)
             
-    def search(self, query: str, rerank: bool = True) -> List[Dict[str, Union[str, float]]]:
+    def search(self, query: str, top_k: int = TOP_K, rerank: bool = True, city: Optional[str] = None,
+               min_rating: Optional[float] = None, bbox: Optional[BBox] = None,
+               mode: Optional[str] = None) -> List[Dict[str, Union[str, float]]]:
         """Search for similar bars using vector search and optional reranking.
         
         Args:
             query: Search query
             top_k: Number of results to return
             rerank: Whether to apply reranking (default: True)
-            threshold: Reranking score threshold (optional)
+            city: Only return bars in this city (case-insensitive)
+            min_rating: Only return bars rated at least this
+            bbox: Only return bars inside ``(min_lat, min_lng, max_lat, max_lng)``
+            mode: ``vector``, ``hybrid`` or ``lexical``; defaults to ``search_mode`` in the config
         Returns:
             List of dictionaries containing bar information and scores
         """
-        if len(self.embeddings) == 0:
+        results = []
+        for _, results in self.search_stages(query, top_k, city, min_rating, bbox, mode, rerank=rerank):
+            pass
+        return results
+
+    def search_stages(self, query: str, top_k: int = TOP_K, city: Optional[str] = None,
+                      min_rating: Optional[float] = None, bbox: Optional[BBox] = None,
+                      mode: Optional[str] = None, rerank: bool = True
+                      ) -> Iterator[Tuple[str, List[Dict[str, Union[str, float]]]]]:
+        """Search that hands out the first-stage candidates as soon as they are known.
+
+        Yields ``("candidates", results)`` before reranking, then ``("reranked", results)``;
+        the last stage is what ``search`` returns. A cached query yields only
+        the last stage, and without *rerank* the candidates are the last stage.
+        Arguments are as in ``search``.
+        """
+        last = "reranked" if rerank else "candidates"
+        state = self._state
+        if len(state.embeddings) == 0:
             logger.error("No embeddings available for search")
+            yield last, []
+            return
+        mode = self._mode(state, mode)
+        key = self._cache_key(state, query, top_k, rerank, city, min_rating, bbox, mode)
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            yield last, [dict(result) for result in cached]
+            return
+        rows = self._filter(state, city, min_rating, bbox)
+        if rows is not None and len(rows) == 0:
+            yield last, []
+            return
+
+        candidates = self._candidates(state, query, top_k, rows, mode)
+        if not rerank:
+            self._result_cache.put(key, candidates)
+        yield "candidates", [dict(candidate) for candidate in candidates]
+        if rerank:
+            logger.info("Applying reranking...")
+            results = self.cascade.rerank(get_reranker(), query, candidates, top_k)
+            self._result_cache.put(key, results)
+            yield "reranked", [dict(result) for result in results]
+
+    def get_bars(self, bar_ids: Sequence[int]) -> List[Dict[str, Union[str, float]]]:
+        """Result dictionaries, without scores, for *bar_ids* in the given order.
+
+        Raises:
+            KeyError: If a bar id is not in the index
+        """
+        state = self._state
+        positions = state.positions
+        missing = [bar_id for bar_id in bar_ids if bar_id not in positions]
+        if missing:
+            raise KeyError(f"Unknown bar ids: {missing}")
+        return [self._candidate(state, positions[bar_id]) for bar_id in bar_ids]
+
+    def _candidates(self, state: IndexState, query: str, top_k: int, rows: Optional[np.ndarray],
+                    mode: str) -> List[Dict[str, Any]]:
+        """First-stage candidates for reranking *top_k* results."""
+        depth = self.cascade.candidate_depth(top_k)
+        candidates = self._lexical_candidates(state, query, top_k, depth, rows, mode)
+        if candidates is None:
+            # Get query embedding
+            query_vec = get_embedding(query).cpu().numpy().reshape(-1)
+            candidates = self._first_stage(state, query, query_vec, depth, rows, mode)
+        return candidates
+
+    def _lexical_candidates(self, state: IndexState, query: str, top_k: int, depth: int,
+                            rows: Optional[np.ndarray], mode: str) -> Optional[List[Dict[str, Any]]]:
+        """Candidates from the lexical index alone, or None if *query* needs the vector index.
+
+        Short keyword queries are answered lexically, unless the filters leave
+        too few keyword matches. ``search`` and ``search_batch`` both go through
+        here, so a cached result does not depend on which of them filled it.
+        """
+        if mode != "lexical" and not self._is_keyword_query(state, query):
+            return None
+        top_indices, scores = state.lexical.search(query, depth, rows)
+        candidates = [self._candidate(state, i, lexical_score=s) for i, s in zip(top_indices, scores)]
+        if mode != "lexical" and len(candidates) < top_k:
+            return None
+        return candidates
+
+    def search_batch(self, queries: List[str], top_k: int = TOP_K, rerank: bool = True, city: Optional[str] = None,
+                     min_rating: Optional[float] = None, bbox: Optional[BBox] = None,
+                     mode: Optional[str] = None) -> List[List[Dict[str, Union[str, float]]]]:
+        """Search for several queries at once.
+        
+        All queries are embedded in one forward pass, scored with a single
+        matrix-matrix product and reranked in one batched reranker call.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            rerank: Whether to apply reranking (default: True)
+            city, min_rating, bbox, mode: Applied to every query, as in ``search``
+        Returns:
+            One list of result dictionaries per query, in input order
+        """
+        if not queries:
             return []
+        state = self._state
+        if len(state.embeddings) == 0:
+            logger.error("No embeddings available for search")
+            return [[] for _ in queries]
+        rows = self._filter(state, city, min_rating, bbox)
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in queries]
+        mode = self._mode(state, mode)
+
+        keys = [self._cache_key(state, query, top_k, rerank, city, min_rating, bbox, mode) for query in queries]
+        results = [self._result_cache.get(key) for key in keys]
+        pending = [i for i, cached in enumerate(results) if cached is None]
+        if pending:
+            fresh = self._search_batch(state, [queries[i] for i in pending], top_k, rerank, rows, mode)
+            for i, result in zip(pending, fresh):
+                self._result_cache.put(keys[i], result)
+                results[i] = result
+        return [[dict(r) for r in result] for result in results]
+
+    def _search_batch(self, state: IndexState, queries: List[str], top_k: int, rerank: bool,
+                      rows: Optional[np.ndarray], mode: str) -> List[List[Dict[str, Union[str, float]]]]:
+        """Uncached body of ``search_batch``."""
+        depth = self.cascade.candidate_depth(top_k)
+        candidate_lists = [self._lexical_candidates(state, query, top_k, depth, rows, mode) for query in queries]
+        pending = [i for i, candidates in enumerate(candidate_lists) if candidates is None]
+        if pending:
+            query_vecs = get_embedding([queries[i] for i in pending]).cpu().numpy()
+            hits = state.index.search_batch(query_vecs, depth, rows)
+            for i, query_vec, vector_hits in zip(pending, query_vecs, hits):
+                candidate_lists[i] = self._first_stage(state, queries[i], query_vec, depth, rows, mode, vector_hits)
+
+        if rerank:
+            logger.info(f"Applying batched reranking to {len(queries)} queries...")
+            return self.cascade.rerank_batch(get_reranker(), queries, candidate_lists, top_k)
+
+        return candidate_lists
+
+    def prewarm(self, queries: Sequence[str] = (), top_k: int = TOP_K):
+        """Pre-tokenize every bar for the reranker, then answer *queries* and the
+        configured ``prewarm_queries`` so they are served from the result cache.
+
+        Args:
+            queries: Queries to warm in addition to ``prewarm_queries``, e.g. the GUI examples
+            top_k: Number of results to cache per query
+        """
+        start = time.perf_counter()
+        state = self._state
+        get_reranker().cache_documents(state.ids, [
+            Reranker.document({"name": name, "summary": summary})
+            for name, summary in zip(state.columns["name"], state.columns["summary"])
+        ])
+        logger.info(f"Tokenized {len(state.ids)} bar documents for the reranker in {time.perf_counter() - start:.1f}s")
+
+        queries = list(dict.fromkeys([*queries, *PREWARM_QUERIES]))
+        if not queries or RESULT_CACHE_SIZE <= 0:
+            return
+        start = time.perf_counter()
+        self.search_batch(queries, top_k=top_k)
+        logger.info(f"Pre-warmed {len(queries)} queries in {time.perf_counter() - start:.1f}s")
+
+    @staticmethod
+    def _cache_key(state: IndexState, query: str, top_k: int, rerank: bool, city: Optional[str],
+                   min_rating: Optional[float], bbox: Optional[BBox], mode: str) -> tuple:
+        return (
+            normalize_query(query), city_key(city) if city else None, min_rating,
+            tuple(bbox) if bbox else None, top_k, rerank, mode, state.version
+        )
+
+    @staticmethod
+    def _mode(state: IndexState, mode: Optional[str]) -> str:
+        mode = mode or SEARCH_MODE
+        if mode not in ("vector", "hybrid", "lexical"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        if mode != "vector" and state.lexical is None:
+            logger.warning(f"No lexical index loaded; falling back from {mode} to vector search")
+            return "vector"
+        return mode
+
+    @staticmethod
+    def _is_keyword_query(state: IndexState, query: str) -> bool:
+        """Whether *query* is a few literal keywords that all occur in the corpus."""
+        if state.lexical is None or not 0 < len(query.split()) <= LEXICAL_MAX_TERMS:
+            return False
+        return state.lexical.knows_all(tokenize(query))
+
+    def _first_stage(self, state: IndexState, query: str, query_vec: np.ndarray, depth: int,
+                     rows: Optional[np.ndarray], mode: str,
+                     vector_hits: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Dict[str, Union[str, float]]]:
+        """Vector candidates, fused with BM25 candidates by reciprocal rank in hybrid mode."""
+        top_indices, scores = vector_hits if vector_hits is not None else state.index.search(query_vec, depth, rows)
+        if mode != "hybrid":
+            return [self._candidate(state, i, vector_score=s) for i, s in zip(top_indices, scores)]
+
+        lex_indices, lex_scores = state.lexical.search(query, depth, rows)
+        fused = reciprocal_rank_fusion([top_indices.tolist(), lex_indices.tolist()], k=RRF_K)[:depth]
+
+        vector_scores = dict(zip(top_indices.tolist(), scores.tolist()))
+        lexical_scores = dict(zip(lex_indices.tolist(), lex_scores.tolist()))
+        missing = [i for i in fused if i not in vector_scores]
+        if missing:
+            vector_scores.update(zip(missing, (state.embeddings[missing] @ query_vec).tolist()))
+        return [
+            self._candidate(state, i, vector_score=vector_scores[i], lexical_score=lexical_scores.get(i, 0.0))
+            for i in fused
+        ]
+
+    @staticmethod
+    def _filter(state: IndexState, city: Optional[str], min_rating: Optional[float],
+                bbox: Optional[BBox]) -> Optional[np.ndarray]:
+        """Rows matching the structured filters, or None if there are none."""
+        return filter_rows(
+            len(state.ids), state.city_rows, state.ratings, state.lats, state.lngs,
+            city=city, min_rating=min_rating, bbox=bbox
+        )
+
+    @staticmethod
+    def _candidate(state: IndexState, i: int, **scores: float) -> Dict[str, Union[str, float]]:
+        """Build the result dictionary for row *i* of *state* with the given first-stage scores."""
+        return {
+            "id": state.ids[i],
+            "name": state.columns["name"][i],
+            "URL": state.columns["URL"][i],
+            "summary": state.columns["summary"][i],
+            "address": state.columns["address"][i],
+            "photo": state.columns["photo"][i],
+            "city": state.columns["city"][i],
+            "rating": state.columns["rating"][i],
+            "lat": None if math.isnan(state.lats[i]) else float(state.lats[i]),
+            "lng": None if math.isnan(state.lngs[i]) else float(state.lngs[i]),
+            **{name: float(score) for name, score in scores.items()}
+        }
             
-        # Get query embedding
-        query_vec = get_embedding(query).cpu().numpy().reshape(-1)
-        sims = self.embeddings @ query_vec
-        top_indices = np.argsort(sims)[-2*TOP_K:][::-1]
+    def refresh(self, full: bool = False):
+        """Bring the index up to date with the database.
+        
+        By default only rows past the watermark (higher id or newer
+        ``updated_at``) are read; updates are applied in place, deletions
+        dropped and new bars appended. The new arrays are built aside and
+        swapped in as one state object, so concurrent searches never see a
+        half-built matrix. Any change bumps the index version, which
+        invalidates the result cache.
         
-        # Prepare candidates for reranking
-        candidates = [
-            {
-                "id": self.ids[i],
-                "name": self.names[i],
-                "URL": self.URLs[i],
-                "summary": self.summaries[i],
-                "address": self.addresses[i],
-                "photo": self.photos[i],
-                "vector_score": float(sims[i])
+        Args:
+            full: Reload the whole table instead of applying a delta
+        """
+        with self._refresh_lock:
+            state = self._state
+            if full or not state.ids:
+                logger.info("Refreshing vector search index...")
+                self._load_embeddings()
+            else:
+                self._state = self._apply_delta(state)
+            if self._state is not state:
+                # Keys carry the index version, so old entries can never be served again
+                self._result_cache.clear()
+
+    def _apply_delta(self, state: IndexState) -> IndexState:
+        """Build a new state from *state* plus the rows changed since its watermark."""
+        # Taken before reading, like a full export, so a concurrent write marks the new snapshot stale
+        stat = db_stat(self.db_path) if isinstance(state.embeddings, np.memmap) else None
+        with sqlite3.connect(self.db_path) as conn:
+            present = table_columns(conn, "bars")
+            has_blob = "embedding_f32" in present
+            has_updated_at = "updated_at" in present
+            live_ids = {
+                bar_id for (bar_id,) in conn.execute(
+                    "SELECT id FROM bars WHERE embedding IS NOT NULL"
+                    + (" OR embedding_f32 IS NOT NULL" if has_blob else "")
+                )
             }
-            for i in top_indices
+
+        if has_updated_at:
+            changed_ids, changed_cols, changed_embs = self._read_db(
+                "WHERE id > ? OR updated_at >= ?", (state.max_id, state.max_updated_at - WATERMARK_SLACK)
+            )
+        else:
+            logger.warning("bars.updated_at is missing; refresh only picks up new bars (run the migration)")
+            changed_ids, changed_cols, changed_embs = self._read_db("WHERE id > ?", (state.max_id,))
+
+        positions = state.positions
+        deleted = [bar_id for bar_id in state.ids if bar_id not in live_ids]
+        stamps = state.columns["updated_at"]
+        updated = [
+            (positions[bar_id], k) for k, bar_id in enumerate(changed_ids)
+            if bar_id in positions and changed_cols["updated_at"][k] != stamps[positions[bar_id]]
         ]
-        
-        if rerank:
-            logger.info("Applying reranking...")
-            reranker = get_reranker()
-            return reranker.rerank(query, candidates)
+        added = [k for k, bar_id in enumerate(changed_ids) if bar_id not in positions]
+        if not (deleted or updated or added):
+            logger.info("Vector search index is up to date")
+            return state
 
-        return candidates
-            
-    def refresh(self):
-        """Reload embeddings from the database."""
-        logger.info("Refreshing vector search index...")
-        self._load_embeddings()
+        # Copy-on-write: old arrays stay valid for searches already running
+        columns = {c: list(values) for c, values in state.columns.items()}
+        prev_rows = np.arange(len(state.ids))
+        # New row i takes old row sources[i] if >= 0, else changed row -sources[i] - 1
+        sources = np.arange(len(state.ids))
+        for row, k in updated:
+            for c in BAR_COLUMNS:
+                columns[c][row] = changed_cols[c][k]
+            prev_rows[row] = -1
+            sources[row] = -k - 1
+
+        keep = np.ones(len(state.ids), dtype=bool)
+        keep[[positions[bar_id] for bar_id in deleted]] = False
+        ids = [bar_id for bar_id, kept in zip(state.ids, keep) if kept]
+        columns = {c: [v for v, kept in zip(values, keep) if kept] for c, values in columns.items()}
+        prev_rows = prev_rows[keep]
+        sources = sources[keep]
+
+        if added:
+            ids += [changed_ids[k] for k in added]
+            for c in BAR_COLUMNS:
+                columns[c] += [changed_cols[c][k] for k in added]
+            prev_rows = np.concatenate([prev_rows, np.full(len(added), -1)])
+            sources = np.concatenate([sources, -np.asarray(added) - 1])
+
+        fill = lambda out: self._gather_rows(state.embeddings, changed_embs, sources, out)
+        dim = state.embeddings.shape[1]
+        if stat is not None:
+            # Publish a new snapshot version and map it, so unchanged rows are never copied into private memory
+            embeddings = export_rows(self.db_path, ids, columns, dim, fill, stat).embeddings
+        else:
+            embeddings = np.empty((len(ids), dim), dtype=np.float32)
+            fill(embeddings)
+
+        index = state.index.updated(embeddings, prev_rows)
+        lexical = state.lexical.updated(self._lexical_texts(columns), prev_rows) if state.lexical else None
+        logger.info(
+            f"Refreshed vector search index: {len(added)} added, {len(updated)} updated, {len(deleted)} deleted"
+        )
+        return self._make_state(ids, columns, embeddings, index, lexical)
+
+    @staticmethod
+    def _gather_rows(base: np.ndarray, changed: np.ndarray, sources: np.ndarray, out: np.ndarray):
+        """Fill *out* with the rows named by *sources*, a block at a time (see ``_apply_delta``)."""
+        for start in range(0, len(sources), _GATHER_BLOCK):
+            src = sources[start:start + _GATHER_BLOCK]
+            block = out[start:start + len(src)]
+            old = src >= 0
+            block[old] = base[src[old]]
+            if not old.all():
+                block[~old] = changed[-src[~old] - 1]
         
 # Global instance for reuse
 _vector_search = None
@@ -0,0 +1,175 @@
+import argparse
+import math
+import sqlite3
+import time
+import numpy as np
+from itertools import combinations
+from typing import Dict, List, Sequence, Tuple
+from barhopping.config import BARS_DB, DISTANCES_DB
+from barhopping.database.sqlite import ensure_bar_distances
+from barhopping.geo import haversine_m
+from barhopping.routing.distance import DistanceProvider, Place, get_distance_provider
+from barhopping.logger import logger
+
+# Rows compared per block when finding bars within the precompute radius
+_BLOCK = 1024
+
+def _pair(a: int, b: int) -> Tuple[int, int]:
+    return (a, b) if a < b else (b, a)
+
+class DistanceCache:
+    """The ``bar_distances`` table: walking distances by bar pair, per provider.
+
+    It lives in its own database (``distances_db``): every write to the bars
+    database would otherwise mark the embedding snapshot stale.
+    """
+
+    def __init__(self, db_path: str = DISTANCES_DB):
+        self.db_path = db_path
+        with sqlite3.connect(db_path) as conn:
+            ensure_bar_distances(conn)
+            conn.commit()
+
+    def lookup(self, bar_ids: Sequence[int], source: str) -> Dict[Tuple[int, int], float]:
+        """Cached distances between any two of *bar_ids*, keyed by ``(smaller id, larger id)``."""
+        bar_ids = sorted(set(bar_ids))
+        if len(bar_ids) < 2:
+            return {}
+        marks = ", ".join("?" for _ in bar_ids)
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT bar_a, bar_b, meters FROM bar_distances "
+                f"WHERE source = ? AND bar_a IN ({marks}) AND bar_b IN ({marks})",
+                (source, *bar_ids, *bar_ids)
+            ).fetchall()
+        return {(a, b): meters for a, b, meters in rows}
+
+    def known_pairs(self, source: str) -> set:
+        with sqlite3.connect(self.db_path) as conn:
+            return set(conn.execute("SELECT bar_a, bar_b FROM bar_distances WHERE source = ?", (source,)))
+
+    def store(self, distances: Dict[Tuple[int, int], float], source: str):
+        """Save finite *distances*; failed lookups (``inf``) are not cached."""
+        now = time.time()
+        rows = [(*_pair(a, b), meters, source, now) for (a, b), meters in distances.items() if math.isfinite(meters)]
+        if not rows:
+            return
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bar_distances (bar_a, bar_b, meters, source, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+class CachedDistanceProvider(DistanceProvider):
+    """Serve distances from ``bar_distances`` and ask *provider* only for the missing pairs.
+
+    Args:
+        provider: Provider that computes uncached distances; its ``name`` is stored as the source
+        db_path: Database holding the ``bar_distances`` table
+    """
+
+    def __init__(self, provider: DistanceProvider, db_path: str = DISTANCES_DB):
+        self.provider = provider
+        self.name = f"cached-{provider.name}"
+        self.cache = DistanceCache(db_path)
+
+    def matrix(self, places: List[Place]) -> np.ndarray:
+        n = len(places)
+        matrix = np.zeros((n, n))
+        known = self.cache.lookup([p.bar_id for p in places if p.bar_id is not None], self.provider.name)
+
+        missing = []
+        for i, j in combinations(range(n), 2):
+            a, b = places[i].bar_id, places[j].bar_id
+            meters = known.get(_pair(a, b)) if a is not None and b is not None else None
+            if meters is None:
+                missing.append((i, j))
+            else:
+                matrix[i, j] = matrix[j, i] = meters
+
+        if missing:
+            fetched = {}
+            for (i, j), meters in zip(missing, self.provider.pairs(places, missing)):
+                matrix[i, j] = matrix[j, i] = meters
+                if places[i].bar_id is not None and places[j].bar_id is not None:
+                    fetched[(places[i].bar_id, places[j].bar_id)] = meters
+            self.cache.store(fetched, self.provider.name)
+        logger.info(f"Distance matrix for {n} bars: {n * (n - 1) // 2 - len(missing)} cached, {len(missing)} fetched")
+        return matrix
+
+    def close(self):
+        self.provider.close()
+
+def load_places(db_path: str = BARS_DB) -> List[Place]:
+    """Every bar with coordinates, as a ``Place``."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT id, address, lat, lng FROM bars WHERE lat IS NOT NULL AND lng IS NOT NULL ORDER BY id"
+        ).fetchall()
+    return [Place(address or "", lat, lng, bar_id) for bar_id, address, lat, lng in rows]
+
+def pairs_within(places: List[Place], radius_m: float) -> List[Tuple[int, int]]:
+    """Index pairs ``(i, j)``, ``i < j``, of places at most *radius_m* apart as the crow flies."""
+    lats = np.array([p.lat for p in places])
+    lngs = np.array([p.lng for p in places])
+    pairs = []
+    for start in range(0, len(places), _BLOCK):
+        block = haversine_m(lats[start:start + _BLOCK, None], lngs[start:start + _BLOCK, None], lats[None, :], lngs[None, :])
+        rows, cols = np.nonzero(block <= radius_m)
+        rows += start
+        keep = rows < cols
+        pairs.extend(zip(rows[keep].tolist(), cols[keep].tolist()))
+    return pairs
+
+def precompute(provider: DistanceProvider, db_path: str = BARS_DB, radius_m: float = 2000.0,
+               batch_size: int = 50, cache_path: str = DISTANCES_DB) -> int:
+    """Cache the distance of every pair of bars within *radius_m* of each other.
+
+    Pairs already cached for this provider are skipped, so the job can be
+    interrupted and resumed.
+
+    Args:
+        provider: Provider to compute the distances with
+        db_path: Bars database
+        radius_m: Straight-line radius in metres
+        batch_size: Pairs fetched and saved at a time
+        cache_path: Database holding the ``bar_distances`` table
+    Returns:
+        Number of pairs fetched
+    """
+    cache = DistanceCache(cache_path)
+    places = load_places(db_path)
+    known = cache.known_pairs(provider.name)
+    todo = [
+        (i, j) for i, j in pairs_within(places, radius_m)
+        if _pair(places[i].bar_id, places[j].bar_id) not in known
+    ]
+    logger.info(f"Precomputing {len(todo)} {provider.name} distances within {radius_m:.0f} m of {len(places)} bars")
+
+    try:
+        for start in range(0, len(todo), batch_size):
+            chunk = todo[start:start + batch_size]
+            distances = provider.pairs(places, chunk)
+            cache.store({(places[i].bar_id, places[j].bar_id): d for (i, j), d in zip(chunk, distances)}, provider.name)
+            logger.info(f"Cached {min(start + batch_size, len(todo))}/{len(todo)} distances")
+    finally:
+        provider.close()
+    return len(todo)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Precompute walking distances between nearby bars")
+    parser.add_argument("--db", default=BARS_DB, help="Bars database")
+    parser.add_argument("--cache-db", default=DISTANCES_DB, help="Database holding the distance cache")
+    parser.add_argument("--provider", default="selenium", help="Distance provider to cache")
+    parser.add_argument("--radius", type=float, default=2000.0, help="Only pairs within this many metres")
+    parser.add_argument("--batch-size", type=int, default=50, help="Pairs saved at a time")
+    args = parser.parse_args(argv)
+
+    provider = get_distance_provider(args.provider)
+    if isinstance(provider, CachedDistanceProvider):
+        provider = provider.provider
+    precompute(provider, args.db, args.radius, args.batch_size, args.cache_db)
+
+if __name__ == "__main__":
+    main()
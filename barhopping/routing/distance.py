@@ -0,0 +1,75 @@
+import math
+import numpy as np
+from typing import List, NamedTuple, Optional, Tuple
+from barhopping.config import DISTANCE_PROVIDER, DISTANCE_CACHE, STREET_FACTOR
+from barhopping.geo import haversine_matrix
+from barhopping.logger import logger
+
+class Place(NamedTuple):
+    """A stop on a route: its address, coordinates if known (NaN otherwise) and bar id if any."""
+    address: str
+    lat: float = math.nan
+    lng: float = math.nan
+    bar_id: Optional[int] = None
+
+    @property
+    def located(self) -> bool:
+        return not (math.isnan(self.lat) or math.isnan(self.lng))
+
+class DistanceProvider:
+    """Walking distances between places, in metres."""
+    name = "base"
+
+    def matrix(self, places: List[Place]) -> np.ndarray:
+        """Symmetric ``(n, n)`` distance matrix; ``inf`` where a distance is unknown."""
+        raise NotImplementedError
+
+    def pairs(self, places: List[Place], pairs: List[Tuple[int, int]]) -> List[float]:
+        """Distances between the index *pairs* of *places*; by default read off ``matrix``."""
+        involved = sorted({i for pair in pairs for i in pair})
+        position = {i: k for k, i in enumerate(involved)}
+        matrix = self.matrix([places[i] for i in involved])
+        return [float(matrix[position[i], position[j]]) for i, j in pairs]
+
+    def close(self):
+        """Release any resources held by the provider."""
+
+class HaversineProvider(DistanceProvider):
+    """Great-circle distances scaled by a street factor for the detour of real streets.
+
+    Args:
+        street_factor: Multiplier applied to straight-line distances (1.0 = as the crow flies)
+    """
+    name = "haversine"
+
+    def __init__(self, street_factor: float = STREET_FACTOR):
+        self.street_factor = street_factor
+
+    def matrix(self, places: List[Place]) -> np.ndarray:
+        missing = [p.address for p in places if not p.located]
+        if missing:
+            logger.warning(f"No coordinates for {len(missing)} places: {missing}")
+        matrix = haversine_matrix([p.lat for p in places], [p.lng for p in places]) * self.street_factor
+        matrix[np.isnan(matrix)] = np.inf
+        np.fill_diagonal(matrix, 0.0)
+        return matrix
+
+def get_distance_provider(name: Optional[str] = None) -> DistanceProvider:
+    """Create the distance provider named *name* (default: ``distance_provider`` in the config).
+
+    ``haversine`` is instant and offline; ``selenium`` looks up every pair on
+    Google Maps in a headless browser and is only worth it when precision matters.
+    Looked-up providers are wrapped in the ``bar_distances`` cache if ``distance_cache`` is on.
+    """
+    name = name or DISTANCE_PROVIDER
+    if name == "haversine":
+        return HaversineProvider()
+    if name == "selenium":
+        from barhopping.routing.selenium_provider import SeleniumProvider
+        provider = SeleniumProvider()
+    else:
+        raise ValueError(f"Unknown distance provider: {name}")
+    if DISTANCE_CACHE:
+        from barhopping.routing.cache import CachedDistanceProvider
+        provider = CachedDistanceProvider(provider)
+    return provider
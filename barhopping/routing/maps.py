@@ -0,0 +1,72 @@
+import math
+from html import escape
+from typing import List, Optional
+from urllib.parse import urlencode
+from barhopping.routing.distance import Place
+
+DIRECTIONS_URL = "https://www.google.com/maps/dir/"
+
+# Google Maps accepts at most this many intermediate waypoints in a directions URL
+MAX_WAYPOINTS = 9
+
+def _location(place: Place) -> str:
+    """A place as Google Maps understands it: its address, or ``lat,lng`` when it has no address."""
+    if place.address or not place.located:
+        return place.address
+    return f"{place.lat:.6f},{place.lng:.6f}"
+
+def directions_url(stops: List[Place], travelmode: str = "walking") -> str:
+    """Google Maps directions link visiting *stops* in order, built without opening Maps.
+
+    Uses the Maps URLs API (``api=1``); stops beyond ``MAX_WAYPOINTS`` waypoints are dropped.
+    """
+    if not stops:
+        return DIRECTIONS_URL
+    params = {"api": "1"}
+    if len(stops) > 1:
+        params["origin"] = _location(stops[0])
+    params["destination"] = _location(stops[-1])
+    waypoints = [_location(stop) for stop in stops[1:-1]][:MAX_WAYPOINTS]
+    if waypoints:
+        params["waypoints"] = "|".join(waypoints)
+    params["travelmode"] = travelmode
+    return f"{DIRECTIONS_URL}?{urlencode(params)}"
+
+def route_svg(stops: List[Place], labels: Optional[List[str]] = None, width: int = 480, height: int = 320,
+              padding: int = 28) -> str:
+    """Inline SVG sketch of the route: numbered stops joined in order on a local projection.
+
+    Stops without coordinates are left out. Returns an empty string if fewer than two can be drawn.
+    """
+    labels = labels or [stop.address for stop in stops]
+    located = [(i, stop) for i, stop in enumerate(stops) if stop.located]
+    if len(located) < 2:
+        return ""
+
+    # Equirectangular projection around the route's mean latitude, scaled to fit with equal axes
+    scale_x = math.cos(math.radians(sum(stop.lat for _, stop in located) / len(located)))
+    xs = [stop.lng * scale_x for _, stop in located]
+    ys = [stop.lat for _, stop in located]
+    span = max(max(xs) - min(xs), max(ys) - min(ys)) or 1.0
+    scale = min(width, height) - 2 * padding
+    off_x = (width - (max(xs) - min(xs)) / span * scale) / 2
+    off_y = (height - (max(ys) - min(ys)) / span * scale) / 2
+    points = [
+        (off_x + (x - min(xs)) / span * scale, height - off_y - (y - min(ys)) / span * scale)
+        for x, y in zip(xs, ys)
+    ]
+
+    line = " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+    markers = "".join(
+        f'<g><title>{escape(labels[i])}</title>'
+        f'<circle cx="{x:.1f}" cy="{y:.1f}" r="11" fill="#fbbf24" stroke="#1e1e1e" stroke-width="2"/>'
+        f'<text x="{x:.1f}" y="{y + 4:.1f}" text-anchor="middle" font-size="12" font-weight="bold" '
+        f'fill="#1e1e1e">{i + 1}</text></g>'
+        for (i, _), (x, y) in zip(located, points)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="100%" '
+        f'style="background:#2a2a2a; border-radius:12px;">'
+        f'<polyline points="{line}" fill="none" stroke="#fbbf24" stroke-width="3" stroke-dasharray="6 4" '
+        f'stroke-linejoin="round"/>{markers}</svg>'
+    )
@@ -0,0 +1,152 @@
+import time
+import numpy as np
+from typing import List, Optional
+from barhopping.config import ROUTE_TIME_BUDGET
+from barhopping.routing.solver import finite_costs, or_opt, path_length, two_opt
+
+# Added metres below which insertions are ranked by relevance alone
+_MIN_DETOUR_M = 1.0
+
+# Relevance-versus-detour trade-offs each tried as a starting route
+_DETOUR_WEIGHTS = (1.0, 0.5, 2.0, 0.0)
+
+# Most relevant stops each forced into a starting route of their own
+_SEED_STOPS = 8
+
+def _insertion_costs(dist: np.ndarray, path: List[int], nodes: np.ndarray):
+    """Cheapest extra distance, and where, for inserting each of *nodes* into the open *path*.
+
+    Returns:
+        ``(added, position)`` arrays; inserting ``nodes[i]`` at ``position[i]`` lengthens the path by ``added[i]``
+    """
+    p = np.array(path)
+    # added[k, i]: put nodes[i] right after p[k]
+    added = dist[np.ix_(p, nodes)].copy()
+    added[:-1] += dist[np.ix_(nodes, p[1:])].T - dist[p[:-1], p[1:]][:, None]
+    best = added.argmin(axis=0)
+    return added[best, np.arange(len(nodes))], best + 1
+
+def greedy_insert(dist: np.ndarray, scores: np.ndarray, budget: float, path: List[int],
+                  max_stops: Optional[int] = None, detour_weight: float = 1.0) -> List[int]:
+    """Keep inserting the node with the best relevance per added metre that still fits the budget.
+
+    *detour_weight* is the exponent on the added distance: 0 ranks by relevance alone,
+    larger values favour cheap detours.
+    """
+    path = list(path)
+    length = path_length(dist, path)
+    while max_stops is None or len(path) - 1 < max_stops:
+        visited = np.zeros(len(dist), dtype=bool)
+        visited[path] = True
+        nodes = np.flatnonzero(~visited & (scores > 0))
+        if not len(nodes):
+            break
+        added, positions = _insertion_costs(dist, path, nodes)
+        feasible = length + added <= budget
+        if not feasible.any():
+            break
+        ratio = np.where(feasible, scores[nodes] / np.maximum(added, _MIN_DETOUR_M) ** detour_weight, -np.inf)
+        i = int(ratio.argmax())
+        path.insert(int(positions[i]), int(nodes[i]))
+        length += added[i]
+    return path
+
+def best_swap(dist: np.ndarray, scores: np.ndarray, budget: float, path: List[int]) -> Optional[List[int]]:
+    """The feasible path with the largest relevance gain from replacing one stop with an unvisited node."""
+    visited = np.zeros(len(dist), dtype=bool)
+    visited[path] = True
+    nodes = np.flatnonzero(~visited & (scores > 0))
+    best, best_gain = None, 0.0
+    for k in range(1, len(path)):
+        removed = path[k]
+        candidates = nodes[scores[nodes] > scores[removed] + best_gain]
+        if not len(candidates):
+            continue
+        rest = path[:k] + path[k + 1:]
+        added, positions = _insertion_costs(dist, rest, candidates)
+        fits = path_length(dist, rest) + added <= budget
+        if not fits.any():
+            continue
+        i = int(np.where(fits, scores[candidates], -np.inf).argmax())
+        gain = scores[candidates[i]] - scores[removed]
+        if gain > best_gain:
+            best_gain = gain
+            best = rest[:positions[i]] + [int(candidates[i])] + rest[positions[i]:]
+    return best
+
+def _improve(dist: np.ndarray, scores: np.ndarray, budget: float, path: List[int],
+             max_stops: Optional[int], deadline: Optional[float]) -> List[int]:
+    """Local search from *path*: shorten, refill, swap stops, and drop a stop to refill with others."""
+    while deadline is None or time.perf_counter() < deadline:
+        shorter = or_opt(dist, two_opt(dist, path, deadline), deadline)
+        if path_length(dist, shorter) < path_length(dist, path):
+            path = shorter
+        grown = greedy_insert(dist, scores, budget, path, max_stops)
+        if len(grown) > len(path):
+            path = grown
+            continue
+        swapped = best_swap(dist, scores, budget, path)
+        if swapped is None:
+            swapped = _drop_and_refill(dist, scores, budget, path, max_stops, deadline)
+        if swapped is None:
+            break
+        path = swapped
+    return path
+
+def _drop_and_refill(dist: np.ndarray, scores: np.ndarray, budget: float, path: List[int],
+                     max_stops: Optional[int], deadline: Optional[float]) -> Optional[List[int]]:
+    """The first route that collects more relevance after removing one stop and greedily refilling."""
+    total = scores[path].sum()
+    for k in range(1, len(path)):
+        rest = path[:k] + path[k + 1:]
+        rest = or_opt(dist, two_opt(dist, rest, deadline), deadline)
+        refilled = greedy_insert(dist, np.where(np.arange(len(scores)) == path[k], 0.0, scores), budget, rest, max_stops)
+        if scores[refilled].sum() > total + 1e-9:
+            return refilled
+    return None
+
+def orienteer(dist: np.ndarray, scores, budget: float, start: Optional[int] = None,
+              max_stops: Optional[int] = None, time_budget: Optional[float] = ROUTE_TIME_BUDGET) -> List[int]:
+    """Pick and order stops to collect the most relevance within a walking budget.
+
+    Greedy insertion builds several routes, under a few trade-offs between
+    relevance and detour and with each of the most relevant stops forced in
+    first; local search then improves each by shortening it with 2-opt
+    and Or-opt, inserting whatever now fits, swapping a stop for a more
+    relevant one, and dropping a stop to make room for others. The best
+    route found is returned.
+
+    Args:
+        dist: ``(n, n)`` distance matrix in metres; ``inf`` marks unknown distances
+        scores: Non-negative relevance of each node; nodes scoring 0 are never visited
+        budget: Longest allowed route in metres
+        start: Node the route must start at, or None to start anywhere
+        max_stops: Most stops to visit, not counting *start*
+        time_budget: Seconds to spend on local search, or None for no limit
+    Returns:
+        Node order, beginning with *start* if given
+    """
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    dist = finite_costs(dist)
+    scores = np.maximum(np.asarray(scores, dtype=np.float64), 0.0)
+    if start is None:
+        # A virtual start at distance 0 from every node lets the route begin anywhere
+        n = len(dist)
+        dist = np.pad(dist, ((0, 1), (0, 1)))
+        scores = np.append(scores, 0.0)
+        start = n
+    else:
+        scores = scores.copy()
+        scores[start] = 0.0
+        n = None
+
+    seeds = [([start], weight) for weight in _DETOUR_WEIGHTS]
+    reachable = np.flatnonzero((scores > 0) & (dist[start] <= budget))
+    seeds += [([start, int(node)], 1.0) for node in reachable[np.argsort(-scores[reachable])][:_SEED_STOPS]]
+    best = [start]
+    for seed, detour_weight in seeds:
+        path = greedy_insert(dist, scores, budget, seed, max_stops, detour_weight)
+        path = _improve(dist, scores, budget, path, max_stops, deadline)
+        if scores[path].sum() > scores[best].sum():
+            best = path
+    return best[1:] if n is not None else best
@@ -0,0 +1,95 @@
+import re
+import numpy as np
+from itertools import combinations
+from typing import List, Optional, Tuple
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from barhopping.browser import BrowserPool, get_browser_pool
+from barhopping.routing.distance import DistanceProvider, Place
+from barhopping.logger import logger
+
+class SeleniumProvider(DistanceProvider):
+    """Walking distances looked up pair by pair on Google Maps in a headless browser.
+
+    Precise but slow: n(n-1)/2 page loads per matrix.
+    """
+    name = "selenium"
+
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        """
+        Args:
+            pool: Browsers to look distances up with; defaults to the shared pool
+        """
+        self.pool = pool or get_browser_pool()
+
+    def close(self):
+        """Nothing to release: browsers go back to the shared pool after each lookup."""
+
+    @staticmethod
+    def _lookup(browser, addr1: str, addr2: str, unit: str = "m") -> float:
+        """Reads the walking distance between two addresses off Google Maps in *browser*."""
+        browser.get("https://www.google.com/maps/dir/")
+
+        # Click walking mode - wait for the button to be clickable
+        WebDriverWait(browser, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "m6Uuef"))
+        )
+        travel_btn = browser.find_elements(By.CLASS_NAME, "m6Uuef")
+        for btn in travel_btn:
+            if btn.get_attribute("data-tooltip") == "Walking":
+                btn.click()
+                break
+
+        # Add two addresses
+        inputs = browser.find_elements(By.CLASS_NAME, "tactile-searchbox-input")
+        inputs[0].send_keys(addr1)
+        inputs[1].send_keys(addr2)
+        inputs[1].send_keys(Keys.ENTER)
+
+        # Wait for the distance info to be present
+        WebDriverWait(browser, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "ivN21e"))
+        )
+        dist = browser.find_element(By.CLASS_NAME, "ivN21e")
+
+        conversion = {'km':1000, 'm':1, 'mile':1609.344, 'ft':0.3048}
+        convert_unit = lambda s: (
+            lambda m: float(m.group(1)) * conversion[m.group(2)] / conversion[unit] if m else 0
+        )(re.match(r'([\d.]+)\s*(mile|ft|km|m)', s))
+
+        return convert_unit(dist.text)
+
+    def _pair_distance(self, browser, addresses: Tuple[str, str]) -> float:
+        addr1, addr2 = addresses
+        try:
+            return self._lookup(browser, addr1, addr2)
+        except Exception as e:
+            logger.error(f"Error getting distance between '{addr1}' and '{addr2}': {str(e)}")
+            return float("inf")
+
+    def distance(self, addr1: str, addr2: str, unit: str = "m") -> float:
+        """Fetches walking distance between two addresses using Google Maps."""
+        try:
+            with self.pool.lease() as browser:
+                return self._lookup(browser, addr1, addr2, unit)
+        except Exception as e:
+            logger.error(f"Error getting distance between '{addr1}' and '{addr2}': {str(e)}")
+            return float("inf")
+
+    def pairs(self, places: List[Place], pairs: List[Tuple[int, int]]) -> List[float]:
+        """Looks up only the requested pairs, in parallel across the pool's browsers."""
+        return self.pool.map(self._pair_distance, [(places[i].address, places[j].address) for i, j in pairs])
+
+    def matrix(self, places: List[Place]) -> np.ndarray:
+        """Builds a symmetric distance matrix between all bar addresses."""
+        n = len(places)
+        matrix = np.zeros((n, n))
+        pairs = list(combinations(range(n), 2))
+
+        for (i, j), dist in zip(pairs, self.pairs(places, pairs)):
+            matrix[i][j] = matrix[j][i] = dist
+            logger.info(f"Distance between {places[i].address} and {places[j].address}: {dist} meters")
+
+        return matrix
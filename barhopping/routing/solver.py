@@ -0,0 +1,176 @@
+import time
+import numpy as np
+from typing import List, Optional
+from barhopping.config import ROUTE_EXACT_MAX, ROUTE_TIME_BUDGET
+from barhopping.logger import logger
+
+# Improvements smaller than this are treated as rounding noise
+_EPS = 1e-9
+
+def path_length(dist: np.ndarray, path: List[int]) -> float:
+    """Total length of visiting *path* in order."""
+    return float(sum(dist[a, b] for a, b in zip(path, path[1:])))
+
+def finite_costs(dist: np.ndarray) -> np.ndarray:
+    """Copy of *dist* with unknown (``inf``) distances replaced by a penalty longer than any route."""
+    dist = np.asarray(dist, dtype=np.float64)
+    finite = np.isfinite(dist)
+    penalty = dist[finite].sum() + 1.0 if finite.any() else 1.0
+    return np.where(finite, dist, penalty)
+
+def held_karp(dist: np.ndarray, start: int = 0, deadline: Optional[float] = None) -> Optional[List[int]]:
+    """Shortest open path from *start* through every node, by bitmask dynamic programming.
+
+    ``cost[mask, v]`` is the shortest path from *start* through the nodes in
+    ``mask`` ending at ``v``. Masks are filled one popcount layer at a time;
+    within a layer, every mask ending at ``v`` is relaxed at once over all
+    predecessors. Time is O(2^n n^2) and memory O(2^n n).
+
+    Args:
+        dist: ``(n, n)`` finite distance matrix
+        start: Node the path starts at
+        deadline: ``time.perf_counter()`` value after which to give up
+    Returns:
+        Node order, or None if the deadline passed
+    """
+    n = len(dist)
+    if n <= 2:
+        return [start] + [v for v in range(n) if v != start]
+
+    bits = 1 << np.arange(n)
+    masks = np.arange(1 << n)
+    masks = masks[(masks & bits[start]) != 0]
+    sizes = sum((masks >> b) & 1 for b in range(n))
+
+    cost = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int8)
+    cost[bits[start], start] = 0.0
+    for size in range(2, n + 1):
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        layer = masks[sizes == size]
+        for v in range(n):
+            if v == start:
+                continue
+            target = layer[(layer & bits[v]) != 0]
+            totals = cost[target ^ bits[v]] + dist[:, v]
+            best = totals.argmin(axis=1)
+            cost[target, v] = totals[np.arange(len(target)), best]
+            parent[target, v] = best
+
+    mask = (1 << n) - 1
+    last = int(cost[mask].argmin())
+    path = [last]
+    while last != start:
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+        path.append(last)
+    return path[::-1]
+
+def nearest_neighbour(dist: np.ndarray, start: int = 0) -> List[int]:
+    """Greedy path: always walk to the closest unvisited node."""
+    visited = np.zeros(len(dist), dtype=bool)
+    visited[start] = True
+    path = [start]
+    for _ in range(len(dist) - 1):
+        nxt = int(np.where(visited, np.inf, dist[path[-1]]).argmin())
+        visited[nxt] = True
+        path.append(nxt)
+    return path
+
+def two_opt(dist: np.ndarray, path: List[int], deadline: Optional[float] = None) -> List[int]:
+    """Reverse segments of an open path while that shortens it; the first node stays fixed."""
+    path = np.array(path)
+    n = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            if deadline is not None and time.perf_counter() > deadline:
+                return path.tolist()
+            a, b = path[i - 1], path[i]
+            ks = np.arange(i + 1, n)
+            c = path[ks]
+            after = path[np.minimum(ks + 1, n - 1)]
+            # Reversing path[i..k] swaps edges (a, b), (c, after) for (a, c), (b, after); the last segment has no after
+            delta = dist[a, c] - dist[a, b] + np.where(ks < n - 1, dist[b, after] - dist[c, after], 0.0)
+            best = int(delta.argmin())
+            if delta[best] < -_EPS:
+                k = ks[best]
+                path[i:k + 1] = path[i:k + 1][::-1]
+                improved = True
+    return path.tolist()
+
+def or_opt(dist: np.ndarray, path: List[int], deadline: Optional[float] = None, max_segment: int = 3) -> List[int]:
+    """Move runs of up to *max_segment* nodes, either way round, to where they fit best."""
+    path = list(path)
+    n = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                if deadline is not None and time.perf_counter() > deadline:
+                    return path
+                segment = path[i:i + length]
+                rest = np.array(path[:i] + path[i + length:])
+                before, after = path[i - 1], path[i + length] if i + length < n else None
+                saving = dist[before, segment[0]]
+                if after is not None:
+                    saving += dist[segment[-1], after] - dist[before, after]
+
+                # Insert between rest[j] and rest[j + 1], or after the last node
+                left, right = rest, rest[1:]
+                best = None
+                for run in (segment, segment[::-1]):
+                    added = dist[left, run[0]]
+                    added[:-1] += dist[run[-1], right] - dist[left[:-1], right]
+                    if run is segment:
+                        added[i - 1] = np.inf  # where it came from
+                    j = int(added.argmin())
+                    if added[j] - saving < -_EPS and (best is None or added[j] < best[0]):
+                        best = (added[j], j, run)
+                if best is not None:
+                    _, j, run = best
+                    rest = rest.tolist()
+                    path = rest[:j + 1] + list(run) + rest[j + 1:]
+                    improved = True
+                    break
+            if improved:
+                break
+    return path
+
+def local_search(dist: np.ndarray, path: List[int], deadline: Optional[float] = None) -> List[int]:
+    """Alternate 2-opt and Or-opt until neither improves the path or the deadline passes."""
+    length = path_length(dist, path)
+    while deadline is None or time.perf_counter() < deadline:
+        path = or_opt(dist, two_opt(dist, path, deadline), deadline)
+        new_length = path_length(dist, path)
+        if new_length > length - _EPS:
+            break
+        length = new_length
+    return path
+
+def solve(dist: np.ndarray, start: int = 0, exact_max: int = ROUTE_EXACT_MAX,
+          time_budget: Optional[float] = ROUTE_TIME_BUDGET) -> List[int]:
+    """Order in which to visit every node of *dist*, starting from *start*.
+
+    Up to *exact_max* nodes the shortest path is found with Held-Karp; larger
+    routes, or exact solves that overrun *time_budget* seconds, fall back to
+    nearest neighbour improved by 2-opt and Or-opt for the remaining time.
+
+    Args:
+        dist: ``(n, n)`` distance matrix; ``inf`` marks unknown distances
+        start: Node the route starts at
+        exact_max: Largest route solved exactly
+        time_budget: Seconds to spend, or None for no limit
+    """
+    dist = finite_costs(dist)
+    deadline = time.perf_counter() + time_budget if time_budget else None
+    if len(dist) <= exact_max:
+        path = held_karp(dist, start, deadline)
+        if path is not None:
+            return path
+        logger.warning(f"Exact route for {len(dist)} bars ran out of time; using heuristics")
+    return local_search(dist, nearest_neighbour(dist, start), deadline)
@@ -1,24 +1,28 @@
 import re
 import time
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.actions.wheel_input import ScrollOrigin
+from barhopping.browser import get_browser_pool
 from barhopping.config import MAX_BARS, MAX_PHOTOS, MAX_REVS
 from barhopping.logger import logger
 
-# Single browser instance
-def _init_browser() -> webdriver.Chrome:
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    return webdriver.Chrome(options=options)
-
-browser = _init_browser()
+# Each public function leases a browser from the shared pool for one page
 
 def get_bars(city: str, nums: int = MAX_BARS) -> list[dict]:
+    with get_browser_pool().lease() as browser:
+        return _get_bars(browser, city, nums)
+
+def get_addr_reviews(url: str, min_char: int = MAX_REVS) -> tuple[str, list[str]]:
+    with get_browser_pool().lease() as browser:
+        return _get_addr_reviews(browser, url, min_char)
+
+def get_photos(url: str, nums: int = MAX_PHOTOS) -> list[str]:
+    with get_browser_pool().lease() as browser:
+        return _get_photos(browser, url, nums)
+
+def _get_bars(browser, city: str, nums: int) -> list[dict]:
     url = f"https://www.google.com/maps/search/bars+in+{city}"
     browser.get(url)
     
@@ -48,7 +52,7 @@ def get_bars(city: str, nums: int = MAX_BARS) -> list[dict]:
     return bars
 
 
-def get_addr_reviews(url: str, min_char: int = MAX_REVS) -> tuple[str, list[str]]:
+def _get_addr_reviews(browser, url: str, min_char: int) -> tuple[str, list[str]]:
     browser.get(url)
 
     try:
@@ -92,7 +96,7 @@ def get_addr_reviews(url: str, min_char: int = MAX_REVS) -> tuple[str, list[str]
     return address, reviews
 
 
-def get_photos(url: str, nums: int = MAX_PHOTOS) -> list[str]:
+def _get_photos(browser, url: str, nums: int) -> list[str]:
     browser.get(url)
 
     try:
@@ -0,0 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+class Overloaded(Exception):
+    """Raised when a request waited longer than the admission timeout for a slot."""
+
+class AdmissionControl:
+    """Admit at most *limit* requests at once; the rest queue in arrival order.
+
+    Args:
+        limit: Requests processed concurrently
+        timeout: Seconds a request may wait in the queue before ``Overloaded`` is raised (None = forever)
+    """
+
+    def __init__(self, limit: int, timeout: Optional[float] = None):
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the *limit* slots for the duration of an ``async with`` block."""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"No slot free within {self.timeout}s ({self.limit} requests in progress)") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                "admitted": self.admitted, "rejected": self.rejected}
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Literal, Optional, Tuple
+import uvicorn
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, StringConstraints, model_validator
+from typing_extensions import Annotated
+from barhopping.config import (
+    TOP_K, EMBEDDING_WARMUP, MODEL_SERVER, ROUTE_WALK_BUDGET, ROUTE_POOL_SIZE, ROUTE_MAX_STOPS,
+    API_HOST, API_PORT, API_WORKERS, API_MAX_CONCURRENCY, API_QUEUE_TIMEOUT,
+    API_INFERENCE_WORKERS, API_ROUTE_WORKERS, API_MAX_BATCH
+)
+from barhopping.embedding.granite import encoder_status, is_ready, warm_up
+from barhopping.path_finder import PathFinder
+from barhopping.retriever.vector_search import get_vector_search
+from barhopping.routing.distance import Place
+from barhopping.routing.maps import directions_url
+from barhopping.serving.admission import AdmissionControl, Overloaded
+from barhopping.serving.client import get_model_client
+from barhopping.logger import logger
+
+Query = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=500)]
+Coordinates = Tuple[Annotated[float, Field(ge=-90, le=90)], Annotated[float, Field(ge=-180, le=180)]]
+
+class SearchOptions(BaseModel):
+    top_k: int = Field(TOP_K, ge=1, le=50)
+    rerank: bool = True
+    city: Optional[str] = None
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    bbox: Optional[Tuple[float, float, float, float]] = Field(None, description="min_lat, min_lng, max_lat, max_lng")
+    mode: Optional[Literal["vector", "hybrid", "lexical"]] = None
+
+    def filters(self) -> Dict[str, Any]:
+        return {"top_k": self.top_k, "city": self.city, "min_rating": self.min_rating,
+                "bbox": self.bbox, "mode": self.mode}
+
+class SearchRequest(SearchOptions):
+    query: Query
+
+class BatchSearchRequest(SearchOptions):
+    queries: List[Query] = Field(min_length=1, max_length=API_MAX_BATCH)
+
+class RouteRequest(BaseModel):
+    """Either order the given bars, or search for *query* and plan a route through the best matches."""
+    bar_ids: Optional[List[int]] = Field(None, min_length=1, max_length=50)
+    query: Optional[Query] = None
+    budget_m: Optional[float] = Field(None, gt=0, le=50000, description="Walking budget; defaults to route_walk_budget")
+    start: Optional[Coordinates] = Field(None, description="lat, lng to start walking from (query routes only)")
+    max_stops: int = Field(ROUTE_MAX_STOPS, ge=1, le=20)
+
+    @model_validator(mode="after")
+    def _one_source(self) -> "RouteRequest":
+        if (self.bar_ids is None) == (self.query is None):
+            raise ValueError("Give exactly one of bar_ids and query")
+        if self.start is not None and self.query is None:
+            raise ValueError("start is only supported with query")
+        return self
+
+def _jsonable(value: Any) -> Any:
+    """Replace NaN and infinite floats, which JSON cannot represent, with None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+class _Timer:
+    """Milliseconds spent in each stage of a request."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._mark = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.timings[f"{stage}_ms"] = round((now - self._mark) * 1000, 2)
+        self._mark = now
+
+def _search(options: SearchRequest) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """One search, timing retrieval and reranking separately (blocking)."""
+    timer = _Timer()
+    results = []
+    for stage, results in get_vector_search().search_stages(options.query, rerank=options.rerank, **options.filters()):
+        timer.lap("retrieval" if stage == "candidates" else "rerank")
+    return results, timer.timings
+
+def _route_candidates(request: RouteRequest) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """Search results to plan a *query* route through (blocking: runs the models)."""
+    timer = _Timer()
+    top_k = ROUTE_POOL_SIZE if request.budget_m or ROUTE_WALK_BUDGET else request.max_stops
+    bars = get_vector_search().search(request.query, top_k=top_k)
+    timer.lap("search")
+    return bars, timer.timings
+
+def _route(path_finder: PathFinder, request: RouteRequest,
+           bars: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[float], Dict[str, float]]:
+    """Bars to visit in order and the leg distances (blocking: distance lookups and route solving)."""
+    timer = _Timer()
+    if not bars:
+        return [], [], timer.timings
+    budget = request.budget_m or ROUTE_WALK_BUDGET
+    if request.query is not None and budget:
+        path, distances = path_finder.plan_route(bars, budget, start=request.start, max_stops=request.max_stops)
+    else:
+        path, distances = path_finder.find_optimal_path(
+            [bar["id"] for bar in bars],
+            [f"{bar['name']}, {bar['address']}" for bar in bars],
+            [(bar["lat"], bar["lng"]) for bar in bars],
+        )
+    timer.lap("route")
+    return [bars[i] for i in path], [float(d) for d in distances], timer.timings
+
+def _warm_up():
+    """Load the models and answer the configured queries before the first request."""
+    if EMBEDDING_WARMUP and not MODEL_SERVER:
+        warm_up(background=False)
+    try:
+        get_vector_search().prewarm()
+    except Exception as e:
+        logger.warning(f"Could not pre-warm the result cache: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.path_finder = PathFinder()
+    app.state.inference = ThreadPoolExecutor(API_INFERENCE_WORKERS, thread_name_prefix="api-inference")
+    app.state.routing = ThreadPoolExecutor(API_ROUTE_WORKERS, thread_name_prefix="api-route")
+    app.state.admission = AdmissionControl(API_MAX_CONCURRENCY, API_QUEUE_TIMEOUT or None)
+    get_vector_search()
+    threading.Thread(target=_warm_up, name="api-warmup", daemon=True).start()
+    yield
+    app.state.inference.shutdown(wait=False)
+    app.state.routing.shutdown(wait=False)
+
+app = FastAPI(title="RunTini", description="Bar search and bar-hopping routes", lifespan=lifespan)
+
+async def admitted(request: Request):
+    """Hold an admission slot for the request; 503 if none frees up within the queue timeout."""
+    start = time.perf_counter()
+    try:
+        async with request.app.state.admission.slot():
+            request.state.queue_ms = round((time.perf_counter() - start) * 1000, 2)
+            yield
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def _run(executor: ThreadPoolExecutor, fn, *args):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]) if e.args else "Not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _timings(request: Request, start: float, stages: Dict[str, float]) -> Dict[str, float]:
+    return {"queue_ms": request.state.queue_ms, **stages,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+@app.post("/search", dependencies=[Depends(admitted)])
+async def search(body: SearchRequest, request: Request):
+    start = time.perf_counter()
+    results, stages = await _run(request.app.state.inference, _search, body)
+    return _jsonable({"query": body.query, "results": results, "timings": _timings(request, start, stages)})
+
+@app.post("/search/batch", dependencies=[Depends(admitted)])
+async def search_batch(body: BatchSearchRequest, request: Request):
+    start = time.perf_counter()
+
+    def run():
+        timer = _Timer()
+        results = get_vector_search().search_batch(body.queries, rerank=body.rerank, **body.filters())
+        timer.lap("search")
+        return results, timer.timings
+
+    results, stages = await _run(request.app.state.inference, run)
+    return _jsonable({
+        "results": [{"query": q, "results": r} for q, r in zip(body.queries, results)],
+        "timings": _timings(request, start, stages),
+    })
+
+@app.post("/route", dependencies=[Depends(admitted)])
+async def route(body: RouteRequest, request: Request):
+    start = time.perf_counter()
+    if body.bar_ids is not None:
+        try:
+            bars = get_vector_search().get_bars(body.bar_ids)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e.args[0]))
+        stages = {}
+    else:
+        # Search runs on the inference pool, like /search, so the routing pool never runs the models
+        bars, stages = await _run(request.app.state.inference, _route_candidates, body)
+    stops, legs, route_stages = await _run(request.app.state.routing, _route, request.app.state.path_finder, body, bars)
+    stages = {**stages, **route_stages}
+    places = [
+        Place(f"{bar['name']}, {bar['address']}",
+              *(math.nan if bar.get(k) is None else bar[k] for k in ("lat", "lng")))
+        for bar in stops
+    ]
+    return _jsonable({
+        "stops": stops,
+        "legs_m": legs,
+        "total_m": sum(legs),
+        "directions_url": directions_url(places) if places else None,
+        "timings": _timings(request, start, stages),
+    })
+
+@app.get("/healthz")
+async def healthz():
+    """The process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz(request: Request):
+    """Whether searches can be answered: the embedding model (or model server) is ready.
+
+    With ``embedding_warmup`` off the model is loaded by the first search, so the
+    process reports ready before that (``lazy``) rather than never receiving it.
+    """
+    if MODEL_SERVER:
+        try:
+            await asyncio.get_running_loop().run_in_executor(request.app.state.inference, get_model_client().ping)
+            status = "ready"
+        except Exception as e:
+            status = f"model server unreachable: {e}"
+        ready = status == "ready"
+    else:
+        status, ready = encoder_status(), is_ready()
+    return JSONResponse(
+        {"ready": ready, "encoder": status, "admission": request.app.state.admission.stats()},
+        status_code=200 if ready else 503,
+    )
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Serve search and routing as a JSON HTTP API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS,
+                        help="Worker processes; each loads its own models unless model_server is set")
+    args = parser.parse_args(argv)
+    uvicorn.run("barhopping.serving.api:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+_CLOSE = object()
+
+class MicroBatcher:
+    """Coalesce items submitted from many threads into batches run by one worker thread.
+
+    A batch is run as soon as it holds ``max_batch`` items, or ``max_wait``
+    seconds after its first item arrived, whichever comes first. ``fn`` takes
+    a list of items and returns one result per item, in order.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], Sequence[Any]], max_batch: int = 32, max_wait: float = 0.005,
+                 name: str = "batcher"):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue *item* and return a future for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit_many(self, items: Sequence[Any]) -> List[Future]:
+        return [self.submit(item) for item in items]
+
+    def close(self):
+        """Finish the queued items and stop the worker thread."""
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def _run(self):
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is _CLOSE:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _CLOSE:
+                    closing = True
+                    break
+                batch.append(entry)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[tuple]):
+        items = [item for item, _ in batch]
+        try:
+            results = self.fn(items)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(items)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
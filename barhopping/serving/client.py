@@ -0,0 +1,118 @@
+import ipaddress
+import threading
+import numpy as np
+from multiprocessing.connection import Client, Connection
+from typing import Any, Dict, List, Optional, Tuple, Union
+from barhopping.config import MODEL_SERVER, MODEL_SERVER_AUTHKEY, MODEL_SERVER_TIMEOUT
+
+Address = Union[str, Tuple[str, int]]
+
+# Shortest accepted authkey
+MIN_AUTHKEY_LENGTH = 16
+
+def parse_address(address: str) -> Tuple[Address, str]:
+    """Turn ``unix:/path/to.sock`` or ``host:port`` into a connection address and family.
+
+    Requests and responses are pickled, so whoever can connect with the
+    authkey can run code in the other process. TCP hosts are therefore
+    restricted to the loopback interface.
+
+    Raises:
+        ValueError: If the address is malformed or the host is not a loopback address
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):], "AF_UNIX"
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Model server address must be unix:/path or host:port, got {address!r}")
+    if not _is_loopback(host):
+        raise ValueError(f"Model server host must be a loopback address such as localhost or 127.0.0.1, got {host!r}")
+    return (host, int(port)), "AF_INET"
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+def check_authkey(authkey: str) -> bytes:
+    """Return *authkey* as bytes, refusing a missing or short key.
+
+    Raises:
+        ValueError: If the key is shorter than ``MIN_AUTHKEY_LENGTH``
+    """
+    if len(authkey) < MIN_AUTHKEY_LENGTH:
+        raise ValueError(
+            f"Set MODEL_SERVER_AUTHKEY to a secret of at least {MIN_AUTHKEY_LENGTH} characters, e.g. "
+            "`export MODEL_SERVER_AUTHKEY=$(python -c 'import secrets; print(secrets.token_hex(32))')`"
+        )
+    return authkey.encode("utf-8")
+
+class ModelClient:
+    """Client of the local model server; each thread keeps its own connection."""
+
+    def __init__(self, address: str = MODEL_SERVER, authkey: str = MODEL_SERVER_AUTHKEY,
+                 timeout: float = MODEL_SERVER_TIMEOUT):
+        self.address = address
+        self.authkey = check_authkey(authkey)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            addr, family = parse_address(self.address)
+            conn = self._local.conn = Client(addr, family=family, authkey=self.authkey)
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _call(self, request: Dict[str, Any]) -> Any:
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send(request)
+                answered = conn.poll(self.timeout)
+                if answered:
+                    response = conn.recv()
+            except (EOFError, OSError) as e:
+                # The server may have restarted since this thread connected; retry once
+                self._drop()
+                if attempt:
+                    raise ConnectionError(f"Model server at {self.address} is unreachable: {e}") from e
+                continue
+            if not answered:
+                self._drop()
+                raise TimeoutError(f"Model server at {self.address} did not answer within {self.timeout}s")
+            break
+        if not response["ok"]:
+            raise RuntimeError(f"Model server error: {response['error']}")
+        return response["result"]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """``(len(texts), hidden)`` float32 array of normalized embeddings."""
+        return self._call({"op": "embed", "texts": list(texts)})
+
+    def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        """Cross-encoder scores of (query, document) pairs."""
+        return self._call({"op": "rerank", "pairs": [tuple(pair) for pair in pairs]})
+
+    def ping(self) -> Dict[str, Any]:
+        """Models served and batching statistics."""
+        return self._call({"op": "ping"})
+
+# Global instance for reuse
+_client: Optional[ModelClient] = None
+
+def get_model_client() -> ModelClient:
+    """Return a singleton client of the configured model server."""
+    global _client
+    if _client is None:
+        _client = ModelClient()
+    return _client
@@ -0,0 +1,103 @@
+import argparse
+import os
+import threading
+import numpy as np
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Dict, List
+from barhopping.config import (
+    MODEL_SERVER, MODEL_SERVER_AUTHKEY, MODEL_SERVER_MAX_BATCH, MODEL_SERVER_MAX_WAIT_MS, GRANITE_MODEL, RERANKER_MODEL
+)
+from barhopping.embedding.granite import get_encoder
+from barhopping.retriever.reranker import Reranker
+from barhopping.serving.batching import MicroBatcher
+from barhopping.serving.client import check_authkey, parse_address
+from barhopping.logger import logger
+
+# Used when neither --address nor model_server is set
+DEFAULT_ADDRESS = "localhost:8765"
+
+class ModelServer:
+    """One process holding the embedding and reranker models for every client.
+
+    Each connection is served by its own thread; the texts and pairs of all
+    concurrent requests are coalesced into micro-batches, one per model.
+    """
+
+    def __init__(self, address: str = MODEL_SERVER or DEFAULT_ADDRESS, authkey: str = MODEL_SERVER_AUTHKEY,
+                 max_batch: int = MODEL_SERVER_MAX_BATCH, max_wait_ms: float = MODEL_SERVER_MAX_WAIT_MS):
+        self.address = address
+        self.authkey = check_authkey(authkey)
+        self.encoder = get_encoder()
+        self.reranker = Reranker()
+        max_wait = max_wait_ms / 1000
+        self.embed_batcher = MicroBatcher(self._embed, max_batch, max_wait, name="embed-batcher")
+        self.rerank_batcher = MicroBatcher(self.reranker._score, max_batch, max_wait, name="rerank-batcher")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        return self.encoder.encode(texts).cpu().numpy()
+
+    def serve_forever(self):
+        addr, family = parse_address(self.address)
+        if family == "AF_UNIX" and os.path.exists(addr):
+            os.unlink(addr)  # stale socket from a previous run
+        # Create the socket file owner-only (0600) from the start, not chmod it after binding
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(addr, family=family, authkey=self.authkey)
+        finally:
+            os.umask(umask)
+        with listener:
+            logger.info(f"Model server listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, OSError) as e:
+                    logger.warning(f"Rejected model server connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection):
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = {"ok": True, "result": self._dispatch(request)}
+                except Exception as e:
+                    logger.error(f"Model server request failed: {e}")
+                    response = {"ok": False, "error": str(e)}
+                conn.send(response)
+
+    def _dispatch(self, request: Dict[str, Any]) -> Any:
+        op = request.get("op")
+        if op == "embed":
+            futures = self.embed_batcher.submit_many(request["texts"])
+            if not futures:
+                return np.zeros((0, self.encoder.hidden_size), dtype=np.float32)
+            return np.stack([f.result() for f in futures]).astype(np.float32, copy=False)
+        if op == "rerank":
+            return [float(f.result()) for f in self.rerank_batcher.submit_many(request["pairs"])]
+        if op == "ping":
+            return {
+                "embedding_model": GRANITE_MODEL,
+                "reranker_model": RERANKER_MODEL,
+                "embed_mean_batch": self.embed_batcher.mean_batch_size,
+                "rerank_mean_batch": self.rerank_batcher.mean_batch_size,
+            }
+        raise ValueError(f"Unknown model server op: {op}")
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Serve the embedding and reranker models to local processes")
+    parser.add_argument("--address", default=MODEL_SERVER or DEFAULT_ADDRESS, help="unix:/path/to.sock or host:port")
+    parser.add_argument("--max-batch", type=int, default=MODEL_SERVER_MAX_BATCH, help="Items per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=MODEL_SERVER_MAX_WAIT_MS,
+                        help="How long a batch waits for more requests")
+    args = parser.parse_args(argv)
+
+    ModelServer(args.address, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,44 @@
-import json
-from barhopping.config import CITY, MAX_BARS
+import sqlite3
+from typing import List, Tuple
+from barhopping.config import CITY, MAX_BARS, BARS_DB, EMBEDDING_BATCH_SIZE
 from barhopping.scraper.maps import get_bars, get_addr_reviews, get_photos
 from barhopping.summarizer.gemma import summarize_bar
-from barhopping.embedding.granite import get_embedding
+from barhopping.embedding.bulk import embed_rows
 from barhopping.database.sqlite import init_bars, insert_bar
+from barhopping.geo import coords_from_url
 from barhopping.logger import logger
 
+def _embed(pending: List[Tuple[int, str]]):
+    """Embed the summaries of already inserted ``(id, summary)`` bars in batched calls.
+
+    On failure the bars stay in the table without an embedding, for
+    ``python -m barhopping.embedding.bulk`` to fill in later.
+    """
+    try:
+        with sqlite3.connect(BARS_DB) as conn:
+            embed_rows(conn, "bars", pending, EMBEDDING_BATCH_SIZE)
+    except Exception as e:
+        logger.error(
+            f"Failed to embed {len(pending)} bars: {e}. They are saved without an embedding; "
+            "run `python -m barhopping.embedding.bulk` to embed them"
+        )
+
 def dataPreparation():
     init_bars()
     bars = get_bars(CITY, MAX_BARS)
     logger.info(f"Retrieved {len(bars)} bars for {CITY}")
 
+    # Each bar is saved as soon as it is summarized, so a failure or an interrupted run
+    # loses no scraping or LLM work; summaries are embedded a batch at a time afterwards
+    pending = []
     for b in bars:
         try:
             addr, revs = get_addr_reviews(b["url"])
             photos = get_photos(b["url"])
             summary = summarize_bar(revs, photos)
-            emb_list = get_embedding(summary).squeeze(0).tolist()
+            lat, lng = coords_from_url(b["url"]) or (None, None)
 
-            bar = {
+            bar_id = insert_bar({
                 "name": b["name"],
                 "url": b["url"],
                 "city": CITY,
@@ -26,13 +46,20 @@ def dataPreparation():
                 "rating": b["rating"],
                 "photo": photos[0] if photos else "",
                 "summary": summary,
-                "embedding": json.dumps(emb_list),
-            }
-
-            insert_bar(bar)
+                "lat": lat,
+                "lng": lng,
+            })
             logger.info(f"Inserted {b['name']}")
+            pending.append((bar_id, summary))
         except Exception as e:
             logger.error(f"Failed {b['name']}: {e}")
 
+        if len(pending) >= EMBEDDING_BATCH_SIZE:
+            _embed(pending)
+            pending = []
+
+    if pending:
+        _embed(pending)
+
 if __name__ == "__main__":
-    dataPreparation()
\ No newline at end of file
+    dataPreparation()
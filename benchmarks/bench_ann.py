@@ -0,0 +1,58 @@
+"""Recall@k vs latency of the IVF-flat index against exact search.
+
+The corpus is synthetic: normalized vectors drawn around random topic
+centres, so it has the cluster structure of real bar embeddings at any size.
+
+Usage:
+    python -m benchmarks.bench_ann [--n 200000] [--dim 768] [--k 10] [--nprobe 1 2 4 8 16 32]
+"""
+import argparse
+import time
+import numpy as np
+from barhopping.retriever.ann import ExactIndex, IVFFlatIndex
+
+def make_corpus(n: int, dim: int, topics: int, rng: np.random.Generator) -> np.ndarray:
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    data = centres[rng.integers(0, topics, n)] + 0.8 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def run(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    results = [index.search(q, k)[0] for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200000, help="Corpus size")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--topics", type=int, default=2000, help="Number of synthetic topic centres")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists, 0 = 4 * sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = make_corpus(args.n, args.dim, args.topics, rng)
+    queries = corpus[rng.choice(args.n, args.queries, replace=False)]
+    queries = queries + 0.5 * rng.standard_normal(queries.shape).astype(np.float32) / np.sqrt(args.dim)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    truth, exact_ms = run(ExactIndex(corpus), queries, args.k)
+    print(f"corpus={args.n}x{args.dim} queries={args.queries} k={args.k}")
+    print(f"{'backend':<16}{'recall@k':>10}{'ms/query':>12}{'speedup':>10}")
+    print(f"{'exact':<16}{1.0:>10.3f}{exact_ms:>12.2f}{1.0:>10.1f}")
+
+    nlist = args.nlist or int(4 * np.sqrt(args.n))
+    start = time.perf_counter()
+    ivf = IVFFlatIndex.build(corpus, nlist)
+    print(f"(IVF build with {nlist} lists: {time.perf_counter() - start:.1f} s)")
+
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, ms = run(ivf, queries, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        print(f"{f'ivf nprobe={nprobe}':<16}{recall:>10.3f}{ms:>12.2f}{exact_ms / ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
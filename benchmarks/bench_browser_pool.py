@@ -0,0 +1,222 @@
+"""Shared browser pool against fake browsers and a local static HTTP fixture server.
+
+The pool is first checked with fake browsers, which needs no Chrome:
+
+- a returned browser is reused by the next lease
+- fan-out returns every result in order, with at most ``size`` leases at once
+- a browser that crashed while idle, or during a lease, is recycled
+- a lease held past its timeout has its browser closed and replaced
+- acquiring from a fully leased pool times out
+
+Unless ``--fake-only`` is given, the same pool is then driven through real
+headless Chrome against fixture pages that, like Google Maps, render their
+result element from JavaScript after a delay. The fan-out, recycling and
+lease timeout checks are repeated there, and fetching every page in one
+browser, the way each component used to hold its own, is timed against
+``BrowserPool.map`` with several pool sizes. That part needs Chrome and
+ChromeDriver, and has not been run yet: its checks and timings are
+unverified until it passes once on a machine with Chrome.
+
+Usage:
+    python -m benchmarks.bench_browser_pool [--fake-only] [--pages 24] [--delay-ms 300] [--sizes 1 2 4]
+"""
+import argparse
+import functools
+import os
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from barhopping.browser import BrowserPool, new_browser
+
+PAGE = """<!doctype html>
+<html><body><div id="directions"></div>
+<script>
+setTimeout(function () {{
+    var result = document.createElement("span");
+    result.className = "ivN21e";
+    result.textContent = "{meters} m";
+    document.getElementById("directions").appendChild(result);
+}}, {delay_ms});
+</script></body></html>
+"""
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def write_fixtures(root: str, pages: int, delay_ms: int):
+    for i in range(pages):
+        with open(os.path.join(root, f"{i}.html"), "w") as f:
+            f.write(PAGE.format(meters=100 + i, delay_ms=delay_ms))
+
+def serve(root: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class FakeBrowser:
+    """Stands in for a WebDriver: answers health checks until it is quit or crashed."""
+    started = 0
+
+    def __init__(self):
+        FakeBrowser.started += 1
+        self.alive = True
+
+    def execute_script(self, script: str):
+        if not self.alive:
+            raise RuntimeError("browser is gone")
+        return 1
+
+    def quit(self):
+        self.alive = False
+
+def check_fake():
+    """Check leasing, ordered fan-out, recycling, lease expiry and acquire timeouts without Chrome."""
+    pool = BrowserPool(size=3, lease_timeout=None, acquire_timeout=1, factory=FakeBrowser)
+    try:
+        # A returned browser is reused
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            assert second is first, "a returned browser was not reused"
+        assert pool.stats()["started"] == 1, pool.stats()
+
+        # Fan-out keeps the input order and never exceeds the pool size
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def job(browser, item):
+            assert browser.alive
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01 * (item % 4))
+            with lock:
+                active[0] -= 1
+            return item * 2
+
+        assert pool.map(job, range(20)) == [i * 2 for i in range(20)]
+        assert peak[0] == 3, f"peak concurrency {peak[0]}"
+
+        # A browser that crashed while idle is replaced on the next lease
+        with pool.lease() as browser:
+            pass
+        browser.quit()
+        recycled = pool.stats()["recycled"]
+        with pool.lease() as replacement:
+            assert replacement.alive
+        assert pool.stats()["recycled"] == recycled + 1, pool.stats()
+
+        # An error in a healthy browser keeps it; one that crashed during the lease is replaced
+        for crash in (False, True):
+            try:
+                with pool.lease() as browser:
+                    if crash:
+                        browser.quit()
+                    raise ValueError("page failed")
+            except ValueError:
+                pass
+        assert pool.stats()["recycled"] == recycled + 2, pool.stats()
+
+        # A lease held past its timeout has its browser quit, and the pool recovers
+        with pool.lease(lease_timeout=0.1) as browser:
+            time.sleep(0.3)
+            assert not browser.alive, "expired browser is still running"
+        assert pool.stats()["expired"] == 1, pool.stats()
+        with pool.lease() as browser:
+            assert browser.alive
+
+        # Every browser leased: the next caller gives up after its timeout
+        leased = [pool.acquire() for _ in range(pool.size)]
+        try:
+            pool.acquire(timeout=0.1)
+            raise AssertionError("acquire did not time out")
+        except TimeoutError:
+            pass
+        for browser in leased:
+            pool.release(browser)
+    finally:
+        pool.close()
+    assert all(not browser.alive for browser in leased), "close left idle browsers running"
+    print(f"Fake pool checks passed: reuse, ordered fan-out, recycling, lease timeout, acquire timeout ({pool.stats()})")
+
+def fetch(base: str, browser, page: int) -> float:
+    """Load a fixture page and read its result the way the distance provider reads Google Maps."""
+    browser.get(f"{base}/{page}.html")
+    WebDriverWait(browser, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "ivN21e")))
+    return float(browser.find_element(By.CLASS_NAME, "ivN21e").text.split()[0])
+
+def check(base: str, pages: int):
+    pool = BrowserPool(size=2, lease_timeout=None, acquire_timeout=30)
+    try:
+        results = pool.map(lambda browser, page: fetch(base, browser, page), range(pages))
+        assert results == [100 + i for i in range(pages)], f"fan-out returned {results}"
+
+        # Crash an idle browser behind the pool's back; the next lease must replace it
+        with pool.lease() as browser:
+            pass
+        browser.quit()
+        with pool.lease() as browser:
+            assert fetch(base, browser, 0) == 100
+        assert pool.stats()["recycled"] >= 1, pool.stats()
+
+        # Hold a lease past its timeout; its browser is closed and the pool recovers
+        with pool.lease(lease_timeout=1) as browser:
+            time.sleep(2)
+            assert not pool.healthy(browser), "expired browser is still running"
+        assert pool.stats()["expired"] == 1, pool.stats()
+        with pool.lease() as browser:
+            assert fetch(base, browser, 1) == 101
+    finally:
+        pool.close()
+    print("Chrome pool checks passed: ordered fan-out, crashed-browser recycling, lease timeout")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake-only", action="store_true", help="Only run the checks with fake browsers")
+    parser.add_argument("--pages", type=int, default=24, help="Fixture pages fetched per run")
+    parser.add_argument("--delay-ms", type=int, default=300, help="Delay before a page shows its result")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4], help="Pool sizes to time")
+    args = parser.parse_args()
+
+    check_fake()
+    if args.fake_only:
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        write_fixtures(root, args.pages, args.delay_ms)
+        server = serve(root)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            check(base, min(args.pages, 6))
+
+            browser = new_browser()
+            try:
+                start = time.perf_counter()
+                for page in range(args.pages):
+                    fetch(base, browser, page)
+                single = time.perf_counter() - start
+            finally:
+                browser.quit()
+            print(f"{'browsers':>8} {'seconds':>8} {'pages/s':>8} {'speed-up':>9}")
+            print(f"{'single':>8} {single:>8.2f} {args.pages / single:>8.1f} {1.0:>8.1f}x")
+
+            for size in args.sizes:
+                pool = BrowserPool(size=size, lease_timeout=None)
+                try:
+                    # Start the browsers first so only page fetches are timed
+                    pool.map(lambda browser, page: fetch(base, browser, page), range(size))
+                    start = time.perf_counter()
+                    pool.map(lambda browser, page: fetch(base, browser, page), range(args.pages))
+                    seconds = time.perf_counter() - start
+                finally:
+                    pool.close()
+                print(f"{size:>8} {seconds:>8.2f} {args.pages / seconds:>8.1f} {single / seconds:>8.1f}x")
+        finally:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""The bar_distances cache in front of a slow distance provider, without a browser.
+
+A stub provider stands in for Google Maps: it returns straight-line
+distances after a fixed delay per pair, fails (``inf``) on a chosen share
+of pairs, and records every pair it is asked for. The script first checks
+that ``CachedDistanceProvider`` only fetches pairs it has not cached, never
+stores failed lookups, and that ``precompute`` resumes where it stopped,
+and that a route planned from a ``start`` point never asks the provider
+about that point. It then times cold and warm distance matrices for random routes.
+
+Usage:
+    python -m benchmarks.bench_distance_cache [--bars 200] [--route 5] [--routes 20] [--delay-ms 20]
+"""
+import argparse
+import math
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from typing import List, Tuple
+from barhopping.geo import haversine_m
+from barhopping.path_finder import PathFinder
+from barhopping.routing.cache import CachedDistanceProvider, DistanceCache, _pair, load_places, precompute
+from barhopping.routing.distance import DistanceProvider, Place
+
+class StubProvider(DistanceProvider):
+    """Straight-line distances after *delay* seconds per pair; pairs whose ids sum to a multiple of *fail_every* fail.
+
+    Like Google Maps given an address such as "start", places without a bar id cannot be found (``inf``).
+    """
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0, fail_every: int = 0):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.requested: List[Tuple[int, int]] = []
+        self.unknown: List[str] = []
+
+    def pairs(self, places: List[Place], pairs: List[Tuple[int, int]]) -> List[float]:
+        distances = []
+        for i, j in pairs:
+            a, b = places[i], places[j]
+            time.sleep(self.delay)
+            if a.bar_id is None or b.bar_id is None:
+                self.unknown.append(a.address if a.bar_id is None else b.address)
+                distances.append(math.inf)
+                continue
+            self.requested.append(_pair(a.bar_id, b.bar_id))
+            failed = self.fail_every and (a.bar_id + b.bar_id) % self.fail_every == 0
+            distances.append(math.inf if failed else float(haversine_m(a.lat, a.lng, b.lat, b.lng)))
+        return distances
+
+    def matrix(self, places: List[Place]) -> np.ndarray:
+        n = len(places)
+        matrix = np.zeros((n, n))
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        for (i, j), meters in zip(pairs, self.pairs(places, pairs)):
+            matrix[i, j] = matrix[j, i] = meters
+        return matrix
+
+def make_bars_db(path: str, n: int, rng: np.random.Generator):
+    """A bars table of *n* bars scattered over a few square kilometres."""
+    lats = 25.03 + rng.uniform(0, 0.03, n)
+    lngs = 121.50 + rng.uniform(0, 0.04, n)
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE bars (id INTEGER PRIMARY KEY, name TEXT, address TEXT, lat REAL, lng REAL)")
+        conn.executemany(
+            "INSERT INTO bars (name, address, lat, lng) VALUES (?, ?, ?, ?)",
+            [(f"Bar {i}", f"{i} Test Street", lat, lng) for i, (lat, lng) in enumerate(zip(lats, lngs))]
+        )
+        conn.commit()
+
+def check(bars_db: str, cache_db: str, places: List[Place]):
+    """Assert the cache fetches only missing pairs, skips ``inf`` and lets precompute resume."""
+    stub = StubProvider(fail_every=7)
+    cached = CachedDistanceProvider(stub, cache_db)
+    route = places[:6]
+    first = cached.matrix(route)
+    assert len(stub.requested) == 15, stub.requested
+
+    stored = DistanceCache(cache_db).lookup([p.bar_id for p in route], stub.name)
+    failed = {pair for pair in stub.requested if sum(pair) % 7 == 0}
+    assert failed and not failed & stored.keys(), "failed lookups must not be cached"
+    assert all(math.isfinite(m) for m in stored.values())
+
+    # Overlapping route: only pairs involving new bars, plus the failed ones, are fetched again
+    stub.requested.clear()
+    overlap = places[3:9]
+    second = cached.matrix(overlap)
+    ids = [p.bar_id for p in overlap]
+    expected = {_pair(a, b) for k, a in enumerate(ids) for b in ids[k + 1:]} - stored.keys()
+    assert set(stub.requested) == expected, (sorted(stub.requested), sorted(expected))
+    assert np.allclose(first[3:, 3:], second[:3, :3])
+
+    # Precompute stops halfway, then resumes without fetching a cached pair twice
+    stub = StubProvider()
+    calls = {"n": 0}
+    real_pairs = stub.pairs
+
+    def interrupted(places, pairs):
+        calls["n"] += 1
+        if calls["n"] == 3:
+            raise KeyboardInterrupt
+        return real_pairs(places, pairs)
+
+    stub.pairs = interrupted
+    try:
+        precompute(stub, bars_db, radius_m=800, batch_size=10, cache_path=cache_db)
+    except KeyboardInterrupt:
+        pass
+    done = set(stub.requested)
+    stub.requested.clear()
+    stub.pairs = real_pairs
+    precompute(stub, bars_db, radius_m=800, batch_size=10, cache_path=cache_db)
+    assert done and not done & set(stub.requested), "precompute refetched cached pairs"
+    with sqlite3.connect(bars_db) as conn:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "bar_distances" not in tables, "the cache must not write to the bars database"
+    print(f"Checks passed: cached pairs are never refetched, inf is not stored, precompute resumes "
+          f"({len(done)} + {len(stub.requested)} pairs)")
+
+def check_route_start(cache_db: str, places: List[Place]):
+    """Assert a budget route from a ``start`` point keeps its stops and never looks the point up."""
+    stub = StubProvider()
+    candidates = [
+        {"id": p.bar_id, "name": p.address, "address": "", "lat": p.lat, "lng": p.lng, "vector_score": 1.0 - k / 100}
+        for k, p in enumerate(places[:20])
+    ]
+    start = (places[0].lat + 0.001, places[0].lng + 0.001)
+    path, legs = PathFinder(CachedDistanceProvider(stub, cache_db)).plan_route(candidates, 3000, start=start, max_stops=5)
+    assert not stub.unknown, f"the provider was asked about {stub.unknown}"
+    assert path and len(legs) == len(path), (path, legs)
+    assert all(math.isfinite(m) for m in legs) and sum(legs) <= 3000, legs
+    print(f"Checks passed: a route from a start point keeps {len(path)} stops, {sum(legs):.0f} m")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=200, help="Bars in the synthetic database")
+    parser.add_argument("--route", type=int, default=5, help="Bars per route")
+    parser.add_argument("--routes", type=int, default=20, help="Random routes timed")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="Simulated lookup time per pair")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp()
+    bars_db = os.path.join(workdir, "bars.db")
+    cache_db = os.path.join(workdir, "distances.db")
+    make_bars_db(bars_db, args.bars, rng)
+    places = load_places(bars_db)
+
+    check(bars_db, cache_db, places)
+    check_route_start(os.path.join(workdir, "route.db"), places)
+
+    routes = [[places[i] for i in rng.choice(len(places), args.route, replace=False)] for _ in range(args.routes)]
+    for label in ("cold", "warm"):
+        stub = StubProvider(delay=args.delay_ms / 1000)
+        cached = CachedDistanceProvider(stub, os.path.join(workdir, "timing.db"))
+        start = time.perf_counter()
+        for route in routes:
+            cached.matrix(route)
+        ms = (time.perf_counter() - start) * 1000 / len(routes)
+        print(f"{label:>5}: {ms:8.1f} ms/route, {len(stub.requested) / len(routes):5.1f} lookups/route")
+
+if __name__ == "__main__":
+    main()
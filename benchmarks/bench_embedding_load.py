@@ -0,0 +1,77 @@
+"""Compare index load time for JSON TEXT embeddings vs float32 BLOB embeddings.
+
+Usage:
+    python -m benchmarks.bench_embedding_load [--db data/bars_taipei.db] [--repeat 5] [--scale 1]
+"""
+import argparse
+import ast
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from barhopping.config import BARS_DB
+from barhopping.database.migrate import migrate_embeddings
+from barhopping.database.sqlite import decode_embeddings
+
+def load_text(db_path: str) -> np.ndarray:
+    """The original loader: ``ast.literal_eval`` per row and ``np.vstack``."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT embedding FROM bars").fetchall()
+    return np.vstack([np.array(ast.literal_eval(text), dtype=np.float32) for (text,) in rows])
+
+def load_blob(db_path: str) -> np.ndarray:
+    """The binary loader: one ``np.frombuffer`` for the whole table."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT embedding_f32 FROM bars").fetchall()
+    return decode_embeddings([blob for (blob,) in rows])
+
+def scale_db(db_path: str, factor: int):
+    """Duplicate every row *factor* times to simulate a larger corpus."""
+    with sqlite3.connect(db_path) as conn:
+        (max_id,) = conn.execute("SELECT MAX(id) FROM bars").fetchone()
+        for _ in range(factor - 1):
+            conn.execute(
+                "INSERT INTO bars (name, URL, city, address, rating, photo, summary, embedding) "
+                "SELECT name, URL, city, address, rating, photo, summary, embedding FROM bars WHERE id <= ?",
+                (max_id,)
+            )
+        conn.commit()
+
+def timeit(fn, db_path: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(db_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=BARS_DB, help="Bars database with JSON embeddings")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    parser.add_argument("--scale", type=int, default=1, help="Replicate rows to grow the corpus")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bars.db")
+        shutil.copy(args.db, db_path)
+        if args.scale > 1:
+            scale_db(db_path, args.scale)
+
+        text_time = timeit(load_text, db_path, args.repeat)
+        reference = load_text(db_path)
+
+        migrate_embeddings(db_path)
+        blob_time = timeit(load_blob, db_path, args.repeat)
+        assert np.array_equal(reference, load_blob(db_path)), "BLOB embeddings differ from TEXT embeddings"
+
+    n, dim = reference.shape
+    print(f"rows={n} dim={dim}")
+    print(f"before (TEXT + ast.literal_eval): {text_time * 1000:8.1f} ms")
+    print(f"after  (BLOB + np.frombuffer):    {blob_time * 1000:8.1f} ms")
+    print(f"speedup: {text_time / blob_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
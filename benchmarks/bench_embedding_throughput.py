@@ -0,0 +1,52 @@
+"""Corpus embedding throughput (texts/sec) of get_embeddings at several batch sizes.
+
+Each batch size is measured with and without length bucketing, against the
+old one-forward-pass-per-text loop.
+
+Usage:
+    python -m benchmarks.bench_embedding_throughput [--db data/bars_taipei.db] [--n 512] [--batch-sizes 1 8 32 64 128]
+"""
+import argparse
+import sqlite3
+import time
+from typing import List
+from barhopping.config import BARS_DB
+from barhopping.embedding.granite import get_embedding, get_embeddings
+
+def load_texts(db_path: str, n: int) -> List[str]:
+    """Bar summaries, repeated up to *n* texts."""
+    with sqlite3.connect(db_path) as conn:
+        texts = [s for (s,) in conn.execute("SELECT summary FROM bars WHERE summary IS NOT NULL AND summary != ''")]
+    if not texts:
+        raise SystemExit(f"No summaries in {db_path}")
+    return (texts * (n // len(texts) + 1))[:n]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=BARS_DB, help="Bars database to take summaries from")
+    parser.add_argument("--n", type=int, default=512, help="Number of texts to embed")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--single", type=int, default=64, help="Texts to time with one forward pass each")
+    args = parser.parse_args()
+
+    texts = load_texts(args.db, args.n)
+    get_embeddings(texts[:8])  # warm-up
+
+    start = time.perf_counter()
+    for text in texts[:args.single]:
+        get_embedding(text, use_cache=False)
+    single = args.single / (time.perf_counter() - start)
+
+    print(f"texts={len(texts)}")
+    print(f"{'batch size':>10}{'bucketed/s':>14}{'unsorted/s':>14}")
+    print(f"{'1 (loop)':>10}{single:>14.1f}{'':>14}")
+    for batch_size in args.batch_sizes:
+        rates = []
+        for bucketed in (True, False):
+            start = time.perf_counter()
+            get_embeddings(texts, batch_size=batch_size, sort_by_length=bucketed)
+            rates.append(len(texts) / (time.perf_counter() - start))
+        print(f"{batch_size:>10}{rates[0]:>14.1f}{rates[1]:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""CPU latency and throughput of the embedding and reranker models per inference backend.
+
+Latency is one query embedded plus ``--candidates`` (query, summary) pairs
+reranked, as in a GUI search; throughput embeds summaries in batches.
+The onnx backends need `python -m barhopping.inference export [--quantize]` first.
+
+Usage:
+    python -m benchmarks.bench_inference [--backends torch torch-int8 onnx onnx-int8] [--repeat 20]
+"""
+import argparse
+import time
+import numpy as np
+import torch
+from barhopping.embedding.granite import GraniteEncoder
+from barhopping.inference import BACKENDS, PARITY_QUERIES, sample_summaries
+from barhopping.retriever.reranker import Reranker
+
+def timed(fn, repeat: int) -> np.ndarray:
+    fn()  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.array(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=20, help="Timed repetitions per measurement")
+    parser.add_argument("--candidates", type=int, default=10, help="Pairs reranked per query")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batch size for the throughput run")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    docs = sample_summaries(n=max(args.candidates, args.batch_size))
+    query = PARITY_QUERIES[0]
+    pairs = [(query, doc) for doc in docs[:args.candidates]]
+
+    print(f"{'backend':<12}{'embed p50 ms':>14}{'rerank p50 ms':>15}{'rerank p95 ms':>15}{'embed texts/s':>15}")
+    for backend in args.backends:
+        try:
+            encoder = GraniteEncoder(backend=backend)
+            reranker = Reranker(backend=backend, device="cpu")
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{backend:<12}skipped: {e}")
+            continue
+        embed = timed(lambda: encoder.encode([query]), args.repeat)
+        rerank = timed(lambda: reranker._score(pairs), args.repeat)
+        batch = timed(lambda: encoder.encode(docs[:args.batch_size]), max(1, args.repeat // 4))
+        throughput = args.batch_size / (np.median(batch) / 1000)
+        print(f"{backend:<12}{np.median(embed):>14.1f}{np.median(rerank):>15.1f}"
+              f"{np.percentile(rerank, 95):>15.1f}{throughput:>15.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Walking-budget route selection: the orienteering heuristic vs an exhaustive solver.
+
+Random pools of bars with random relevance are scattered over a few square
+kilometres. On small pools, every subset is ordered exactly with Held-Karp
+to find the most relevance that fits the budget; the heuristic's share of
+that optimum and its latency are reported. Larger pools (the GUI's default
+is 30) are timed alone.
+
+Usage:
+    python -m benchmarks.bench_orienteering [--exact-sizes 6 8 10] [--sizes 20 30 50] [--budget 2500]
+"""
+import argparse
+import time
+import numpy as np
+from itertools import combinations
+from benchmarks.bench_route_solver import random_matrix
+from barhopping.routing.orienteering import orienteer
+from barhopping.routing.solver import held_karp, path_length
+
+def exhaustive(dist: np.ndarray, scores: np.ndarray, budget: float, max_stops: int) -> float:
+    """Most relevance of any route within *budget*, starting anywhere."""
+    n = len(dist)
+    # A virtual start at distance 0 from every bar, as in orienteer
+    padded = np.pad(dist, ((0, 1), (0, 1)))
+    best = 0.0
+    for size in range(1, min(n, max_stops) + 1):
+        for subset in combinations(range(n), size):
+            total = scores[list(subset)].sum()
+            if total <= best:
+                continue
+            nodes = [n, *subset]
+            sub = padded[np.ix_(nodes, nodes)]
+            if path_length(sub, held_karp(sub)) <= budget:
+                best = total
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--exact-sizes", type=int, nargs="+", default=[6, 8, 10, 12], help="Pools checked exhaustively")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 30, 50], help="Pools only timed")
+    parser.add_argument("--budget", type=float, default=2500.0, help="Walking budget in metres")
+    parser.add_argument("--max-stops", type=int, default=5)
+    parser.add_argument("--trials", type=int, default=10, help="Random pools per size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'pool':>5} {'heuristic ms':>13} {'p95 ms':>8} {'exhaustive ms':>14} {'of optimum':>11} {'optimal':>8}")
+    for n in args.exact_sizes + args.sizes:
+        latencies, exact_times, ratios = [], [], []
+        for _ in range(args.trials):
+            dist = random_matrix(n, rng)
+            scores = rng.uniform(0.05, 1.0, size=n)
+            start = time.perf_counter()
+            path = orienteer(dist, scores, args.budget, max_stops=args.max_stops, time_budget=None)
+            latencies.append(time.perf_counter() - start)
+            assert path_length(dist, path) <= args.budget + 1e-6 and len(path) <= args.max_stops
+
+            if n in args.exact_sizes:
+                start = time.perf_counter()
+                optimum = exhaustive(dist, scores, args.budget, args.max_stops)
+                exact_times.append(time.perf_counter() - start)
+                ratios.append(scores[path].sum() / optimum if optimum else 1.0)
+
+        latencies = np.array(latencies) * 1000
+        exact = f"{np.mean(exact_times) * 1000:.1f}" if exact_times else "-"
+        share = f"{np.mean(ratios) * 100:.1f}%" if ratios else "-"
+        optimal = f"{np.mean(np.array(ratios) > 1 - 1e-9) * 100:.0f}%" if ratios else "-"
+        print(f"{n:>5} {latencies.mean():>13.1f} {np.percentile(latencies, 95):>8.1f} {exact:>14} {share:>11} {optimal:>8}")
+
+if __name__ == "__main__":
+    main()
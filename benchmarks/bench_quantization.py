@@ -0,0 +1,45 @@
+"""Memory, recall and latency of the int8 quantized scan against exact float32 search.
+
+Usage:
+    python -m benchmarks.bench_quantization [--n 200000] [--dim 768] [--k 10] [--rescore 1 2 4]
+"""
+import argparse
+import time
+import numpy as np
+from barhopping.retriever.ann import ExactIndex
+from barhopping.retriever.quantization import QuantizedIndex
+from benchmarks.bench_ann import make_corpus, run
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200000, help="Corpus size")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--topics", type=int, default=2000, help="Number of synthetic topic centres")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Recall cutoff")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = make_corpus(args.n, args.dim, args.topics, rng)
+    queries = corpus[rng.choice(args.n, args.queries, replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) / np.float32(np.sqrt(args.dim))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    truth, exact_ms = run(ExactIndex(corpus), queries, args.k)
+    print(f"corpus={args.n}x{args.dim} queries={args.queries} k={args.k}")
+    print(f"{'mode':<22}{'resident MiB':>14}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'float32 exact':<22}{corpus.nbytes / 2**20:>14.1f}{1.0:>10.3f}{exact_ms:>10.2f}")
+
+    start = time.perf_counter()
+    index = QuantizedIndex.build(corpus, "int8")
+    build_s = time.perf_counter() - start
+    for rescore in args.rescore:
+        index.rescore = rescore
+        found, ms = run(index, queries, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        print(f"{f'int8 rescore={rescore}':<22}{index.nbytes / 2**20:>14.1f}{recall:>10.3f}{ms:>10.2f}")
+    print(f"(int8 encode: {build_s:.2f} s, saves {(1 - index.nbytes / corpus.nbytes) * 100:.0f}% of float32)")
+
+if __name__ == "__main__":
+    main()
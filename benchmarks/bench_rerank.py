@@ -0,0 +1,63 @@
+"""Per-query rerank latency: re-tokenizing every pair vs cached document tokens with token-budgeted batches.
+
+"before" tokenizes the ``(query, "name: summary")`` pairs of each query from
+scratch and pads them into one batch, as the reranker originally did;
+"after" is ``Reranker.rerank`` with the document cache primed.
+
+Usage:
+    python -m benchmarks.bench_rerank [--db data/bars_taipei.db] [--candidates 10] [--queries 20]
+"""
+import argparse
+import sqlite3
+import time
+import numpy as np
+import torch
+from barhopping.config import BARS_DB
+from barhopping.inference import PARITY_QUERIES
+from barhopping.retriever.reranker import MAX_LENGTH, Reranker
+
+def load_candidates(db_path: str):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT id, name, summary FROM bars WHERE summary IS NOT NULL AND summary != ''").fetchall()
+    return [{"id": bar_id, "name": name, "summary": summary} for bar_id, name, summary in rows]
+
+def rerank_uncached(reranker: Reranker, query: str, candidates) -> list:
+    """The original scoring path: tokenize every pair and pad to the longest one."""
+    pairs = [(query, reranker.document(c)) for c in candidates]
+    inputs = reranker.tokenizer(pairs, padding=True, truncation=True, max_length=MAX_LENGTH,
+                                return_tensors="pt").to(reranker.device)
+    with torch.no_grad():
+        return reranker.model(**inputs).logits.view(-1).tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=BARS_DB, help="Bars database to take candidates from")
+    parser.add_argument("--candidates", type=int, default=10, help="Candidates reranked per query")
+    parser.add_argument("--queries", type=int, default=20, help="Timed queries")
+    parser.add_argument("--backend", default=None, help="Inference backend (defaults to reranker_backend)")
+    args = parser.parse_args()
+
+    bars = load_candidates(args.db)
+    reranker = Reranker(backend=args.backend) if args.backend else Reranker()
+    reranker.cache_documents([b["id"] for b in bars], [reranker.document(b) for b in bars])
+    rng = np.random.default_rng(0)
+    workload = [
+        (PARITY_QUERIES[i % len(PARITY_QUERIES)], [bars[j] for j in rng.choice(len(bars), args.candidates, replace=False)])
+        for i in range(args.queries)
+    ]
+
+    print(f"{args.queries} queries x {args.candidates} candidates, device={reranker.device}")
+    for name, fn in (
+        ("before", lambda q, c: rerank_uncached(reranker, q, c)),
+        ("after", lambda q, c: reranker.rerank(q, [dict(x) for x in c], top_k=len(c))),
+    ):
+        fn(*workload[0])  # warm-up
+        times = []
+        for query, candidates in workload:
+            start = time.perf_counter()
+            fn(query, candidates)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{name:<8} p50 {np.median(times):7.1f} ms   p95 {np.percentile(times, 95):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
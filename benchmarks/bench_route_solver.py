@@ -0,0 +1,112 @@
+"""Route ordering: the original dict-of-tuples Held-Karp vs the bitmask solver and heuristics.
+
+Random bars are scattered over a few square kilometres and walking distances
+are taken as straight-line distance times a random detour factor. For every
+n, the script times the original DP (up to ``--legacy-max``), the vectorized
+Held-Karp (up to ``--exact-max``) and nearest neighbour + 2-opt/Or-opt, and
+reports how far the heuristic is from the optimum.
+
+Before timing, it checks optimality: Held-Karp must match brute force over
+all permutations for small n and the original DP over the whole exact range.
+
+Usage:
+    python -m benchmarks.bench_route_solver [--sizes 5 8 10 12 14 16 20 30 40 50] [--trials 3]
+"""
+import argparse
+import time
+import numpy as np
+from itertools import combinations, permutations
+from barhopping.routing.solver import held_karp, local_search, nearest_neighbour, path_length
+
+def random_matrix(n: int, rng: np.random.Generator, extent_m: float = 3000.0) -> np.ndarray:
+    points = rng.uniform(0, extent_m, size=(n, 2))
+    straight = np.linalg.norm(points[:, None] - points[None, :], axis=-1)
+    detour = rng.uniform(1.1, 1.6, size=(n, n))
+    return straight * np.triu(detour, 1) + (straight * np.triu(detour, 1)).T
+
+def legacy_held_karp(dist: np.ndarray, start: int = 0) -> list:
+    """``PathFinder._hamiltonian_path`` as originally written."""
+    n = len(dist)
+    dp = {(1 << start, start): (0, -1)}
+    for subset_size in range(2, n + 1):
+        for subset in combinations(range(n), subset_size):
+            if start not in subset:
+                continue
+            mask = sum(1 << i for i in subset)
+            for curr in subset:
+                prev_mask = mask & ~(1 << curr)
+                candidates = [
+                    (dp[(prev_mask, k)][0] + dist[k][curr], k)
+                    for k in subset if k != curr and (prev_mask, k) in dp
+                ]
+                if candidates:
+                    dp[(mask, curr)] = min(candidates)
+    full_mask = (1 << n) - 1
+    _, last = min((dp[(full_mask, i)][0], i) for i in range(n) if (full_mask, i) in dp)
+    path, mask = [last], full_mask
+    while dp[(mask, last)][1] != -1:
+        prev = dp[(mask, last)][1]
+        path.append(prev)
+        mask &= ~(1 << last)
+        last = prev
+    return path[::-1]
+
+def brute_force(dist: np.ndarray, start: int = 0) -> float:
+    rest = [v for v in range(len(dist)) if v != start]
+    return min(path_length(dist, [start, *order]) for order in permutations(rest))
+
+def check_optimality(rng: np.random.Generator, brute_max: int, exact_max: int, legacy_max: int):
+    for n in range(2, exact_max + 1):
+        dist = random_matrix(n, rng)
+        path = held_karp(dist)
+        assert sorted(path) == list(range(n)) and path[0] == 0, f"n={n}: not a valid path: {path}"
+        length = path_length(dist, path)
+        if n <= brute_max:
+            assert abs(length - brute_force(dist)) < 1e-6, f"n={n}: Held-Karp is not optimal"
+        if n <= legacy_max:
+            assert abs(length - path_length(dist, legacy_held_karp(dist))) < 1e-6, f"n={n}: differs from the original DP"
+        heuristic = local_search(dist, nearest_neighbour(dist))
+        assert sorted(heuristic) == list(range(n)) and heuristic[0] == 0, f"n={n}: heuristic path is invalid"
+        assert path_length(dist, heuristic) >= length - 1e-6, f"n={n}: heuristic beat the exact solver"
+    print(f"Optimality checks passed (brute force up to n={brute_max}, original DP up to n={legacy_max}, "
+          f"exact range up to n={exact_max})")
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 8, 10, 12, 14, 16, 20, 30, 40, 50])
+    parser.add_argument("--trials", type=int, default=3, help="Random matrices per size")
+    parser.add_argument("--exact-max", type=int, default=16, help="Largest n solved with Held-Karp")
+    parser.add_argument("--legacy-max", type=int, default=11, help="Largest n run through the original DP")
+    parser.add_argument("--brute-max", type=int, default=8, help="Largest n checked against brute force")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    check_optimality(rng, args.brute_max, args.exact_max, args.legacy_max)
+
+    print(f"{'n':>3} {'original ms':>12} {'held-karp ms':>13} {'heuristic ms':>13} {'heuristic gap':>14}")
+    for n in args.sizes:
+        legacy, exact, heuristic, gaps = [], [], [], []
+        for _ in range(args.trials):
+            dist = random_matrix(n, rng)
+            if n <= args.legacy_max:
+                legacy.append(timed(legacy_held_karp, dist)[1])
+            path, seconds = timed(lambda d: local_search(d, nearest_neighbour(d)), dist)
+            heuristic.append(seconds)
+            if n <= args.exact_max:
+                optimum, seconds = timed(held_karp, dist)
+                exact.append(seconds)
+                gaps.append(path_length(dist, path) / path_length(dist, optimum) - 1)
+
+        def ms(times):
+            return f"{np.mean(times) * 1000:.1f}" if times else "-"
+        gap = f"{np.mean(gaps) * 100:.2f}%" if gaps else "-"
+        print(f"{n:>3} {ms(legacy):>12} {ms(exact):>13} {ms(heuristic):>13} {gap:>14}")
+
+if __name__ == "__main__":
+    main()
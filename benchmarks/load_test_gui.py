@@ -0,0 +1,138 @@
+"""Concurrent users against the GUI's chat handler, without a browser or Gradio server.
+
+Each simulated user sends its requests one after another through
+``BarHoppingGUI.bar_recommendation`` on a shared event loop, as Gradio
+would. The script reports p50/p95 latency to the first bar card and to the
+finished route, plus the event loop's worst stall, measured by a heartbeat
+task, and the p50/p95 of each stage the handler streams. The "blocking"
+mode replays the handler as it was before, with search and routing called
+directly on the event loop.
+
+Queries are made distinct per request so the result cache does not answer
+them, unless --repeat is given. With --stub-ms the models are replaced by a
+stub that sleeps that long per search (half retrieval, half reranking) and
+returns pseudo-random bars from the index, so results do not depend on the
+hardware the models run on; routing is real.
+
+Usage:
+    python -m benchmarks.load_test_gui [--users 20] [--requests 3] [--mode both] [--stub-ms 50]
+"""
+import argparse
+import asyncio
+import time
+import zlib
+import numpy as np
+from barhopping.config import TOP_K
+from barhopping.gui import EXAMPLES, BarHoppingGUI
+
+def stub_models(gui: BarHoppingGUI, stub_ms: float):
+    """Answer searches without the models: sleep *stub_ms* and return bars picked from a hash of the query."""
+    vector_search = gui.vector_search
+    ids = vector_search.ids
+
+    def search_stages(query, top_k=TOP_K, **filters):
+        rng = np.random.default_rng(zlib.crc32(query.encode("utf-8")))
+        picked = rng.choice(ids, min(top_k, len(ids)), replace=False).tolist()
+        scores = np.sort(rng.random(len(picked)))[::-1]
+        time.sleep(stub_ms / 2000)
+        candidates = [dict(bar, vector_score=float(s)) for bar, s in zip(vector_search.get_bars(picked), scores)]
+        yield "candidates", candidates
+        time.sleep(stub_ms / 2000)
+        yield "reranked", [dict(bar, rerank_score=float(4 * s - 2)) for bar, s in zip(candidates, scores)]
+
+    def search(query, top_k=TOP_K, rerank=True, **filters):
+        for _, bars in search_stages(query, top_k):
+            pass
+        return bars
+
+    vector_search.search_stages = search_stages
+    vector_search.search = search
+
+def search(gui: BarHoppingGUI, message: str):
+    """Candidates for a route, as the handler retrieves them."""
+    return gui.vector_search.search(message, top_k=gui.search_top_k)
+
+async def blocking_recommendation(gui: BarHoppingGUI, message: str, history):
+    """The handler before search and routing were moved off the event loop."""
+    bars = search(gui, message)
+    path, distances = gui._route(bars)
+    response = []
+    for i in path:
+        response.append(gui._bar_html(bars[i]["name"], bars[i]["URL"], bars[i]["address"],
+                                      bars[i].get("photo", ""), bars[i].get("summary", "")))
+        yield response
+
+async def heartbeat(interval: float, stalls: list, stop: asyncio.Event):
+    """Record how late each tick of a periodic task runs; a blocked loop shows up as a long stall."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+async def user(handler, user_id: int, requests: int, repeat: bool, first: list, total: list, arrival: float):
+    """Send *requests* queries back to back; the first arrives with everyone else's at *arrival*."""
+    for n in range(requests):
+        query = EXAMPLES[(user_id + n) % len(EXAMPLES)]
+        if not repeat:
+            query = f"{query} (guest {user_id}, round {n})"
+        # Counting from the shared arrival time includes the wait for a blocked loop to reach this user
+        start = arrival if n == 0 else time.perf_counter()
+        first_seen = None
+        async for _ in handler(query, []):
+            if first_seen is None:
+                first_seen = time.perf_counter() - start
+        first.append(first_seen)
+        total.append(time.perf_counter() - start)
+
+async def run(handler, users: int, requests: int, repeat: bool):
+    first, total, stalls = [], [], []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(0.01, stalls, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(user(handler, u, requests, repeat, first, total, start) for u in range(users)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await beat
+    return first, total, stalls, wall
+
+def report(name: str, first, total, stalls, wall):
+    ms = lambda values, q: np.percentile(values, q) * 1000
+    print(f"{name:>9} {ms(first, 50):>10.0f} {ms(first, 95):>10.0f} {ms(total, 50):>10.0f} {ms(total, 95):>10.0f} "
+          f"{max(stalls) * 1000:>10.0f} {len(total) / wall:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=3, help="Requests per user")
+    parser.add_argument("--mode", choices=["executor", "blocking", "both"], default="both")
+    parser.add_argument("--repeat", action="store_true", help="Let users repeat the example queries verbatim")
+    parser.add_argument("--stub-ms", type=float, default=0,
+                        help="Replace the models with a stub taking this many ms per search (0 = real models)")
+    args = parser.parse_args()
+
+    gui = BarHoppingGUI()
+    if args.stub_ms:
+        stub_models(gui, args.stub_ms)
+    # Load the models before timing
+    gui._route(search(gui, EXAMPLES[0]))
+
+    modes = ["blocking", "executor"] if args.mode == "both" else [args.mode]
+    handlers = {
+        "executor": gui.bar_recommendation,
+        "blocking": lambda message, history: blocking_recommendation(gui, message, history),
+    }
+    print(f"{args.users} users x {args.requests} requests")
+    print(f"{'mode':>9} {'first p50':>10} {'first p95':>10} {'total p50':>10} {'total p95':>10} "
+          f"{'stall ms':>10} {'req/s':>8}")
+    for mode in modes:
+        report(mode, *asyncio.run(run(handlers[mode], args.users, args.requests, args.repeat)))
+
+    print(f"\n{'stage':>11} {'p50 ms':>8} {'p95 ms':>8}")
+    for stage in ("candidates", "reranked", "first_card", "route", "map", "total"):
+        values = [t[stage] for t in gui.timings if stage in t]
+        if values:
+            print(f"{stage:>11} {np.percentile(values, 50) * 1000:>8.0f} {np.percentile(values, 95) * 1000:>8.0f}")
+    print(f"Admission: {gui.admission.stats()}")
+
+if __name__ == "__main__":
+    main()